@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+Benchmarks für myTinyDesk
+Misst Teile des Render-Pfads ohne die GUI bedienen zu müssen.
+
+Verwendung:
+    python bench.py render dokument.pdf --pages 1-20 --zoom 1.0,2.0 [--json ergebnis.json]
+    python bench.py display dokument.pdf --page 1 --zoom 2.0
+    python bench.py io /mnt/share/dokument.pdf --seeks 50
+    python bench.py export dokument.pdf --pages 1-100 --workers 1,2,4
+"""
+
+import argparse
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from PIL import Image
+import fitz  # PyMuPDF
+
+from document_io import DocumentLoader, filesystem_type
+from instrumentation import summarize
+from memory_budget import current_rss_bytes, peak_rss_bytes
+from render_cache import DisplayListCache
+from render_worker import DocumentWorker
+from rendering import page_matrix, parse_pages, pixmap_to_bitmap, render_page_image
+
+# Phasen in der Reihenfolge des Render-Pfads
+STAGES = ("load", "rasterize", "convert", "display")
+
+
+def _tk_root():
+    """Verstecktes Tk-Fenster, None falls kein Display verfügbar ist"""
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+        root.withdraw()
+        return root
+    except Exception:
+        return None
+
+
+def _measure(frame, repeat):
+    """Führt frame() wiederholt aus: Zeiten (ms) und RSS nach jedem Frame (Bytes)"""
+    times = []
+    rss = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        frame()
+        times.append((time.perf_counter() - start) * 1000)
+        rss.append(current_rss_bytes())
+    return times, rss
+
+
+def bench_render(args):
+    """Rendert einen Seitenbereich bei mehreren Zoomstufen über den Pfad des Viewers"""
+    doc = fitz.open(args.pdf)
+    pages = parse_pages(args.pages, len(doc))
+    zooms = [float(z) for z in args.zoom.split(",")]
+    display_lists = DisplayListCache(DocumentWorker.DISPLAY_LIST_BYTES)
+
+    # Anzeige nur messen, wenn ein Display vorhanden ist
+    root = None if args.no_display else _tk_root()
+    if root is not None:
+        from display import make_display
+        display = make_display(args.backend)
+    photo = None
+
+    report = {
+        "file": args.pdf,
+        "pages": len(pages),
+        "zoom_levels": [],
+        "display_measured": root is not None,
+    }
+    bench_start = time.perf_counter()
+    total_renders = 0
+
+    for zoom in zooms:
+        stage_samples = {stage: [] for stage in STAGES}
+        totals = []
+        zoom_start = time.perf_counter()
+        for _ in range(args.repeat):
+            for index in pages:
+                timings = {}
+                start = time.perf_counter()
+                img = render_page_image(doc, index, zoom, display_lists=display_lists, timings=timings)
+                if root is not None:
+                    display_start = time.perf_counter()
+                    photo = display.photo(img, photo)
+                    root.update_idletasks()
+                    timings["display"] = time.perf_counter() - display_start
+                totals.append(time.perf_counter() - start)
+                for stage, seconds in timings.items():
+                    stage_samples[stage].append(seconds)
+        elapsed = time.perf_counter() - zoom_start
+        total_renders += len(totals)
+
+        report["zoom_levels"].append({
+            "zoom": zoom,
+            "renders": len(totals),
+            "pages_per_second": round(len(totals) / elapsed, 2) if elapsed else 0.0,
+            "total": summarize(totals),
+            "stages": {stage: summarize(values) for stage, values in stage_samples.items() if values},
+        })
+
+    elapsed = time.perf_counter() - bench_start
+    report["renders"] = total_renders
+    report["seconds"] = round(elapsed, 3)
+    report["pages_per_second"] = round(total_renders / elapsed, 2) if elapsed else 0.0
+    report["peak_rss_bytes"] = peak_rss_bytes()
+    report["display_lists"] = display_lists.stats()
+
+    display_lists.clear()
+    doc.close()
+    if root is not None:
+        root.destroy()
+
+    if args.json:
+        text = json.dumps(report, indent=2)
+        if args.json == "-":
+            print(text)
+        else:
+            with open(args.json, "w", encoding="utf-8") as f:
+                f.write(text)
+    if args.json != "-":
+        print_render_report(report)
+    return 0
+
+
+def print_render_report(report):
+    """Gibt das Ergebnis von bench_render lesbar aus"""
+    print(f"Datei: {report['file']} | {report['pages']} Seiten | {report['renders']} Renderings "
+          f"in {report['seconds']:.2f} s ({report['pages_per_second']:.1f} Seiten/s)")
+    for level in report["zoom_levels"]:
+        print(f"\nZoom {level['zoom']:.0%}: {level['pages_per_second']:.1f} Seiten/s")
+        print(f"  {'Phase':<10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        rows = list(level["stages"].items()) + [("gesamt", level["total"])]
+        for stage, stats in rows:
+            print(f"  {stage:<10} {stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f}")
+    if not report["display_measured"]:
+        print("\nKein Display: Phase 'display' nicht gemessen")
+    peak = report["peak_rss_bytes"]
+    if peak is not None:
+        print(f"Maximaler Arbeitsspeicher (RSS): {peak / 1024 / 1024:.1f} MB")
+
+
+def _display_run(pdf, page_index, zoom, backend, repeat):
+    """Misst ein Anzeige-Backend in einem eigenen Prozess (eigene RSS-Spitze)"""
+    doc = fitz.open(pdf)
+    pix = doc[page_index].get_pixmap(matrix=page_matrix(zoom), alpha=False)
+    size = (pix.width, pix.height)
+    root = _tk_root()
+    if root is not None:
+        import tkinter as tk
+        from display import PilDisplay, PpmDisplay
+        canvas = tk.Canvas(root)
+        ppm_display = PpmDisplay()
+        root.update_idletasks()
+
+    state = {}
+
+    def frame_pil():
+        # Bisherige Kette: samples -> Bytes, frombytes -> PIL (RGBX), PhotoImage, neues Canvas-Item
+        img = Image.frombytes("RGB", size, pix.samples)
+        if root is not None:
+            state["photo"] = PilDisplay().photo(img)
+            canvas.delete("all")
+            canvas.create_image(0, 0, anchor="nw", image=state["photo"])
+            root.update_idletasks()
+
+    def frame_ppm():
+        # Schlanke Kette: eine Kopie in den PPM-Block, PhotoImage und Item wiederverwenden
+        img = pixmap_to_bitmap(pix)
+        if root is not None:
+            state["ppm"] = ppm_display.photo(img, state.get("ppm"))
+            if "item" not in state:
+                state["item"] = canvas.create_image(0, 0, anchor="nw", image=state["ppm"])
+            else:
+                canvas.itemconfigure(state["item"], image=state["ppm"])
+            root.update_idletasks()
+
+    frame = frame_pil if backend == "pil" else frame_ppm
+    base_rss = current_rss_bytes()
+    base_peak = peak_rss_bytes()
+    times, rss = _measure(frame, repeat)
+    peak = peak_rss_bytes()
+    result = {
+        "display": root is not None,
+        "median_ms": statistics.median(times),
+        # Spitze während eines Frames bzw. dauerhaft belegt nach den Frames, jeweils über dem Ausgangswert
+        "peak_growth": None if peak is None else peak - base_peak,
+        "rss_growth": None if base_rss is None else statistics.median(rss) - base_rss,
+    }
+    if root is not None:
+        root.destroy()
+    doc.close()
+    return result
+
+
+def bench_display(args):
+    """Vergleicht die Kopierkette Pixmap -> Tk der Anzeige-Backends
+
+    Jedes Backend läuft in einem eigenen Prozess; gemessen werden Zeit und
+    Arbeitsspeicher (RSS) pro Frame. Anders als tracemalloc erfasst RSS
+    auch die Puffer von PIL und Tk.
+    """
+    doc = fitz.open(args.pdf)
+    pix = doc[args.page - 1].get_pixmap(matrix=page_matrix(args.zoom), alpha=False)
+    frame_bytes = len(pix.samples_mv)
+    print(f"Seite {args.page}, Zoom {args.zoom:.0%}: {pix.width}x{pix.height} Pixel, "
+          f"{frame_bytes / 1024 / 1024:.1f} MB pro Frame")
+    pix = None
+    doc.close()
+
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    for name in ("pil", "ppm"):
+        with concurrent.futures.ProcessPoolExecutor(1, mp_context=context) as pool:
+            results[name] = pool.submit(_display_run, args.pdf, args.page - 1, args.zoom, name,
+                                        args.repeat).result()
+
+    if not results["ppm"]["display"]:
+        print("Kein Display: gemessen wird nur bis zur Übergabe an Tk")
+
+    def megabytes(value):
+        return "-" if value is None else f"{value / 1024 / 1024:.1f}"
+
+    print(f"{'Backend':<8} {'Median ms':>10} {'RSS-Spitze MB':>14} {'RSS belegt MB':>14}")
+    for name, result in results.items():
+        print(f"{name:<8} {result['median_ms']:>10.2f} {megabytes(result['peak_growth']):>14} "
+              f"{megabytes(result['rss_growth']):>14}")
+    if results["pil"]["median_ms"] > 0:
+        saving = 1 - results["ppm"]["median_ms"] / results["pil"]["median_ms"]
+        print(f"Ersparnis ppm gegenüber pil: {saving:.0%} Zeit pro Frame")
+    pil_peak, ppm_peak = results["pil"]["peak_growth"], results["ppm"]["peak_growth"]
+    if pil_peak and ppm_peak is not None:
+        print(f"RSS-Spitze ppm gegenüber pil: {(pil_peak - ppm_peak) / 1024 / 1024:.1f} MB weniger "
+              f"({(pil_peak - ppm_peak) / frame_bytes:.1f} Frames)")
+    return 0
+
+
+def drop_file_cache(path):
+    """Entfernt die Datei aus dem Page-Cache, damit kalt gemessen wird (nur POSIX)"""
+    if not hasattr(os, "posix_fadvise"):
+        return False
+    with open(path, "rb") as f:
+        os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+    return True
+
+
+def bench_io(args):
+    """Vergleicht direkten Zugriff, mmap und lokale Kopie: Öffnen und Seitenwechsel"""
+    size = os.path.getsize(args.pdf)
+    auto = DocumentLoader(directory=args.dir).strategy(args.pdf)
+    print(f"Datei: {args.pdf} | {size / 1024 / 1024:.1f} MB | Dateisystem: "
+          f"{filesystem_type(args.pdf) or 'unbekannt'} | automatisch: {auto}")
+
+    report = {"file": args.pdf, "bytes": size, "filesystem": filesystem_type(args.pdf),
+              "auto": auto, "modes": {}}
+    for mode in ("direct", "mmap", "copy"):
+        opens, first_pages, seeks = [], [], []
+        for run in range(args.repeat):
+            # Kalt messen: Page-Cache der Quelle leeren, Kopie verwerfen
+            cold = drop_file_cache(args.pdf)
+            loader = DocumentLoader(mode, directory=args.dir)
+            copy = loader.copy_path(args.pdf)
+            if mode == "copy" and os.path.exists(copy):
+                os.unlink(copy)
+
+            start = time.perf_counter()
+            doc, _mode = loader.open(args.pdf)
+            opens.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            doc[0].get_displaylist()
+            first_pages.append(time.perf_counter() - start)
+
+            # Verstreute Seitenwechsel: Seite laden und interpretieren, ohne zu rastern
+            rng = random.Random(run)
+            for _ in range(args.seeks):
+                start = time.perf_counter()
+                doc[rng.randrange(len(doc))].get_displaylist()
+                seeks.append(time.perf_counter() - start)
+            doc.close()
+        report["modes"][mode] = {"open": summarize(opens), "first_page": summarize(first_pages),
+                                 "seek": summarize(seeks), "cold": cold}
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    print(f"\n{'Zugriff':<8} {'Öffnen ms':>10} {'1. Seite ms':>12} {'Wechsel p50':>12} {'Wechsel p95':>12}")
+    for mode, stats in report["modes"].items():
+        print(f"{mode:<8} {stats['open']['p50_ms']:>10.2f} {stats['first_page']['p50_ms']:>12.2f} "
+              f"{stats['seek']['p50_ms']:>12.2f} {stats['seek']['p95_ms']:>12.2f}")
+    if not report["modes"]["direct"]["cold"]:
+        print("\nPage-Cache konnte nicht geleert werden: Werte nach dem ersten Durchlauf sind warm")
+    return 0
+
+
+def bench_export(args):
+    """Durchsatz des Stapel-Exports für mehrere Prozesszahlen"""
+    # Erst hier: export.py benutzt selbst Hilfsfunktionen dieses Moduls
+    from export import default_workers, export_pages
+
+    doc = fitz.open(args.pdf)
+    pages = parse_pages(args.pages, len(doc))
+    doc.close()
+    counts = [int(n) for n in args.workers.split(",")] if args.workers else sorted({1, default_workers()})
+    print(f"Datei: {args.pdf} | {len(pages)} Seiten | {args.format} mit {args.dpi:g} DPI | "
+          f"{default_workers()} Kerne verfügbar")
+
+    report = {"file": args.pdf, "pages": len(pages), "format": args.format, "dpi": args.dpi, "runs": []}
+    for workers in counts:
+        out_dir = tempfile.mkdtemp(prefix="mytinydesk-export-")
+        try:
+            run = export_pages(args.pdf, out_dir, pages, args.dpi, args.format, workers=workers)
+        finally:
+            shutil.rmtree(out_dir, ignore_errors=True)
+        report["runs"].append(run)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    base = report["runs"][0]["pages_per_second"]
+    print(f"\n{'Prozesse':>8} {'Seiten/s':>9} {'Faktor':>7} {'Rastern p50':>12} {'Kodieren p50':>13} {'RSS max MB':>11}")
+    for run in report["runs"]:
+        rss = run["worker_peak_rss_bytes"]
+        print(f"{run['workers']:>8} {run['pages_per_second']:>9.1f} "
+              f"{run['pages_per_second'] / base if base else 0:>7.2f} "
+              f"{run['stages']['rasterize']['p50_ms']:>12.2f} {run['stages']['encode']['p50_ms']:>13.2f} "
+              f"{rss / 1024 / 1024 if rss else 0:>11.1f}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="myTinyDesk Benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    render = sub.add_parser("render", help="Seitenbereich rendern, Latenz-Perzentile je Phase")
+    render.add_argument("pdf", help="PDF-Datei")
+    render.add_argument("--pages", default="", help='Seitenbereich, z.B. "1-20,25" (Standard: alle)')
+    render.add_argument("--zoom", default="1.0", help='Zoomstufen, z.B. "1.0,2.0"')
+    render.add_argument("--repeat", type=int, default=1, help="Durchläufe pro Zoomstufe")
+    render.add_argument("--backend", default="ppm", help="Anzeige-Backend: ppm oder pil")
+    render.add_argument("--no-display", action="store_true", help="Tk-Anzeige nicht mitmessen")
+    render.add_argument("--json", metavar="DATEI", help='Ergebnis als JSON schreiben ("-" = stdout)')
+    render.set_defaults(func=bench_render)
+
+    display = sub.add_parser("display", help="Kopierkette Pixmap -> Tk je Anzeige-Backend messen")
+    display.add_argument("pdf", help="PDF-Datei")
+    display.add_argument("--page", type=int, default=1, help="Seitennummer (ab 1)")
+    display.add_argument("--zoom", type=float, default=2.0, help="Zoomfaktor (1.0 = 100%%)")
+    display.add_argument("--repeat", type=int, default=20, help="Anzahl der Messungen")
+    display.set_defaults(func=bench_display)
+
+    io = sub.add_parser("io", help="Direkter Zugriff, mmap und lokale Kopie vergleichen")
+    io.add_argument("pdf", help="PDF-Datei (z.B. auf einem Netzlaufwerk)")
+    io.add_argument("--seeks", type=int, default=50, help="Zufällige Seitenwechsel pro Durchlauf")
+    io.add_argument("--repeat", type=int, default=3, help="Durchläufe pro Zugriff")
+    io.add_argument("--dir", help="Ordner für die lokale Kopie (Standard wie im Viewer)")
+    io.add_argument("--json", metavar="DATEI", help="Ergebnis als JSON schreiben")
+    io.set_defaults(func=bench_io)
+
+    export = sub.add_parser("export", help="Durchsatz des Stapel-Exports je Prozesszahl")
+    export.add_argument("pdf", help="PDF-Datei")
+    export.add_argument("--pages", default="", help='Seitenbereich, z.B. "1-100" (Standard: alle)')
+    export.add_argument("--dpi", type=float, default=150, help="Auflösung (Standard: 150)")
+    export.add_argument("--format", default="png", help="Bildformat: png, jpeg oder webp")
+    export.add_argument("--workers", default="", help='Prozesszahlen, z.B. "1,2,4" (Standard: 1 und alle Kerne)')
+    export.add_argument("--json", metavar="DATEI", help="Ergebnis als JSON schreiben")
+    export.set_defaults(func=bench_export)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
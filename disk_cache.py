@@ -0,0 +1,239 @@
+"""
+Persistenter Render-Cache für myTinyDesk
+Legt gerenderte Seiten (und Vorschaubilder) komprimiert auf der Platte ab,
+damit häufig geöffnete Dokumente ohne erneutes Rendern erscheinen. Daneben
+liegen Rohdaten wie der Suchindex eines Dokuments (`get_data`/`put_data`).
+
+Schlüssel ist ein schneller Fingerabdruck des Dateiinhalts (Größe plus
+Stichproben am Anfang, in der Mitte und am Ende), nicht der Pfad: Kopien
+desselben Handbuchs teilen sich die Einträge. Schreiben erfolgt atomar
+(temporäre Datei + os.replace), mehrere Prozesse dürfen denselben Ordner
+nutzen. Verdrängt wird nach Zugriffszeit (mtime), sobald das Budget
+überschritten ist.
+
+Umgebungsvariablen:
+    MYTINYDESK_DISK_CACHE_DIR  Ordner des Caches (nicht gesetzt = aus)
+    MYTINYDESK_DISK_CACHE_MB   Größenbudget in MB (Standard: 256)
+"""
+
+import hashlib
+import os
+import queue
+import tempfile
+import threading
+import zlib
+
+from rendering import PpmBitmap
+
+# Stichprobengröße für den Fingerabdruck (Bytes pro Stelle)
+FINGERPRINT_SAMPLE = 64 * 1024
+
+# Dateikopf: Format, Modus, Breite, Höhe; danach zlib-komprimierte Pixel
+MAGIC = b"MTD1"
+SUFFIX = ".mtd"
+
+# Schnelle Kompression: Entpacken muss schneller sein als Rendern
+COMPRESS_LEVEL = 1
+
+# Nach so vielen Schreibvorgängen wird der Ordner neu vermessen (andere Prozesse)
+RESCAN_WRITES = 100
+# Beim Verdrängen bis auf diesen Anteil des Budgets aufräumen
+EVICT_TARGET = 0.9
+
+
+def file_fingerprint(path):
+    """Fingerabdruck des Dateiinhalts ohne die ganze Datei zu lesen"""
+    size = os.path.getsize(path)
+    digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+    offsets = sorted({0, max(0, (size - FINGERPRINT_SAMPLE) // 2), max(0, size - FINGERPRINT_SAMPLE)})
+    with open(path, "rb") as f:
+        for offset in offsets:
+            f.seek(offset)
+            digest.update(f.read(FINGERPRINT_SAMPLE))
+    return digest.hexdigest()
+
+
+def page_entry(page_index, zoom, rotation=0, gray=False):
+    """Name des Eintrags für eine ganze Seite"""
+    name = f"p{page_index}-z{round(zoom, 3)}-r{rotation % 360}"
+    return name + "-g" if gray else name
+
+
+def thumbnail_entry(page_index, width, height, gray=False):
+    """Name des Eintrags für eine Miniatur"""
+    name = f"t{page_index}-{width}x{height}"
+    return name + "-g" if gray else name
+
+
+class DiskCache:
+    """Größenbegrenzter Plattencache für gerenderte Bitmaps
+
+    `get` liest synchron (aufgerufen aus Workern), `put` schreibt in einem
+    eigenen Thread, damit Rendern und UI nie auf die Platte warten.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.current_bytes = None
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=64)
+        self._writer = None
+
+    @classmethod
+    def from_environment(cls):
+        directory = os.environ.get("MYTINYDESK_DISK_CACHE_DIR")
+        if not directory:
+            return None
+        max_mb = int(os.environ.get("MYTINYDESK_DISK_CACHE_MB", "256"))
+        return cls(os.path.expanduser(directory), max_mb * 1024 * 1024)
+
+    def path(self, fingerprint, name):
+        return os.path.join(self.directory, fingerprint[:2], f"{fingerprint}-{name}{SUFFIX}")
+
+    def get(self, fingerprint, name):
+        """Liefert die gespeicherte PpmBitmap oder None"""
+        path = self.path(fingerprint, name)
+        try:
+            with open(path, "rb") as f:
+                header = f.readline().split()
+                compressed = f.read()
+            if len(header) != 4 or header[0] != MAGIC:
+                raise ValueError("Unbekanntes Format")
+            mode = header[1].decode("ascii")
+            size = (int(header[2]), int(header[3]))
+            img = PpmBitmap(mode, size, zlib.decompress(compressed))
+            # Zugriffszeit für die LRU-Verdrängung
+            os.utime(path)
+        except (OSError, ValueError, zlib.error):
+            # Fehlt, gerade verdrängt oder beschädigt
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return img
+
+    def contains(self, fingerprint, name):
+        return os.path.exists(self.path(fingerprint, name))
+
+    def put(self, fingerprint, name, img):
+        """Speichert im Hintergrund; ist die Warteschlange voll, entfällt der Eintrag"""
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="mytinydesk-disk-cache",
+                                                daemon=True)
+                self._writer.start()
+        try:
+            self._queue.put_nowait((fingerprint, name, img))
+        except queue.Full:
+            pass
+
+    def get_data(self, fingerprint, name):
+        """Liefert gespeicherte Rohdaten (z.B. den Suchindex) oder None"""
+        path = self.path(fingerprint, name)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            return None
+        return data
+
+    def put_data(self, fingerprint, name, data):
+        """Speichert Rohdaten sofort (aus einem Worker, nicht aus der UI aufrufen)"""
+        try:
+            self._store(self.path(fingerprint, name), data)
+        except OSError:
+            pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+            }
+
+    def _write_loop(self):
+        while True:
+            fingerprint, name, img = self._queue.get()
+            try:
+                self._write(fingerprint, name, img)
+            except OSError:
+                # Platte voll oder Ordner nicht beschreibbar: Cache ist optional
+                pass
+
+    def _write(self, fingerprint, name, img):
+        path = self.path(fingerprint, name)
+        if os.path.exists(path):
+            return
+        data = b"%s %s %d %d\n" % (MAGIC, img.mode.encode("ascii"), img.width, img.height)
+        data += zlib.compress(img.samples, COMPRESS_LEVEL)
+        self._store(path, data)
+
+    def _store(self, path, data):
+        folder = os.path.dirname(path)
+        os.makedirs(folder, exist_ok=True)
+
+        # Atomar: andere Prozesse sehen die Datei ganz oder gar nicht
+        fd, tmp_path = tempfile.mkstemp(dir=folder, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        with self._lock:
+            self.writes += 1
+            rescan = self.current_bytes is None or self.writes % RESCAN_WRITES == 0
+            if self.current_bytes is not None:
+                self.current_bytes += len(data)
+            over = self.current_bytes is not None and self.current_bytes > self.max_bytes
+        if rescan or over:
+            self._evict()
+
+    def _scan(self):
+        """Alle Einträge als (mtime, Größe, Pfad), auch die anderer Prozesse"""
+        entries = []
+        try:
+            folders = list(os.scandir(self.directory))
+        except OSError:
+            return entries
+        for folder in folders:
+            if not folder.is_dir():
+                continue
+            for entry in os.scandir(folder.path):
+                if entry.name.endswith(SUFFIX):
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+        return entries
+
+    def _evict(self):
+        entries = self._scan()
+        total = sum(size for _mtime, size, _path in entries)
+        if total > self.max_bytes:
+            target = self.max_bytes * EVICT_TARGET
+            for _mtime, size, path in sorted(entries):
+                if total <= target:
+                    break
+                try:
+                    os.unlink(path)
+                except OSError:
+                    continue
+                total -= size
+        with self._lock:
+            self.current_bytes = total
@@ -0,0 +1,53 @@
+"""
+Anzeige-Backends für myTinyDesk
+Bringen ein gerendertes Bild (PpmBitmap oder PIL-Image) als PhotoImage in den Tk-Canvas
+"""
+
+import tkinter as tk
+
+from lazy_import import lazy_import
+from rendering import pil_image, ppm_data
+
+ImageTk = lazy_import("PIL.ImageTk")
+
+
+class PilDisplay:
+    """Bisheriger Weg über ImageTk.PhotoImage, ein neues PhotoImage pro Bild
+
+    Aus einer PpmBitmap entsteht dafür jedes Mal ein PIL-Image (bei RGB eine
+    weitere Kopie der Pixel).
+    """
+
+    name = "pil"
+
+    def photo(self, img, reuse=None):
+        return ImageTk.PhotoImage(pil_image(img))
+
+
+class PpmDisplay:
+    """Schlanker Weg: PPM-Daten direkt an Tk, PhotoImage wird wiederverwendet
+
+    Bitmaps aus dem Render-Pfad liegen bereits als PPM vor und gehen ohne
+    Kopie in Python oder PIL an Tk; nur PIL-Images (z.B. die skalierte
+    Vorschau) werden dafür einmal in einen PPM-Block kopiert.
+    """
+
+    name = "ppm"
+
+    def photo(self, img, reuse=None):
+        data = ppm_data(img)
+        if isinstance(reuse, tk.PhotoImage):
+            reuse.configure(width=img.width, height=img.height, data=data, format="ppm")
+            return reuse
+        return tk.PhotoImage(width=img.width, height=img.height, data=data, format="ppm")
+
+
+DISPLAY_BACKENDS = {
+    PilDisplay.name: PilDisplay,
+    PpmDisplay.name: PpmDisplay,
+}
+
+
+def make_display(name):
+    """Erzeugt das Anzeige-Backend, unbekannte Namen fallen auf PPM zurück"""
+    return DISPLAY_BACKENDS.get(name, PpmDisplay)()
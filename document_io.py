@@ -0,0 +1,288 @@
+"""
+Dateizugriff für myTinyDesk
+PyMuPDF liest ein PDF mit vielen kleinen, verstreuten Zugriffen. Auf
+Netzlaufwerken (SMB/NFS) kostet jeder davon einen Roundtrip, Öffnen und
+Blättern werden dadurch sehr langsam.
+
+Dateien auf Netzlaufwerken werden deshalb einmal am Stück in einen lokalen
+Ordner kopiert (große, sequentielle Lesezugriffe) und die Kopie per mmap
+geöffnet: alle Worker eines Prozesses teilen sich dieselben Seiten im
+Page-Cache, ohne eigene Kopie im Speicher. Die Kopien bilden einen Cache
+mit Größenbudget, Schlüssel ist Inhalt und Änderungszeit der Quelle.
+Lokale Dateien öffnet PyMuPDF weiterhin direkt.
+
+Umgebungsvariablen:
+    MYTINYDESK_IO_MODE          auto (Standard), direct, mmap oder copy
+    MYTINYDESK_READAHEAD_DIR    Ordner der lokalen Kopien
+                                (Standard: ~/.cache/mytinydesk/readahead)
+    MYTINYDESK_READAHEAD_MB     Größenbudget der Kopien in MB (Standard: 2048)
+"""
+
+import hashlib
+import mmap
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from disk_cache import file_fingerprint
+from lazy_import import lazy_import
+
+fitz = lazy_import("fitz")  # PyMuPDF
+
+MODES = ("auto", "direct", "mmap", "copy")
+
+# Dateisysteme, die über das Netz lesen (Linux-Namen aus /proc/self/mountinfo)
+NETWORK_FILESYSTEMS = {
+    "nfs", "nfs4", "cifs", "smb3", "smbfs", "ncpfs", "afs", "9p", "ceph", "glusterfs",
+    "lustre", "gpfs", "davfs", "fuse.sshfs", "fuse.glusterfs", "fuse.rclone", "fuse.s3fs",
+}
+
+# Kleine Dateien liest PyMuPDF mit wenigen Zugriffen, eine Kopie lohnt nicht
+COPY_MIN_BYTES = 256 * 1024
+# Blockgröße beim Kopieren
+COPY_CHUNK = 8 * 1024 * 1024
+# Auf dem Zielordner muss nach dem Kopieren noch so viel frei bleiben
+FREE_SPACE_RESERVE = 512 * 1024 * 1024
+
+SUFFIX = ".pdf"
+# Beim Verdrängen bis auf diesen Anteil des Budgets aufräumen
+EVICT_TARGET = 0.9
+# Abgebrochene Kopien (.tmp) werden nach dieser Zeit entfernt (Sekunden)
+STALE_TMP_AGE = 3600
+
+
+def _unescape_mount(path):
+    """mountinfo kodiert Leerzeichen usw. oktal (z.B. \\040)"""
+    if "\\" not in path:
+        return path
+    return path.encode("ascii", "backslashreplace").decode("unicode_escape")
+
+
+def filesystem_type(path):
+    """Typ des Dateisystems (z.B. "ext4", "nfs4"), None falls nicht ermittelbar"""
+    if sys.platform == "win32":
+        return _windows_filesystem_type(path)
+    try:
+        with open("/proc/self/mountinfo", encoding="utf-8", errors="replace") as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+    path = os.path.realpath(path)
+    best, best_type = "", None
+    for line in lines:
+        fields, _sep, rest = line.partition(" - ")
+        fields = fields.split()
+        if len(fields) < 5 or not rest:
+            continue
+        mount_point = _unescape_mount(fields[4])
+        prefix = mount_point.rstrip("/") + "/"
+        if (path == mount_point or path.startswith(prefix)) and len(mount_point) >= len(best):
+            best, best_type = mount_point, rest.split()[0]
+    return best_type
+
+
+def _windows_filesystem_type(path):
+    """UNC-Pfade und verbundene Netzlaufwerke melden "remote" """
+    path = os.path.abspath(path)
+    if path.startswith("\\\\"):
+        return "remote"
+    try:
+        import ctypes
+        drive_type = ctypes.windll.kernel32.GetDriveTypeW(os.path.splitdrive(path)[0] + "\\")
+    except (ImportError, AttributeError, OSError):
+        return None
+    return "remote" if drive_type == 4 else "local"  # DRIVE_REMOTE
+
+
+def is_network_filesystem(fs_type):
+    return fs_type == "remote" or fs_type in NETWORK_FILESYSTEMS
+
+
+def open_mapped(path):
+    """Öffnet ein PDF über mmap, ohne es in den Speicher zu kopieren
+
+    PyMuPDF liest direkt aus der Abbildung; sie bleibt über `doc.stream`
+    bestehen, solange das Dokument lebt.
+    """
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return fitz.open(stream=memoryview(mapped), filetype="pdf")
+
+
+class DocumentLoader:
+    """Wählt pro Datei den Zugriff und öffnet Dokumente entsprechend
+
+    - direct: PyMuPDF liest die Datei selbst (lokale und kleine Dateien)
+    - copy:   Kopie am Stück in den lokalen Ordner, geöffnet per mmap
+    - mmap:   die Datei selbst per mmap (nur auf Wunsch, auf Netzlaufwerken
+              beendet ein Verbindungsabbruch den Prozess mit SIGBUS)
+
+    Wird von allen Workern eines Prozesses geteilt; die Entscheidung wird
+    pro Datei (Pfad, Größe, Änderungszeit) gemerkt, kopiert wird nur einmal.
+    """
+
+    def __init__(self, mode="auto", directory=None, max_bytes=2048 * 1024 * 1024):
+        if mode not in MODES:
+            raise ValueError(f"Unbekannter Zugriff: {mode}")
+        self.mode = mode
+        self.directory = directory or self.default_directory()
+        self.max_bytes = max_bytes
+        self.copies = 0
+        self.copied_bytes = 0
+        self._lock = threading.Lock()
+        self._copy_lock = threading.Lock()
+        self._decisions = {}
+
+    @classmethod
+    def from_environment(cls):
+        mode = os.environ.get("MYTINYDESK_IO_MODE", "auto").strip().lower() or "auto"
+        directory = os.environ.get("MYTINYDESK_READAHEAD_DIR")
+        max_mb = int(os.environ.get("MYTINYDESK_READAHEAD_MB", "2048"))
+        return cls(mode, os.path.expanduser(directory) if directory else None, max_mb * 1024 * 1024)
+
+    @staticmethod
+    def default_directory():
+        """Benutzer-Cache; liegt dieser selbst im Netz, das temporäre Verzeichnis"""
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        if is_network_filesystem(filesystem_type(base)):
+            base = tempfile.gettempdir()
+        return os.path.join(base, "mytinydesk", "readahead")
+
+    def strategy(self, path):
+        """Zugriff für eine Datei: "direct", "copy" oder "mmap" """
+        st = os.stat(path)
+        key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+        with self._lock:
+            decided = self._decisions.get(key)
+        if decided is not None:
+            return decided
+
+        if self.mode != "auto":
+            decided = self.mode
+        elif st.st_size < COPY_MIN_BYTES or not is_network_filesystem(filesystem_type(path)):
+            decided = "direct"
+        elif st.st_size > self.max_bytes or not self._has_space(st.st_size):
+            # Passt nicht in den lokalen Ordner: wie bisher über das Netz
+            decided = "direct"
+        else:
+            decided = "copy"
+        with self._lock:
+            self._decisions[key] = decided
+        return decided
+
+    def open(self, path, timings=None):
+        """Öffnet ein Dokument, liefert (Dokument, gewählter Zugriff)"""
+        mode = self.strategy(path)
+        if mode == "mmap":
+            return open_mapped(path), mode
+        if mode == "copy":
+            start = time.perf_counter()
+            local = self.local_copy(path)
+            if timings is not None:
+                timings["readahead"] = time.perf_counter() - start
+            if local is not None:
+                return open_mapped(local), mode
+            mode = "direct"
+        return fitz.open(path), mode
+
+    def copy_path(self, path):
+        """Pfad der lokalen Kopie: Inhalt und Änderungszeit der Quelle"""
+        st = os.stat(path)
+        key = hashlib.blake2b(f"{file_fingerprint(path)}-{st.st_mtime_ns}".encode(),
+                              digest_size=16).hexdigest()
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def local_copy(self, path):
+        """Lokale Kopie anlegen bzw. wiederverwenden, None falls das nicht geht"""
+        target = self.copy_path(path)
+        # Worker desselben Prozesses warten auf die erste Kopie statt selbst zu kopieren
+        with self._copy_lock:
+            if os.path.exists(target):
+                try:
+                    os.utime(target)
+                except OSError:
+                    pass
+                return target
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                self._evict(os.path.getsize(path))
+                self._copy(path, target)
+            except OSError:
+                return None
+        return target
+
+    def _copy(self, source, target):
+        # Atomar: andere Prozesse sehen die Kopie ganz oder gar nicht
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with open(source, "rb", buffering=0) as src, os.fdopen(fd, "wb") as dst:
+                shutil.copyfileobj(src, dst, COPY_CHUNK)
+            os.replace(tmp_path, target)
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        with self._lock:
+            self.copies += 1
+            self.copied_bytes += os.path.getsize(target)
+
+    def _has_space(self, size):
+        folder = self.directory
+        while not os.path.isdir(folder):
+            parent = os.path.dirname(folder)
+            if parent == folder:
+                return False
+            folder = parent
+        try:
+            return shutil.disk_usage(folder).free - size > FREE_SPACE_RESERVE
+        except OSError:
+            return False
+
+    def _evict(self, incoming):
+        """Älteste Kopien entfernen, bis die neue ins Budget passt"""
+        entries = []
+        now = time.time()
+        for entry in os.scandir(self.directory):
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            if entry.name.endswith(".tmp"):
+                # Reste abgebrochener Kopien
+                if now - st.st_mtime > STALE_TMP_AGE:
+                    self._remove(entry.path)
+            elif entry.name.endswith(SUFFIX):
+                entries.append((st.st_mtime, st.st_size, entry.path))
+        total = sum(size for _mtime, size, _path in entries)
+        if total + incoming <= self.max_bytes:
+            return
+        target = self.max_bytes * EVICT_TARGET - incoming
+        for _mtime, size, path in sorted(entries):
+            if total <= target:
+                break
+            # Unter POSIX bleiben noch abgebildete Kopien bis zum Schließen lesbar
+            if self._remove(path):
+                total -= size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.unlink(path)
+            return True
+        except OSError:
+            return False
+
+    def stats(self):
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "directory": self.directory,
+                "max_bytes": self.max_bytes,
+                "copies": self.copies,
+                "copied_bytes": self.copied_bytes,
+            }
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Stapel-Export für myTinyDesk
+Rendert einen Seitenbereich ohne GUI als PNG, JPEG oder WebP über denselben
+Render-Pfad wie der Viewer, die Bilder entsprechen also der Anzeige.
+
+Gerendert wird in einem Prozess-Pool (Standard: ein Prozess pro verfügbarem
+Kern), jeder Prozess öffnet das Dokument einmal selbst. Die Prozesse
+schreiben ihre Bilder direkt auf die Platte und melden nur Kennzahlen
+zurück; es sind höchstens zwei Seiten pro Prozess gleichzeitig in Arbeit
+und der PyMuPDF-Store jedes Prozesses wird begrenzt, der Speicherbedarf
+hängt also nicht von der Seitenzahl ab.
+
+Verwendung:
+    python export.py dokument.pdf --pages 1-200 --dpi 150 --format png --out bilder/
+    python export.py scan.pdf --format jpeg --quality 85 --workers 4 --json bericht.json
+"""
+
+import argparse
+import concurrent.futures
+import io
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from PIL import features
+import fitz  # PyMuPDF
+
+from document_io import DocumentLoader
+from instrumentation import summarize
+from memory_budget import limit_fitz_store, peak_rss_bytes
+from rendering import parse_pages, pixmap_image, render_page_pixmap
+
+# Ausgabeformat -> (Dateiendung, PIL-Format); PNG kodiert PyMuPDF selbst
+FORMATS = {
+    "png": ("png", None),
+    "jpeg": ("jpg", "JPEG"),
+    "jpg": ("jpg", "JPEG"),
+    "webp": ("webp", "WEBP"),
+}
+
+# PDF-Einheiten pro Zoll (Zoom 1.0 entspricht 72 DPI)
+POINTS_PER_INCH = 72
+# Aufträge pro Prozess, die gleichzeitig unterwegs sind
+IN_FLIGHT_PER_WORKER = 2
+# Obergrenze des PyMuPDF-Stores pro Prozess (Fonts, Bilder)
+STORE_LIMIT = 64 * 1024 * 1024
+
+# Zustand eines Pool-Prozesses (von _init_worker gesetzt)
+_doc = None
+_options = None
+
+
+def default_workers():
+    """Anzahl der für diesen Prozess verfügbaren Kerne"""
+    if hasattr(os, "sched_getaffinity"):
+        return max(1, len(os.sched_getaffinity(0)))
+    return max(1, os.cpu_count() or 1)
+
+
+def output_name(stem, page_index, page_count, extension):
+    """Dateiname einer Seite, Seitennummern mit führenden Nullen (sortierbar)"""
+    digits = len(str(page_count))
+    return f"{stem}-{page_index + 1:0{digits}d}.{extension}"
+
+
+def encode(pix, fmt, quality=90):
+    """Kodiert eine Pixmap im Ausgabeformat"""
+    _extension, pil_format = FORMATS[fmt]
+    if pil_format is None:
+        return pix.tobytes("png")
+    buffer = io.BytesIO()
+    pixmap_image(pix).save(buffer, pil_format, quality=quality)
+    return buffer.getvalue()
+
+
+def write_atomic(path, data):
+    """Schreibt über eine temporäre Datei, abgebrochene Exporte hinterlassen keine halben Bilder"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _init_worker(pdf_path, options):
+    global _doc, _options
+    # Netzlaufwerke wie im Viewer über die gemeinsame lokale Kopie
+    _doc = DocumentLoader.from_environment().open(pdf_path)[0]
+    _options = options
+
+
+def _export_page(page_index, path):
+    """Rendert und schreibt eine Seite im Pool-Prozess, liefert nur Kennzahlen"""
+    timings = {}
+    pix = render_page_pixmap(_doc, page_index, _options["zoom"], gray=_options["gray"],
+                             timings=timings)
+    start = time.perf_counter()
+    data = encode(pix, _options["format"], _options["quality"])
+    encoded = time.perf_counter()
+    write_atomic(path, data)
+    timings["encode"] = encoded - start
+    timings["write"] = time.perf_counter() - encoded
+    limit_fitz_store(_options["store_limit"])
+    return page_index, len(data), timings
+
+
+def export_pages(pdf_path, out_dir, pages=None, dpi=150, fmt="png", quality=90, gray=False,
+                 workers=None, on_progress=None, store_limit=STORE_LIMIT):
+    """Exportiert Seiten (0-basierte Indizes, None = alle) parallel als Bilder
+
+    `on_progress(fertig, gesamt, Pfad)` wird nach jeder geschriebenen Seite
+    aufgerufen. Liefert einen Bericht mit Seiten, Bytes, Dauer, Seiten/s
+    und den Phasendauern (rasterize/encode/write) als Perzentile.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unbekanntes Format: {fmt}")
+    if fmt == "webp" and not features.check("webp"):
+        raise ValueError("Pillow wurde ohne WebP-Unterstützung gebaut")
+
+    with fitz.open(pdf_path) as doc:
+        page_count = len(doc)
+    pages = list(range(page_count)) if pages is None else list(pages)
+    workers = max(1, min(workers or default_workers(), len(pages) or 1))
+    os.makedirs(out_dir, exist_ok=True)
+
+    extension = FORMATS[fmt][0]
+    stem = os.path.splitext(os.path.basename(pdf_path))[0]
+    options = {"zoom": dpi / POINTS_PER_INCH, "format": fmt, "quality": quality, "gray": gray,
+               "store_limit": store_limit}
+    paths = {index: os.path.join(out_dir, output_name(stem, index, page_count, extension))
+             for index in pages}
+
+    stage_samples = {"load": [], "rasterize": [], "encode": [], "write": []}
+    total_bytes = 0
+    done = 0
+    start = time.perf_counter()
+
+    # spawn: gleiches Verhalten unter Linux, macOS und Windows, kein geerbter MuPDF-Zustand
+    context = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                                                initargs=(pdf_path, options)) as pool:
+        queued = iter(pages)
+        pending = set()
+        try:
+            while True:
+                # Nur begrenzt viele Seiten gleichzeitig in Arbeit halten
+                while len(pending) < workers * IN_FLIGHT_PER_WORKER:
+                    index = next(queued, None)
+                    if index is None:
+                        break
+                    pending.add(pool.submit(_export_page, index, paths[index]))
+                if not pending:
+                    break
+                finished, pending = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in finished:
+                    index, size, timings = future.result()
+                    total_bytes += size
+                    done += 1
+                    for stage, seconds in timings.items():
+                        stage_samples.setdefault(stage, []).append(seconds)
+                    if on_progress:
+                        on_progress(done, len(pages), paths[index])
+        except BaseException:
+            for future in pending:
+                future.cancel()
+            raise
+
+    elapsed = time.perf_counter() - start
+    return {
+        "file": pdf_path,
+        "out_dir": out_dir,
+        "format": fmt,
+        "dpi": dpi,
+        "workers": workers,
+        "pages": done,
+        "bytes": total_bytes,
+        "seconds": round(elapsed, 3),
+        "pages_per_second": round(done / elapsed, 2) if elapsed else 0.0,
+        "stages": {stage: summarize(values) for stage, values in stage_samples.items() if values},
+        # Größter Pool-Prozess (beendete Kindprozesse)
+        "worker_peak_rss_bytes": peak_rss_bytes(children=True),
+    }
+
+
+def print_progress(done, total, path):
+    # Eine Zeile, die sich selbst überschreibt (stderr, stdout bleibt für --json -)
+    sys.stderr.write(f"\r{done}/{total} Seiten ({done * 100 // total}%) {os.path.basename(path)}   ")
+    if done == total:
+        sys.stderr.write("\n")
+    sys.stderr.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="myTinyDesk Stapel-Export (Seiten als Bilder)")
+    parser.add_argument("pdf", help="PDF-Datei")
+    parser.add_argument("--pages", default="", help='Seitenbereich, z.B. "1-20,25" (Standard: alle)')
+    parser.add_argument("--dpi", type=float, default=150, help="Auflösung (Standard: 150)")
+    parser.add_argument("--format", default="png", choices=sorted(FORMATS), help="Bildformat")
+    parser.add_argument("--quality", type=int, default=90, help="Qualität für JPEG/WebP (1-100)")
+    parser.add_argument("--gray", action="store_true", help="In Graustufen rendern")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Anzahl der Prozesse (Standard: verfügbare Kerne)")
+    parser.add_argument("--out", help="Zielordner (Standard: <Dateiname>-export)")
+    parser.add_argument("--quiet", action="store_true", help="Keinen Fortschritt ausgeben")
+    parser.add_argument("--json", metavar="DATEI", help='Bericht als JSON schreiben ("-" = stdout)')
+    args = parser.parse_args(argv)
+
+    with fitz.open(args.pdf) as doc:
+        pages = parse_pages(args.pages, len(doc))
+    out_dir = args.out or os.path.splitext(os.path.basename(args.pdf))[0] + "-export"
+    try:
+        report = export_pages(args.pdf, out_dir, pages, args.dpi, args.format, args.quality,
+                              args.gray, args.workers or None,
+                              on_progress=None if args.quiet else print_progress)
+    except KeyboardInterrupt:
+        print("\nExport abgebrochen", file=sys.stderr)
+        return 130
+
+    if args.json:
+        text = json.dumps(report, indent=2)
+        if args.json == "-":
+            print(text)
+        else:
+            with open(args.json, "w", encoding="utf-8") as f:
+                f.write(text)
+    if args.json != "-":
+        print(f"{report['pages']} Seiten nach {report['out_dir']} in {report['seconds']:.2f} s "
+              f"({report['pages_per_second']:.1f} Seiten/s, {report['workers']} Prozesse, "
+              f"{report['bytes'] / 1024 / 1024:.1f} MB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
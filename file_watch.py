@@ -0,0 +1,331 @@
+"""
+Dateiüberwachung für myTinyDesk
+Erkennt Änderungen an geöffneten Dateien und lädt sie im Hintergrund neu.
+Unter Linux meldet inotify (über ctypes) Änderungen im Ordner der Datei
+sofort; auf anderen Systemen und auf Netzlaufwerken, wo inotify Änderungen
+anderer Rechner nicht sieht, werden Größe und Änderungszeit abgefragt.
+Gemeldet wird erst, wenn sich die Datei eine Weile nicht mehr ändert
+(Schreiber wie LaTeX oder Scanner schreiben in mehreren Schritten).
+
+Beim Neuladen wird pro Seite ein Fingerabdruck des Inhalts verglichen:
+Content-Stream, Bilder, Form-XObjects, Schriftnamen, Annotationen und Verweise.
+Nur Seiten mit geändertem Fingerabdruck werden neu gerendert.
+
+Umgebungsvariablen:
+    MYTINYDESK_WATCH           "1" überwacht geöffnete Dateien (Standard: 0)
+    MYTINYDESK_WATCH_POLL_MS   Abfrageintervall ohne inotify (Standard: 1000)
+"""
+
+import ctypes
+import hashlib
+import os
+import queue
+import select
+import struct
+import sys
+import threading
+import time
+
+from lazy_import import lazy_import
+from disk_cache import file_fingerprint
+from document_io import filesystem_type, is_network_filesystem
+
+fitz = lazy_import("fitz")  # PyMuPDF
+
+# So lange muss eine geänderte Datei unverändert bleiben, bevor sie neu geladen wird (Sekunden)
+WATCH_SETTLE = 0.3
+
+
+def file_state(path):
+    """Größe und Änderungszeit einer Datei, None falls sie (gerade) fehlt"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns, st.st_ino
+
+
+def page_fingerprint(doc, page_index):
+    """Fingerabdruck des Inhalts einer Seite, unabhängig von Objektnummern
+
+    Erzeugt z.B. LaTeX die Datei neu, ändern sich die Objektnummern aller
+    Seiten; verglichen werden deshalb die Daten selbst. Verschachtelte
+    Ressourcen von Form-XObjects gehen nicht ein.
+    """
+    page = doc[page_index]
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((tuple(page.rect), page.rotation)).encode())
+    digest.update(page.read_contents())
+    for image in page.get_images(full=True):
+        digest.update(doc.xref_stream_raw(image[0]) or b"")
+    for xobject in page.get_xobjects():
+        digest.update(doc.xref_stream_raw(xobject[0]) or b"")
+    for font in page.get_fonts(full=True):
+        digest.update(font[3].encode())
+    for annot in page.annots():
+        digest.update(repr((annot.type, tuple(annot.rect), annot.info.get("content"))).encode())
+    # annots() liefert keine Link-Annotationen: Verweise mit Bereich und Ziel getrennt
+    for link in page.get_links():
+        to = link.get("to")
+        digest.update(repr((link.get("kind"), tuple(link["from"]), link.get("page"),
+                            None if to is None else tuple(to), link.get("uri"), link.get("file"),
+                            link.get("name"))).encode())
+    return digest.digest()
+
+
+def changed_pages(old, new):
+    """Indizes der Seiten, die sich geändert haben, hinzugekommen oder weggefallen sind"""
+    if old is None:
+        return set(range(len(new)))
+    changed = {index for index in range(min(len(old), len(new))) if old[index] != new[index]}
+    changed.update(range(min(len(old), len(new)), max(len(old), len(new))))
+    return changed
+
+
+class Inotify:
+    """Minimaler Zugriff auf inotify über ctypes (nur Linux)"""
+
+    IN_MODIFY = 0x002
+    IN_ATTRIB = 0x004
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    EVENT = struct.Struct("iIII")
+
+    def __init__(self, libc, fd):
+        self.libc = libc
+        self.fd = fd
+
+    @classmethod
+    def create(cls):
+        """Liefert None, wenn inotify nicht verfügbar ist"""
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            libc = ctypes.CDLL(None, use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        except (OSError, AttributeError):
+            return None
+        return cls(libc, fd) if fd >= 0 else None
+
+    def add(self, directory):
+        """Überwacht einen Ordner, liefert den Watch-Deskriptor oder None"""
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), self.MASK)
+        return wd if wd >= 0 else None
+
+    def remove(self, wd):
+        self.libc.inotify_rm_watch(self.fd, wd)
+
+    def read(self):
+        """Liest alle anstehenden Ereignisse als Menge von (Watch-Deskriptor, Dateiname)"""
+        events = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return events
+            offset = 0
+            while offset + self.EVENT.size <= len(data):
+                wd, _mask, _cookie, length = self.EVENT.unpack_from(data, offset)
+                offset += self.EVENT.size
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+                events.add((wd, os.fsdecode(name)))
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FileWatcher(threading.Thread):
+    """Meldet geänderte Dateien als Dokument-ID in `changes`
+
+    Überwacht wird der Ordner der Datei, damit auch Ersetzen per Umbenennen
+    (atomares Schreiben) erkannt wird. Dateien ohne inotify werden alle
+    `poll_interval` Sekunden abgefragt.
+    """
+
+    def __init__(self, poll_interval=1.0, settle=WATCH_SETTLE):
+        super().__init__(name="mytinydesk-watch", daemon=True)
+        self.poll_interval = poll_interval
+        self.settle = settle
+        self.changes = queue.Queue()
+        self._lock = threading.Lock()
+        self._stopped = False
+        self._inotify = Inotify.create()
+        # Dokument-ID -> [Pfad, gemeldeter Zustand, (neuer Zustand, seit), per inotify]
+        self._files = {}
+        # Ordner -> Watch-Deskriptor
+        self._dirs = {}
+
+    @classmethod
+    def from_environment(cls):
+        if os.environ.get("MYTINYDESK_WATCH", "0") != "1":
+            return None
+        return cls(int(os.environ.get("MYTINYDESK_WATCH_POLL_MS", "1000")) / 1000)
+
+    @property
+    def uses_inotify(self):
+        return self._inotify is not None
+
+    def watch(self, doc_id, pdf_path, state=None):
+        """Überwacht eine Datei ab dem Zustand `state` (Standard: jetziger Zustand)"""
+        pdf_path = os.path.abspath(pdf_path)
+        directory = os.path.dirname(pdf_path)
+        notified = False
+        with self._lock:
+            if self._inotify and not is_network_filesystem(filesystem_type(directory)):
+                wd = self._dirs.get(directory)
+                if wd is None:
+                    wd = self._inotify.add(directory)
+                if wd is not None:
+                    self._dirs[directory] = wd
+                    notified = True
+            self._files[doc_id] = [pdf_path, state or file_state(pdf_path), None, notified]
+
+    def unwatch(self, doc_id):
+        with self._lock:
+            entry = self._files.pop(doc_id, None)
+            if entry is None:
+                return
+            directory = os.path.dirname(entry[0])
+            if directory in self._dirs and not any(os.path.dirname(f[0]) == directory
+                                                   for f in self._files.values()):
+                self._inotify.remove(self._dirs.pop(directory))
+
+    def stop(self):
+        self._stopped = True
+
+    def run(self):
+        next_poll = time.monotonic() + self.poll_interval
+        recheck = None
+        try:
+            while not self._stopped:
+                now = time.monotonic()
+                deadline = min(next_poll, recheck) if recheck else next_poll
+                timeout = max(0.0, min(deadline - now, self.poll_interval))
+                if self._inotify:
+                    ready, _w, _x = select.select([self._inotify.fd], [], [], timeout)
+                    if ready:
+                        self._on_events(self._inotify.read())
+                        recheck = recheck or time.monotonic() + self.settle
+                        continue
+                else:
+                    time.sleep(timeout)
+                if self._stopped:
+                    break
+
+                now = time.monotonic()
+                polling = now >= next_poll
+                if polling:
+                    next_poll = now + self.poll_interval
+                if polling or (recheck and now >= recheck):
+                    recheck = self._check(polling)
+        finally:
+            if self._inotify:
+                self._inotify.close()
+
+    def _on_events(self, events):
+        # Nur Ereignisse zu überwachten Dateien lösen eine Prüfung aus
+        with self._lock:
+            for entry in self._files.values():
+                if (self._dirs.get(os.path.dirname(entry[0])), os.path.basename(entry[0])) in events:
+                    entry[2] = entry[2] or (entry[1], time.monotonic())
+
+    def _check(self, polling):
+        """Prüft die Dateien, liefert den Zeitpunkt der nächsten Prüfung oder None"""
+        now = time.monotonic()
+        recheck = None
+        with self._lock:
+            for doc_id, entry in self._files.items():
+                pdf_path, reported, pending, notified = entry
+                if pending is None and notified and not polling:
+                    continue
+                state = file_state(pdf_path)
+                if state is None or state == reported:
+                    entry[2] = None
+                    if state is None:
+                        # Gerade ersetzt/gelöscht: später erneut prüfen
+                        recheck = now + self.settle
+                    continue
+                if pending is not None and pending[0] == state and now - pending[1] >= self.settle:
+                    # Lange genug unverändert: melden
+                    entry[1] = state
+                    entry[2] = None
+                    self.changes.put(doc_id)
+                    continue
+                if pending is None or pending[0] != state:
+                    entry[2] = (state, now)
+                recheck = now + self.settle
+        return recheck
+
+
+class DocumentReloader(threading.Thread):
+    """Öffnet eine Datei abseits der Tk-Hauptschleife neu und vergleicht die Seiten
+
+    Mit `reload=False` werden nur die Fingerabdrücke der Seiten ermittelt
+    (Ausgangszustand nach dem Öffnen), sonst wird mit `previous` verglichen;
+    ohne `previous` gelten alle Seiten als geändert. Ändert sich die Datei
+    während des Lesens, endet der Thread ohne Meldung (der Watcher meldet
+    die neue Fassung). Meldungen in `results`:
+        ("fingerprints", Dateizustand, Fingerabdrücke)
+        ("reloaded", Dokument, Dateizustand, Fingerabdrücke, geänderte Seiten,
+         Fingerabdruck der Datei, Phasendauern)
+        ("error", Fehler)
+    Das Dokument gehört nach "reloaded" dem Tk-Thread. Nach cancel() wird
+    es stattdessen geschlossen.
+    """
+
+    def __init__(self, pdf_path, previous=None, reload=True, loader=None, fingerprint_file=False):
+        super().__init__(name="mytinydesk-reload", daemon=True)
+        self.pdf_path = pdf_path
+        self.results = queue.Queue()
+        self.previous = previous
+        self.reload = reload
+        self.loader = loader
+        self.fingerprint_file = fingerprint_file
+        self.cancelled = False
+        # Übergabe des Dokuments und cancel() schließen einander aus
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        """Bricht ab; danach landet kein Dokument mehr in `results`"""
+        with self._lock:
+            self.cancelled = True
+
+    def run(self):
+        timings = {}
+        doc = None
+        try:
+            state = file_state(self.pdf_path)
+            start = time.perf_counter()
+            doc = self.loader.open(self.pdf_path)[0] if self.loader else fitz.open(self.pdf_path)
+            timings["open"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            fingerprints = []
+            for index in range(len(doc)):
+                if self.cancelled:
+                    return
+                fingerprints.append(page_fingerprint(doc, index))
+            timings["fingerprint"] = time.perf_counter() - start
+            if file_state(self.pdf_path) != state:
+                # Während des Lesens erneut geändert: der Watcher meldet sich wieder
+                return
+
+            if not self.reload:
+                self.results.put(("fingerprints", state, fingerprints))
+                return
+            fingerprint = file_fingerprint(self.pdf_path) if self.fingerprint_file else None
+            changed = changed_pages(self.previous, fingerprints)
+            with self._lock:
+                if self.cancelled:
+                    return
+                self.results.put(("reloaded", doc, state, fingerprints, changed, fingerprint, timings))
+                doc = None
+        except Exception as e:
+            self.results.put(("error", e))
+        finally:
+            if doc is not None:
+                doc.close()
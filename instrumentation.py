@@ -0,0 +1,168 @@
+"""
+Instrumentierung für myTinyDesk
+Erfasst die Dauer der Render-Phasen, schreibt sie optional in ein rollierendes
+JSON-Log und startet auf Wunsch cProfile/tracemalloc per Umgebungsvariable.
+
+Umgebungsvariablen:
+    MYTINYDESK_PERF_LOG      Pfad des JSON-Logs (eine Zeile pro Ereignis)
+    MYTINYDESK_PERF_OVERLAY  "1" blendet die Zeiten in der Statusleiste ein
+    MYTINYDESK_PROFILE       "cprofile", "tracemalloc" oder "all"
+    MYTINYDESK_PROFILE_DIR   Zielordner für Profile (Standard: Temp-Ordner)
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import statistics
+import tempfile
+import time
+from collections import deque
+
+# Rollierendes Log: Größe pro Datei und Anzahl der Vorgänger-Dateien
+LOG_MAX_BYTES = 1024 * 1024
+LOG_BACKUPS = 3
+
+
+def stage_ms(timings):
+    """Wandelt Phasendauern in Sekunden in gerundete Millisekunden um"""
+    return {f"{stage}_ms": round(seconds * 1000, 2) for stage, seconds in timings.items()}
+
+
+def percentile(values, q):
+    """Perzentil mit linearer Interpolation (q zwischen 0 und 100)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * q / 100
+    low = int(pos)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
+
+
+def summarize(samples):
+    """p50/p95/p99/Mittel in Millisekunden für eine Liste von Sekunden"""
+    ms = [v * 1000 for v in samples]
+    return {
+        "count": len(ms),
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+        "mean_ms": round(statistics.fmean(ms), 3) if ms else 0.0,
+    }
+
+
+# Cache-Anteile eines Speicherberichts (MyTinyDesk.memory_usage)
+MEMORY_CACHE_KEYS = ("render_cache", "display_lists", "fitz_store", "thumbnails", "search_index",
+                     "word_index")
+
+
+def memory_cache_bytes(memory):
+    """Summe der Cache-Anteile eines Speicherberichts (unbekannte Anteile zählen 0)"""
+    return sum(memory.get(key) or 0 for key in MEMORY_CACHE_KEYS)
+
+
+class Instrumentation:
+    """Sammelt Render-/Öffnen-Ereignisse mit Phasendauern"""
+
+    def __init__(self, log_path=None, history=200):
+        self.recent = deque(maxlen=history)
+        self.logger = None
+        if log_path:
+            self.logger = logging.getLogger("mytinydesk.perf")
+            self.logger.setLevel(logging.INFO)
+            self.logger.propagate = False
+            handler = logging.handlers.RotatingFileHandler(
+                log_path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self.logger.addHandler(handler)
+
+    @classmethod
+    def from_environment(cls):
+        return cls(log_path=os.environ.get("MYTINYDESK_PERF_LOG"))
+
+    def record(self, event, **fields):
+        """Legt ein Ereignis ab (und schreibt es ins Log, falls aktiv)"""
+        entry = {"ts": round(time.time(), 3), "event": event}
+        entry.update(fields)
+        self.recent.append(entry)
+        if self.logger:
+            self.logger.info(json.dumps(entry, ensure_ascii=False))
+        return entry
+
+    def last(self, event):
+        """Letztes Ereignis eines Typs oder None"""
+        for entry in reversed(self.recent):
+            if entry["event"] == event:
+                return entry
+        return None
+
+    def overlay_text(self, cache_stats, memory=None):
+        """Kurzfassung des letzten Renderns (und des Speichers) für die Statusleiste"""
+        entry = self.last("render")
+        hits, misses = cache_stats["hits"], cache_stats["misses"]
+        rate = hits / (hits + misses) if hits + misses else 0.0
+        text = f"Cache {rate:.0%}"
+        if memory and memory.get("rss") is not None:
+            text += f" | RAM {memory['rss'] / 1024 / 1024:.0f} MB"
+            if memory.get("budget"):
+                caches_mb = memory_cache_bytes(memory) / 1024 / 1024
+                text += f" (Caches {caches_mb:.0f}/{memory['budget'] / 1024 / 1024:.0f} MB)"
+        if entry is None:
+            return f"⏱ {text}"
+        stages = " ".join(f"{key[:-3]} {value:.0f}" for key, value in entry.items()
+                          if key.endswith("_ms") and key != "total_ms")
+        return f"⏱ S.{entry['page']} {entry.get('total_ms', 0):.0f} ms ({stages}) | {text}"
+
+
+class Profiler:
+    """cProfile und/oder tracemalloc, aktiviert über MYTINYDESK_PROFILE
+
+    Gemessen wird der Tk-Hauptthread; die Ergebnisse werden beim Beenden
+    des Prozesses in MYTINYDESK_PROFILE_DIR geschrieben.
+    """
+
+    def __init__(self, mode, out_dir=None):
+        self.mode = mode
+        self.out_dir = out_dir or tempfile.gettempdir()
+        self.profile = None
+        self.tracing = False
+
+    @classmethod
+    def from_environment(cls):
+        mode = os.environ.get("MYTINYDESK_PROFILE", "").strip().lower()
+        if not mode:
+            return None
+        profiler = cls(mode, os.environ.get("MYTINYDESK_PROFILE_DIR"))
+        profiler.start()
+        atexit.register(profiler.stop)
+        return profiler
+
+    def start(self):
+        if self.mode in ("cprofile", "all", "1"):
+            import cProfile
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        if self.mode in ("tracemalloc", "all", "1"):
+            import tracemalloc
+            tracemalloc.start(25)
+            self.tracing = True
+
+    def stop(self):
+        """Beendet die Messung und schreibt die Ergebnisdateien"""
+        base = os.path.join(self.out_dir, f"mytinydesk-{os.getpid()}")
+        if self.profile is not None:
+            self.profile.disable()
+            self.profile.dump_stats(base + ".prof")
+            self.profile = None
+        if self.tracing:
+            import tracemalloc
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.tracing = False
+            with open(base + "-tracemalloc.txt", "w", encoding="utf-8") as f:
+                f.write(f"Aktuell: {current / 1024:.0f} KB, Spitze: {peak / 1024:.0f} KB\n\n")
+                for stat in snapshot.statistics("lineno")[:30]:
+                    f.write(f"{stat}\n")
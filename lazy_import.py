@@ -0,0 +1,45 @@
+"""
+Verzögerte Imports für myTinyDesk
+PyMuPDF und PIL machen den Großteil der Startzeit und des Speichers eines
+leeren Fensters aus. Module binden sie deshalb als Platzhalter, der das
+echte Modul erst beim ersten Attributzugriff (z.B. `fitz.open`) lädt.
+"""
+
+import importlib
+import sys
+import threading
+
+_lock = threading.Lock()
+
+
+class LazyModule:
+    """Platzhalter für ein Modul, geladen beim ersten Attributzugriff"""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        # Import aus mehreren Threads gleichzeitig (Opener, Worker): nur einmal laden
+        with _lock:
+            if self._module is None:
+                self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        module = self._module or self._load()
+        return getattr(module, attr)
+
+    def __repr__(self):
+        state = "geladen" if self._module is not None else "nicht geladen"
+        return f"<LazyModule {self._name} ({state})>"
+
+
+def lazy_import(name):
+    """Modul erst bei Bedarf importieren, z.B. `fitz = lazy_import("fitz")`"""
+    return LazyModule(name)
+
+
+def is_loaded(name):
+    """True, wenn das Modul (z.B. "fitz") bereits geladen wurde"""
+    return name in sys.modules
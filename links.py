@@ -0,0 +1,259 @@
+"""
+Verweise und Inhaltsverzeichnis für myTinyDesk
+Die Verweise einer Seite werden beim ersten Zugriff einmal ausgelesen und in
+Anzeige-Pixeln bei Zoom 1 (mit Rotation) gecacht; Mausbewegung und Klicks
+im Canvas werden damit ohne Zugriff auf MuPDF geprüft. Die Ziele der
+Verweise auf der angezeigten Seite und der Eintrag des Inhaltsverzeichnisses
+unter dem Mauszeiger werden im Hintergrund vorgerendert, Folgen eines
+Verweises zeigt das Ziel dann sofort aus dem Render-Cache.
+
+Das Inhaltsverzeichnis wird erst beim Einblenden gelesen, Unterpunkte erst
+beim Aufklappen in den Baum eingefügt.
+
+Umgebungsvariablen:
+    MYTINYDESK_LINK_PREFETCH   Verweisziele pro Seite, die vorgerendert werden (Standard: 4, 0 = aus)
+"""
+
+import os
+import tkinter as tk
+from collections import OrderedDict
+from tkinter import ttk
+
+from lazy_import import lazy_import
+from rendering import view_point, view_rect, view_transform
+
+fitz = lazy_import("fitz")  # PyMuPDF
+
+# So viele Seiten behält der Verweis-Cache
+LINK_CACHE_PAGES = 256
+# Diese Adressen werden im Browser geöffnet, alle anderen ignoriert
+OPEN_SCHEMES = ("http://", "https://", "mailto:")
+
+
+def link_target(link):
+    """Ziel eines Verweises aus `page.get_links()`
+
+    ("page", Seitenindex, Punkt oder None), ("uri", Adresse) oder None für
+    Ziele, denen der Viewer nicht folgt (andere Dateien, Programme).
+    """
+    kind = link.get("kind")
+    if kind in (fitz.LINK_GOTO, fitz.LINK_NAMED) and link.get("page", -1) >= 0:
+        return ("page", link["page"], link.get("to"))
+    if kind == fitz.LINK_URI and link.get("uri"):
+        return ("uri", link["uri"])
+    return None
+
+
+def page_links(page, rotation=0):
+    """Verweise einer Seite als Liste von ((x0, y0, x1, y1) bei Zoom 1, Ziel)"""
+    # get_links() liefert Koordinaten der gedrehten Seite (/Rotate), view_transform erwartet ungedrehte
+    transform = view_transform(page, rotation)
+    links = []
+    for link in page.get_links():
+        target = link_target(link)
+        if target is not None:
+            links.append((view_rect(fitz.Rect(link["from"]) * page.derotation_matrix, transform), target))
+    return links
+
+
+def target_offset(doc, page_index, point, rotation=0):
+    """Senkrechte Position eines Zielpunkts in Pixeln bei Zoom 1, None ohne Punkt"""
+    if point is None:
+        return None
+    page = doc[page_index]
+    point = fitz.Point(point) * page.derotation_matrix
+    return max(0.0, view_point(point, view_transform(page, rotation))[1])
+
+
+def is_openable(uri):
+    return uri.lower().startswith(OPEN_SCHEMES)
+
+
+class LinkCache:
+    """Verweise der zuletzt benutzten Seiten, Schlüssel (Dokument-ID, Seite, Rotation)
+
+    Gelesen wird nur im Tk-Thread mit dem Dokument der UI; das Auslesen
+    einer Seite dauert weniger als eine Millisekunde.
+    """
+
+    def __init__(self, max_pages=LINK_CACHE_PAGES, prefetch=4):
+        self.max_pages = max_pages
+        self.prefetch = prefetch
+        self._links = OrderedDict()
+
+    @classmethod
+    def from_environment(cls):
+        return cls(prefetch=int(os.environ.get("MYTINYDESK_LINK_PREFETCH", "4")))
+
+    def get(self, doc, doc_id, page_index, rotation=0):
+        key = (doc_id, page_index, rotation)
+        links = self._links.get(key)
+        if links is None:
+            links = page_links(doc[page_index], rotation)
+            self._links[key] = links
+            while len(self._links) > self.max_pages:
+                self._links.popitem(last=False)
+        else:
+            self._links.move_to_end(key)
+        return links
+
+    def hit(self, doc, doc_id, page_index, x, y, rotation=0):
+        """Ziel des Verweises an (x, y) in Pixeln bei Zoom 1 oder None"""
+        for (x0, y0, x1, y1), target in self.get(doc, doc_id, page_index, rotation):
+            if x0 <= x <= x1 and y0 <= y <= y1:
+                return target
+        return None
+
+    def targets(self, doc, doc_id, page_index, rotation=0):
+        """Seiten, auf die eine Seite verweist (ohne sie selbst), höchstens `prefetch`"""
+        if self.prefetch <= 0:
+            return []
+        pages = []
+        for _rect, target in self.get(doc, doc_id, page_index, rotation):
+            if target[0] == "page" and target[1] != page_index and target[1] not in pages:
+                pages.append(target[1])
+                if len(pages) >= self.prefetch:
+                    break
+        return pages
+
+    def invalidate(self, doc_id, pages=None):
+        """Verwirft die Verweise eines Dokuments (oder nur der Seiten `pages`)"""
+        for key in [key for key in self._links if key[0] == doc_id and (pages is None or key[1] in pages)]:
+            del self._links[key]
+
+
+class OutlinePanel:
+    """Inhaltsverzeichnis als Baum links neben dem Canvas
+
+    Gelesen wird `get_toc()` einmal pro Dokument beim ersten Einblenden;
+    eingefügt werden zunächst nur die oberste Ebene, Unterpunkte beim
+    Aufklappen (ein Platzhalter sorgt für das Aufklapp-Symbol).
+    `on_select(Seitenindex, Punkt)` meldet einen angeklickten Eintrag,
+    `on_hover(Seitenindex)` den Eintrag unter dem Mauszeiger.
+    """
+
+    def __init__(self, parent, on_select, on_hover):
+        self.on_select = on_select
+        self.on_hover = on_hover
+        self.frame = tk.Frame(parent, bg="#ecf0f1")
+        self.tree = ttk.Treeview(self.frame, show="tree", selectmode="browse")
+        self.tree.column("#0", width=220)
+        scrollbar = ttk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.Y, expand=True)
+        self.empty = tk.Label(self.frame, text="Kein Inhaltsverzeichnis", bg="#ecf0f1", fg="#7f8c8d")
+        self.tree.bind('<<TreeviewOpen>>', self.on_open)
+        self.tree.bind('<<TreeviewSelect>>', self.on_tree_select)
+        self.tree.bind('<Motion>', self.on_motion)
+        self.tree.bind('<Leave>', lambda e: self.clear_hover())
+
+        self.visible = False
+        self.doc_id = None
+        self.doc = None
+        # Dokument-ID -> Einträge von get_toc(simple=False)
+        self.tocs = {}
+        self.entries = []
+        self.hovered = None
+
+    def show(self, before=None):
+        if before is None:
+            self.frame.pack(side=tk.LEFT, fill=tk.Y)
+        else:
+            self.frame.pack(side=tk.LEFT, fill=tk.Y, before=before)
+        self.visible = True
+
+    def hide(self):
+        self.frame.pack_forget()
+        self.visible = False
+
+    def set_document(self, doc_id, doc):
+        """Zeigt das Inhaltsverzeichnis eines Dokuments (liest es beim ersten Mal)"""
+        self.reset()
+        self.doc_id = doc_id
+        self.doc = doc
+        entries = self.tocs.get(doc_id)
+        if entries is None:
+            try:
+                entries = doc.get_toc(simple=False)
+            except Exception:
+                # Defekte Outlines sollen das Dokument nicht unbenutzbar machen
+                entries = []
+            self.tocs[doc_id] = entries
+        self.entries = entries
+        if entries:
+            self.empty.pack_forget()
+            self.insert_children("", -1)
+        else:
+            self.empty.pack(side=tk.TOP, pady=10, before=self.tree)
+
+    def reset(self):
+        children = self.tree.get_children()
+        if children:
+            self.tree.delete(*children)
+        self.doc_id = None
+        self.doc = None
+        self.entries = []
+        self.hovered = None
+
+    def forget_document(self, doc_id):
+        self.tocs.pop(doc_id, None)
+        if self.doc_id == doc_id:
+            self.reset()
+
+    def subtree_end(self, index):
+        """Index hinter dem letzten Unterpunkt des Eintrags `index` (-1 = Wurzel)"""
+        if index < 0:
+            return len(self.entries)
+        level = self.entries[index][0]
+        end = index + 1
+        while end < len(self.entries) and self.entries[end][0] > level:
+            end += 1
+        return end
+
+    def insert_children(self, parent, index):
+        """Fügt die direkten Unterpunkte eines Eintrags ein (-1 = oberste Ebene)"""
+        end = self.subtree_end(index)
+        child = index + 1
+        while child < end:
+            child_end = self.subtree_end(child)
+            iid = str(child)
+            self.tree.insert(parent, tk.END, iid=iid, text=self.entries[child][1])
+            if child_end > child + 1:
+                self.tree.insert(iid, tk.END, iid=iid + "+", text="")
+            child = child_end
+
+    def on_open(self, event=None):
+        iid = self.tree.focus()
+        if iid and self.tree.get_children(iid) == (iid + "+",):
+            self.tree.delete(iid + "+")
+            self.insert_children(iid, int(iid))
+
+    def entry_target(self, iid):
+        """(Seitenindex, Punkt) eines Eintrags, None für Einträge ohne Ziel im Dokument"""
+        if not iid or iid.endswith("+"):
+            return None
+        entry = self.entries[int(iid)]
+        page_index = entry[2] - 1
+        if page_index < 0:
+            return None
+        dest = entry[3] if len(entry) > 3 and isinstance(entry[3], dict) else {}
+        return page_index, dest.get("to") if dest.get("kind") == fitz.LINK_GOTO else None
+
+    def on_tree_select(self, event=None):
+        selection = self.tree.selection()
+        target = self.entry_target(selection[0]) if selection else None
+        if target is not None:
+            self.on_select(*target)
+
+    def on_motion(self, event):
+        iid = self.tree.identify_row(event.y)
+        if iid == self.hovered:
+            return
+        self.hovered = iid
+        target = self.entry_target(iid)
+        if target is not None:
+            self.on_hover(target[0])
+
+    def clear_hover(self):
+        self.hovered = None
@@ -1,24 +1,267 @@
+import time
+
+# Startzeitpunkt für das Ereignis "startup" (vor allen weiteren Imports)
+STARTED = time.perf_counter()
+
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-from pathlib import Path
-from PIL import Image, ImageTk
-import fitz  # PyMuPDF
+import argparse
 import io
+import itertools
+import math
+import os
+import queue
+import sys
+import webbrowser
+
+from lazy_import import is_loaded, lazy_import
+from render_cache import RenderCache
+from disk_cache import DiskCache
+from document_io import DocumentLoader
+from render_worker import DocumentOpener, PrefetchWorker, RenderWorker
+from render_daemon import daemon_enabled, socket_path
+from display import make_display
+from file_watch import DocumentReloader, FileWatcher, file_state
+from instrumentation import Instrumentation, Profiler, stage_ms
+from links import LinkCache, OutlinePanel, is_openable, target_offset
+from memory_budget import DOCUMENT_WORKERS, MemoryBudget, current_rss_bytes, fitz_store_size
+from page_layout import PageLayout, PageSizeReader, rotated_sizes
+from quality import QualityGovernor
+from search import SearchBar, TextIndex, TextIndexWorker
+from selection import DRAG_THRESHOLD, TextSelection, WordIndexCache, WordIndexWorker
+from tabs import DocumentTab, TabBar
+from thumbnails import ThumbnailPanel
+from rendering import TILE_SIZE, page_pixel_size, pil_image, tile_grid
+from single_instance import InstanceServer, hand_over, instance_socket_path, single_instance_enabled
+
+# PIL und PyMuPDF werden erst mit dem ersten Dokument geladen
+Image = lazy_import("PIL.Image")
 
 __version__ = "0.4.0"
 
+# Byte-Budget für den Cache gerenderter Seiten (per Umgebungsvariable anpassbar)
+RENDER_CACHE_MB = int(os.environ.get("MYTINYDESK_CACHE_MB", "64"))
+
+# Byte-Budget für interpretierte Seiten (Display-Lists) pro Render-Worker
+DISPLAY_LIST_MB = int(os.environ.get("MYTINYDESK_DISPLAYLIST_MB", "32"))
+
+# Anzahl der im Hintergrund vorgerenderten Seiten vor/hinter der aktuellen Seite
+PREFETCH_AHEAD = int(os.environ.get("MYTINYDESK_PREFETCH_AHEAD", "2"))
+PREFETCH_BEHIND = int(os.environ.get("MYTINYDESK_PREFETCH_BEHIND", "1"))
+
+# Anzeige-Backend: "ppm" (PPM direkt an Tk, PhotoImage wiederverwendet) oder "pil"
+DISPLAY_BACKEND = os.environ.get("MYTINYDESK_DISPLAY", "ppm")
+
+# Abfrageintervall für Ergebnisse des Render-Workers (ms)
+RENDER_POLL_MS = 15
+
+# Abfrageintervall für den Fortschritt beim Öffnen (ms)
+OPEN_POLL_MS = 30
+
+# Ab diesem Zoom wird nur der sichtbare Bereich in Kacheln gerendert
+TILE_ZOOM_THRESHOLD = float(os.environ.get("MYTINYDESK_TILE_ZOOM", "2.0"))
+# Zusätzlich vorgerenderter Rand um den sichtbaren Bereich (Pixel)
+TILE_MARGIN = TILE_SIZE // 2
+
+# Wartezeit nach der letzten Zoom-Taste, bevor scharf gerendert wird (ms)
+ZOOM_SETTLE_MS = 150
+
+# Seitenwechsel mit weniger Abstand gelten als Serie (Tastenwiederholung, ms)
+NAVIGATION_BURST_MS = 120
+# Wartezeit nach dem letzten Seitenwechsel einer Serie, bevor gerendert wird (ms)
+NAVIGATION_SETTLE_MS = 100
+
+# Fortlaufende Ansicht: zusätzlich gerenderte Seiten vor/nach dem Sichtbereich
+CONTINUOUS_WINDOW = 1
+
+# Graustufen statt RGB: ein Drittel des Speichers pro gerenderter Seite
+GRAYSCALE = os.environ.get("MYTINYDESK_GRAYSCALE", "0") == "1"
+
+# Gemeinsamer Render-Dienst des Hosts (render_daemon.py), lokal rendern falls er nicht läuft
+DAEMON_SOCKET = socket_path() if daemon_enabled() else None
+
+# Prüfintervall für Speicherverbrauch und Leerlauf im Speicherbudget-Modus (ms)
+MEMORY_CHECK_MS = 5000
+
+# Miniaturleiste beim Start anzeigen ("0" = ausgeblendet, per Toolbar umschaltbar)
+SHOW_THUMBNAILS = os.environ.get("MYTINYDESK_THUMBNAILS", "1") == "1"
+
+# Render-Zeiten in der Statusleiste einblenden (auch per F12 umschaltbar)
+PERF_OVERLAY = os.environ.get("MYTINYDESK_PERF_OVERLAY", "0") == "1"
+
+# Abfrageintervall für Dateien weiterer Starts im Einzelinstanz-Modus (ms)
+INSTANCE_POLL_MS = 200
+
+# Suchindex im Plattencache ablegen (nur mit MYTINYDESK_DISK_CACHE_DIR)
+SEARCH_PERSIST = os.environ.get("MYTINYDESK_SEARCH_PERSIST", "1") == "1"
+# Abfrageintervall für Fortschritt und Treffer der Suche (ms)
+SEARCH_POLL_MS = 100
+# Rahmenfarbe der Suchtreffer im Canvas
+HIGHLIGHT_COLOR = "#e67e22"
+
+# Farbe der Textauswahl (gerastert, die Seite bleibt lesbar)
+SELECTION_COLOR = "#3498db"
+# Abfrageintervall für Wort-Indizes aus dem Hintergrund (ms)
+WORDS_POLL_MS = 30
+
+# Abfrageintervall für Dateiänderungen und Ergebnisse des Neuladens (ms)
+RELOAD_POLL_MS = 200
+# Abfrageintervall für die Seitengrößen der fortlaufenden Ansicht (ms)
+SIZES_POLL_MS = 50
+
+# So viele Sprünge über Verweise merkt sich Alt+Links pro Tab
+LINK_HISTORY = 50
+
 class MyTinyDesk:
-    def __init__(self, root):
+    def __init__(self, root, instance=None):
         self.root = root
         self.root.title(f"myTinyDesk v{__version__}")
         self.root.geometry("900x700")
         
         self.pdf_document = None
+        self.pdf_path = None
         self.current_page = 0
         self.total_pages = 0
         self.zoom_level = 1.0
+        self.rotation = 0
+        
+        # Terminalserver-Modus: ein Gesamtbudget für alle Caches, die Display-Lists
+        # teilen sich auf alle Worker mit eigenem Dokument-Handle auf
+        document_workers = DOCUMENT_WORKERS if PREFETCH_AHEAD or PREFETCH_BEHIND else DOCUMENT_WORKERS - 1
+        self.memory_budget = MemoryBudget.from_environment(workers=document_workers)
+        self.last_input = time.monotonic()
+        self.purged = False
+        
+        # Cache für gerenderte Seiten, doc_id unterscheidet geöffnete Dokumente (Tabs)
+        if self.memory_budget:
+            self.render_cache = RenderCache(self.memory_budget.render_cache_bytes)
+        else:
+            self.render_cache = RenderCache(RENDER_CACHE_MB * 1024 * 1024)
+        # Optionaler Plattencache, überdauert das Schließen des Viewers
+        self.disk_cache = DiskCache.from_environment()
+        # Zugriff auf die Datei: Netzlaufwerke über eine lokale Kopie
+        self.loader = DocumentLoader.from_environment()
+        self.doc_id = 0
+        self.doc_ids = itertools.count(1)
+        self.prefetcher = None
+        
+        # Tabs: die Felder oben beschreiben immer den aktiven Tab
+        self.tab = None
+        
+        # Asynchrones Rendern: nur das Ergebnis der neuesten Generation wird angezeigt
+        self.render_worker = None
+        self.render_generation = 0
+        self.render_poll_id = None
+        self.idle_status = ""
+        
+        # Adaptive Qualität: beim schnellen Blättern Entwürfe, danach scharf nachrendern
+        self.governor = QualityGovernor.from_environment()
+        self.draft_shown = None
+        self.quality_settle_id = None
+        
+        # Gekachelter Modus bei hohem Zoom: nur sichtbare Kacheln im Canvas
+        self.tiled = False
+        self.tile_items = {}
+        self.wanted_tiles = set()
+        self.tile_page_size = (0, 0)
+        
+        # Fortlaufende Ansicht: Layout aller Seiten, PhotoImages nur im Sichtfenster
+        self.continuous = False
+        self.page_layout = None
+        self.page_layout_key = None
+        self.layout_state = None
+        self.page_items = {}
+        self.wanted_pages = set()
+        # Dokument-ID -> Seitengrößen ohne Drehung, gelesen von PageSizeReader
+        self.page_size_lists = {}
+        self.size_readers = {}
+        self.sizes_poll_id = None
+        
+        # Offene Render-Teile der neuesten Generation, verzögertes Nachladen beim Scrollen
+        self.pending_parts = set()
+        self.view_update_id = None
+        self.scrolled_by_user = False
+        
+        # Sofortige Zoom-Vorschau: skalierte Kopie der zuletzt scharf angezeigten Bitmaps
+        self.shown_image = None
+        self.zoom_render_id = None
+        self.preview_sources = None
+        self.preview_zoom = 1.0
+        self.preview_size = (0, 0)
+        self.preview_photos = []
+        
+        # Blättern: Serien von Seitenwechseln werden zu einem Rendern der Zielseite zusammengefasst
+        self.last_navigation = 0.0
+        self.navigation_id = None
+        
+        # Anzeige-Backend und das wiederverwendete Bild-Item der Einzelseite
+        self.display = make_display(DISPLAY_BACKEND)
+        self.photo = None
+        self.page_image_item = None
+        
+        # Phasendauern je Rendern (Log/Overlay), Anzeige-Phasen werden in der UI ergänzt
+        self.instrumentation = Instrumentation.from_environment()
+        self.profiler = Profiler.from_environment()
+        self.display_timings = {}
+        self.doc_name = ""
+        
+        # Optionen der gemeinsamen Worker aller Tabs (auch für die Miniaturen)
+        self.worker_options = {}
+        
+        # Volltextsuche: ein Textindex pro Dokument, gefüllt von einem Worker für alle Tabs
+        self.text_indexes = {}
+        self.search_worker = None
+        self.search_poll_id = None
+        self.search_query = ""
+        self.search_hits = []
+        self.search_rects = {}
+        self.highlight_request = None
+        
+        # Verweise und Inhaltsverzeichnis: Ziele werden vorgerendert, Alt+Links springt zurück
+        self.link_cache = LinkCache.from_environment()
+        self.link_history = []
+        self.hovered_link = None
+        self.scroll_target = None
+        
+        # Textauswahl: Wort-Indizes pro Seite aus dem Hintergrund, Ziehen fragt nur das Gitter ab
+        self.word_indexes = WordIndexCache()
+        self.word_worker = None
+        self.word_documents = set()
+        self.word_request = None
+        # Dokument-ID -> erste Generation des Wort-Workers nach dem Neuladen
+        self.word_fences = {}
+        self.words_poll_id = None
+        self.selection = None
+        self.selection_view = None
+        self.pressed_link = None
+        self.press_position = None
+        
+        # Dateiüberwachung: geänderte Dateien im Hintergrund neu laden, nur geänderte Seiten rendern
+        self.watcher = FileWatcher.from_environment()
+        self.reloaders = {}
+        self.reload_fences = {}
+        if self.watcher:
+            self.watcher.start()
+        
+        # Öffnen im Hintergrund mit Messung der Zeit bis zur ersten Seite
+        self.opener = None
+        self.open_poll_id = None
+        self.open_started = 0.0
+        self.first_page_ms = None
+        self.first_page_source = None
         
         self.setup_ui()
+        
+        if self.memory_budget:
+            self.root.after(MEMORY_CHECK_MS, self.check_memory)
+        
+        # Einzelinstanz-Modus: Dateien weiterer Starts übernehmen
+        self.instance = instance
+        if instance:
+            self.root.after(INSTANCE_POLL_MS, self.poll_instance)
+        if self.watcher:
+            self.root.after(RELOAD_POLL_MS, self.poll_reload)
+        self.root.after_idle(self.record_startup)
     
     def setup_ui(self):
         # Top Frame - Toolbar
@@ -27,6 +270,7 @@ class MyTinyDesk:
         
         # Buttons im Toolbar
         ttk.Button(toolbar, text="📂 Öffnen", command=self.open_pdf).pack(side=tk.LEFT, padx=5, pady=5)
+        ttk.Button(toolbar, text="✕ Schließen", command=self.close_current_tab).pack(side=tk.LEFT, padx=2, pady=5)
         
         ttk.Button(toolbar, text="◀ Zurück", command=self.previous_page).pack(side=tk.LEFT, padx=2, pady=5)
         
@@ -48,27 +292,86 @@ class MyTinyDesk:
         self.zoom_label = tk.Label(toolbar, text="100%", bg="#2c3e50", fg="white", font=("Arial", 10))
         self.zoom_label.pack(side=tk.LEFT, padx=10)
         
+        tk.Label(toolbar, text="|", bg="#2c3e50", fg="white").pack(side=tk.LEFT, padx=5)
+        
+        # Umschalten zwischen Einzelseite und fortlaufender Ansicht
+        self.continuous_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(toolbar, text="📜 Fortlaufend", variable=self.continuous_var,
+                        command=self.toggle_continuous).pack(side=tk.LEFT, padx=2, pady=5)
+        
+        # Miniaturleiste ein-/ausblenden
+        self.thumbnails_var = tk.BooleanVar(value=SHOW_THUMBNAILS)
+        ttk.Checkbutton(toolbar, text="🖼 Miniaturen", variable=self.thumbnails_var,
+                        command=self.toggle_thumbnails).pack(side=tk.LEFT, padx=2, pady=5)
+        
+        # Inhaltsverzeichnis ein-/ausblenden
+        self.outline_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(toolbar, text="📑 Inhalt", variable=self.outline_var,
+                        command=self.toggle_outline).pack(side=tk.LEFT, padx=2, pady=5)
+        
+        ttk.Button(toolbar, text="🔎 Suchen", command=self.open_search).pack(side=tk.LEFT, padx=2, pady=5)
+        
+        # Tab-Leiste unter der Toolbar, erscheint mit dem ersten Dokument
+        self.toolbar = toolbar
+        self.tab_bar = TabBar(self.root, self.select_tab, self.close_tab)
+        
+        # Suchleiste darunter, eingeblendet mit Strg+F
+        self.search_bar = SearchBar(self.root, self.run_search, self.search_step, self.close_search)
+        
         # Main Frame mit Scrollbar
         main_frame = tk.Frame(self.root)
         main_frame.pack(fill=tk.BOTH, expand=True)
         
+        # Miniaturleiste links, Klick springt zur Seite
+        self.thumbnails = ThumbnailPanel(main_frame, self.goto_index)
+        if self.memory_budget:
+            self.thumbnails.store.max_bytes = self.memory_budget.thumbnail_bytes
+        if SHOW_THUMBNAILS:
+            self.thumbnails.show()
+        
+        # Inhaltsverzeichnis daneben, Zeigen rendert das Ziel vor, Klick springt hin
+        self.outline = OutlinePanel(main_frame, self.follow_link, self.prefetch_link)
+        
         # Canvas für PDF-Anzeige
-        self.canvas = tk.Canvas(main_frame, bg="#34495e")
+        self.canvas = tk.Canvas(main_frame, bg="#34495e", yscrollincrement=20)
         
         # Scrollbars
-        v_scrollbar = tk.Scrollbar(main_frame, orient=tk.VERTICAL, command=self.canvas.yview)
-        h_scrollbar = tk.Scrollbar(main_frame, orient=tk.HORIZONTAL, command=self.canvas.xview)
+        v_scrollbar = tk.Scrollbar(main_frame, orient=tk.VERTICAL, command=self.on_yscroll)
+        self.v_scrollbar = v_scrollbar
+        h_scrollbar = tk.Scrollbar(main_frame, orient=tk.HORIZONTAL, command=self.on_xscroll)
         
         self.canvas.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
         
         v_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         h_scrollbar.pack(side=tk.BOTTOM, fill=tk.X)
         self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.canvas.bind('<Configure>', lambda e: self.schedule_view_update())
+        self.canvas.bind('<MouseWheel>', self.on_mousewheel)
+        self.canvas.bind('<Button-4>', self.on_mousewheel)
+        self.canvas.bind('<Button-5>', self.on_mousewheel)
+        # Verweise: Handcursor beim Überfahren, Klick folgt dem Verweis; Ziehen wählt Text aus
+        self.canvas.bind('<Motion>', self.on_canvas_motion)
+        self.canvas.bind('<ButtonPress-1>', self.on_canvas_press)
+        self.canvas.bind('<B1-Motion>', self.on_canvas_drag)
+        self.canvas.bind('<ButtonRelease-1>', self.on_canvas_release)
         
         # Status Bar
         self.status_bar = tk.Label(self.root, text="Bereit | myTinyDesk", relief=tk.SUNKEN, anchor=tk.W, bg="#ecf0f1")
         self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)
         
+        # Performance-Overlay rechts in der Statusleiste
+        self.perf_label = tk.Label(self.status_bar, text="", bg="#ecf0f1", fg="#7f8c8d")
+        self.perf_visible = False
+        if PERF_OVERLAY:
+            self.toggle_perf_overlay()
+        
+        # Fortschritt und Abbrechen beim Öffnen, ebenfalls rechts in der Statusleiste
+        self.open_frame = tk.Frame(self.status_bar, bg="#ecf0f1")
+        self.open_progress = ttk.Progressbar(self.open_frame, mode="indeterminate", length=120)
+        self.open_progress.pack(side=tk.LEFT, padx=5)
+        ttk.Button(self.open_frame, text="Abbrechen", command=self.cancel_open).pack(side=tk.LEFT)
+        self.root.bind('<Escape>', lambda e: self.cancel_open())
+        
         # Keyboard Shortcuts
         self.root.bind('<Left>', lambda e: self.previous_page())
         self.root.bind('<Right>', lambda e: self.next_page())
@@ -76,6 +379,21 @@ class MyTinyDesk:
         self.root.bind('<Next>', lambda e: self.next_page())  # Page Down
         self.root.bind('<plus>', lambda e: self.zoom_in())
         self.root.bind('<minus>', lambda e: self.zoom_out())
+        self.root.bind('<F12>', lambda e: self.toggle_perf_overlay())
+        self.root.bind('<Control-f>', lambda e: self.open_search())
+        self.root.bind('<F3>', lambda e: self.search_step(1))
+        self.root.bind('<Shift-F3>', lambda e: self.search_step(-1))
+        self.root.bind('<Control-w>', lambda e: self.close_current_tab())
+        self.root.bind('<Control-Tab>', lambda e: self.cycle_tab(1))
+        self.root.bind('<Control-ISO_Left_Tab>', lambda e: self.cycle_tab(-1))  # Strg+Umschalt+Tab (X11)
+        self.root.bind('<Control-Shift-Tab>', lambda e: self.cycle_tab(-1))
+        self.root.bind('<Alt-Left>', lambda e: self.link_back())
+        self.root.bind('<Control-c>', lambda e: self.copy_selection())
+        
+        # Eingaben für die Leerlauferkennung, Minimieren gibt Caches frei
+        self.root.bind('<KeyPress>', lambda e: self.note_input(), add="+")
+        self.root.bind('<ButtonPress>', lambda e: self.note_input(), add="+")
+        self.root.bind('<Unmap>', self.on_unmap)
     
     def open_pdf(self):
         pdf_path = filedialog.askopenfilename(
@@ -83,71 +401,1435 @@ class MyTinyDesk:
             filetypes=[("PDF Dateien", "*.pdf"), ("Alle Dateien", "*.*")]
         )
         
-        if not pdf_path:
-            return
+        if pdf_path:
+            self.open_path(pdf_path)
+    
+    def open_path(self, pdf_path):
+        # Bereits geöffnet: nur zum Tab wechseln
+        for tab in self.tab_bar.tabs:
+            if tab.document and tab.same_file(pdf_path):
+                self.select_tab(tab)
+                return
+        
+        # Laufendes Öffnen abbrechen, der bisherige Tab bleibt geöffnet
+        self.abort_open()
+        self.leave_tab()
         
+        tab = DocumentTab(next(self.doc_ids), pdf_path)
+        if self.watcher:
+            # Änderungen ab jetzt gelten als neue Fassung
+            tab.file_state = file_state(pdf_path)
+        self.tab = tab
+        self.tab_bar.add(tab, after=self.toolbar)
+        self.tab_bar.select(tab)
+        self.load_tab(tab)
+        self.page_label.config(text="/ …")
+        
+        # Öffnen im Hintergrund, die Zeit bis zur ersten Seite wird gemessen
+        self.open_started = time.perf_counter()
+        self.first_page_ms = None
+        self.first_page_source = None
+        self.opener = DocumentOpener(pdf_path, self.zoom_level, self.rotation, GRAYSCALE,
+                                     self.disk_cache, self.loader)
+        self.opener.start()
+        self.status_bar.config(text=f"⏳ Öffne {self.doc_name}...")
+        self.open_progress.start(15)
+        self.open_frame.place(relx=1.0, rely=0.5, anchor="e")
+        self.open_poll_id = self.root.after(OPEN_POLL_MS, self.poll_open)
+    
+    def poll_open(self):
+        self.open_poll_id = None
+        opener = self.opener
+        if opener is None:
+            return
         try:
-            # Altes PDF schließen
-            if self.pdf_document:
-                self.pdf_document.close()
-            
-            # Neues PDF laden
-            self.pdf_document = fitz.open(pdf_path)
-            self.total_pages = len(self.pdf_document)
-            self.current_page = 0
-            self.zoom_level = 1.0
-            
-            file_name = Path(pdf_path).name
-            self.root.title(f"myTinyDesk - {file_name}")
-            self.status_bar.config(text=f"✓ Geladen: {file_name} | {self.total_pages} Seiten")
-            
-            self.render_page()
-            
-        except Exception as e:
-            messagebox.showerror("Fehler", f"Konnte PDF nicht öffnen:\n{str(e)}")
-            self.status_bar.config(text="✗ Fehler beim Laden")
+            while True:
+                message = opener.results.get_nowait()
+                kind = message[0]
+                if kind == "phase":
+                    self.status_bar.config(text=f"⏳ {self.doc_name}: {message[1]}...")
+                elif kind == "first_page":
+                    self.show_first_page(message[1], message[2])
+                elif kind == "ready":
+                    self.finish_open(*message[1:])
+                    return
+                elif kind == "error":
+                    self.end_open()
+                    self.close_tab(self.tab)
+                    messagebox.showerror("Fehler", f"Konnte PDF nicht öffnen:\n{str(message[1])}")
+                    self.status_bar.config(text="✗ Fehler beim Laden")
+                    return
+        except queue.Empty:
+            pass
+        self.open_poll_id = self.root.after(OPEN_POLL_MS, self.poll_open)
+    
+    def show_first_page(self, img, source):
+        # Erste Seite sofort zeigen; render_page findet sie später im Render-Cache
+        self.render_cache.put(RenderCache.make_key(self.doc_id, 0, self.zoom_level, self.rotation), img)
+        if self.continuous:
+            return
+        self.tiled = False
+        self.show_image(img)
+        self.first_page_ms = (time.perf_counter() - self.open_started) * 1000
+        self.first_page_source = source
     
-    def render_page(self):
+    def finish_open(self, doc, pages, metadata, fingerprint, io_mode, timings):
+        self.end_open()
+        self.pdf_document = doc
+        self.total_pages = pages
+        
+        # Gemeinsame Worker aller Tabs, jeder öffnet das Dokument mit eigenem Handle
+        self.ensure_workers()
+        for worker in (self.render_worker, self.prefetcher):
+            if worker:
+                worker.add_document(self.doc_id, self.pdf_path, fingerprint)
+        
+        title = (metadata.get("title") or "").strip()
+        self.tab.document = doc
+        self.tab.total_pages = pages
+        self.tab.fingerprint = fingerprint
+        self.tab.title = f"myTinyDesk - {title} ({self.doc_name})" if title else f"myTinyDesk - {self.doc_name}"
+        if self.watcher:
+            # Fingerabdrücke der Seiten im Hintergrund als Vergleichsbasis für das Neuladen
+            self.watcher.watch(self.doc_id, self.pdf_path, self.tab.file_state)
+            self.start_reloader(self.tab, reload=False)
+        
+        self.render_page()
+        if self.first_page_ms is None:
+            # Fortlaufende Ansicht: die erste Seite kam eben aus dem Render-Cache
+            self.first_page_ms = (time.perf_counter() - self.open_started) * 1000
+            self.first_page_source = "render"
+        if self.thumbnails_var.get():
+            self.start_thumbnails()
+        if self.outline.visible:
+            self.outline.set_document(self.doc_id, doc)
+        if self.search_bar.visible and self.search_query:
+            self.run_search(self.search_query)
+        
+        self.root.title(self.tab.title)
+        total_ms = (time.perf_counter() - self.open_started) * 1000
+        self.instrumentation.record("open", doc=self.doc_name, pages=pages,
+                                    ttfp_ms=round(self.first_page_ms, 2),
+                                    first_page_source=self.first_page_source, io=io_mode,
+                                    tabs=len(self.tab_bar.tabs),
+                                    total_ms=round(total_ms, 2), **stage_ms(timings))
+        self.idle_status = (f"✓ Geladen: {self.doc_name} | {pages} Seiten | "
+                            f"erste Seite nach {self.first_page_ms:.0f} ms")
+        if not self.render_generation:
+            self.status_bar.config(text=self.idle_status)
+    
+    def ensure_workers(self):
+        # Ein Render- und ein Prefetch-Worker für alle Tabs (ein Speicherbudget)
+        if self.render_worker:
+            return
+        options = dict(display_list_bytes=DISPLAY_LIST_MB * 1024 * 1024, gray=GRAYSCALE,
+                       daemon_socket=DAEMON_SOCKET, disk_cache=self.disk_cache, loader=self.loader)
+        if self.memory_budget:
+            options.update(display_list_bytes=self.memory_budget.display_list_bytes,
+                           store_limit=self.memory_budget.fitz_store_bytes)
+        self.worker_options = options
+        self.render_worker = RenderWorker(**options)
+        self.render_worker.start()
+        if PREFETCH_AHEAD or PREFETCH_BEHIND:
+            self.prefetcher = PrefetchWorker(self.render_cache, ahead=PREFETCH_AHEAD,
+                                             behind=PREFETCH_BEHIND, **options)
+            self.prefetcher.start()
+    
+    def cancel_open(self, quiet=False):
+        # Der neue Tab wird geschlossen, der Nachbar-Tab wieder angezeigt
+        if self.opener is None:
+            return
+        name = self.doc_name
+        self.close_tab(self.tab)
+        if not quiet:
+            self.status_bar.config(text=f"✗ Öffnen abgebrochen: {name}")
+    
+    def abort_open(self):
+        # Wie cancel_open, aber ohne einen anderen Tab anzuzeigen
+        if self.opener is None:
+            return
+        tab = self.tab
+        self.stop_opener()
+        self.cancel_view_work()
+        self.tab = None
+        self.close_tab(tab)
+    
+    def stop_opener(self):
+        # Öffnen abbrechen; ein schon übergebenes Dokument schließen
+        self.opener.cancel()
+        self.opener.discard()
+        self.end_open()
+    
+    def end_open(self):
+        self.opener = None
+        if self.open_poll_id is not None:
+            self.root.after_cancel(self.open_poll_id)
+            self.open_poll_id = None
+        self.open_progress.stop()
+        self.open_frame.place_forget()
+    
+    def select_tab(self, tab):
+        if tab is self.tab:
+            return
+        # Wechsel während des Öffnens bricht dieses ab
+        self.abort_open()
+        self.leave_tab()
+        
+        self.tab = tab
+        self.tab_bar.select(tab)
+        self.load_tab(tab)
+        self.root.title(tab.title)
+        self.status_bar.config(text=self.idle_status)
+        # Liegt die Seite noch im Render-Cache, erscheint sie ohne Rendern
+        self.render_page()
+        if self.thumbnails_var.get():
+            self.start_thumbnails()
+        if self.outline.visible:
+            self.outline.set_document(self.doc_id, self.pdf_document)
+        if self.search_bar.visible and self.search_query:
+            self.run_search(self.search_query, jump=False)
+    
+    def cycle_tab(self, step):
+        if self.tab is not None and len(self.tab_bar.tabs) > 1:
+            self.select_tab(self.tab_bar.neighbour(self.tab, step))
+        return "break"
+    
+    def leave_tab(self):
+        # Zustand des aktiven Tabs sichern, seine Caches zuerst verdrängen
+        tab = self.tab
+        self.cancel_view_work()
+        if tab is None:
+            return
+        tab.current_page = self.current_page
+        tab.zoom_level = self.zoom_level
+        tab.rotation = self.rotation
+        tab.status = self.idle_status
+        tab.page_layout = self.page_layout
+        tab.page_layout_key = self.page_layout_key
+        tab.link_history = self.link_history
+        self.render_cache.demote(tab.doc_id)
+        self.thumbnails.store.demote(tab.doc_id)
+        self.tab = None
+    
+    def load_tab(self, tab):
+        # Felder der Ansicht aus dem Tab übernehmen (None = kein Dokument)
+        self.pdf_document = tab.document if tab else None
+        self.pdf_path = tab.pdf_path if tab else None
+        self.doc_id = tab.doc_id if tab else 0
+        self.doc_name = tab.name if tab else ""
+        self.total_pages = tab.total_pages if tab else 0
+        self.current_page = tab.current_page if tab else 0
+        self.zoom_level = tab.zoom_level if tab else 1.0
+        self.rotation = tab.rotation if tab else 0
+        self.idle_status = tab.status if tab else ""
+        self.page_layout = tab.page_layout if tab else None
+        self.page_layout_key = tab.page_layout_key if tab else None
+        self.link_history = tab.link_history if tab else []
+        self.hovered_link = None
+        self.scroll_target = None
+        self.selection = None
+        self.pressed_link = None
+        self.search_hits = []
+        self.search_rects = {}
+        self.highlight_request = None
+        self.reset_view()
+        self.thumbnails.reset()
+        if tab is None:
+            self.outline.reset()
+        self.page_label.config(text=f"/ {self.total_pages}" if tab else "/ -")
+        self.page_entry.delete(0, tk.END)
+        self.zoom_label.config(text=f"{int(self.zoom_level * 100)}%")
+    
+    def close_current_tab(self):
+        if self.tab is not None:
+            self.close_tab(self.tab)
+    
+    def close_tab(self, tab):
+        active = tab is self.tab
+        if active:
+            if self.opener:
+                self.stop_opener()
+            self.cancel_view_work()
+            self.tab = None
+        
+        # Handles in den Workern, Miniaturen und gerenderte Seiten freigeben
+        for worker in (self.render_worker, self.prefetcher):
+            if worker:
+                worker.remove_document(tab.doc_id)
+        self.thumbnails.forget_document(tab.doc_id)
+        self.outline.forget_document(tab.doc_id)
+        self.link_cache.invalidate(tab.doc_id)
+        self.word_indexes.invalidate(tab.doc_id)
+        if self.word_worker:
+            self.word_worker.remove_document(tab.doc_id)
+            self.word_documents.discard(tab.doc_id)
+            self.word_fences.pop(tab.doc_id, None)
+        if self.watcher:
+            self.watcher.unwatch(tab.doc_id)
+            self.cancel_reloader(tab.doc_id)
+            self.reload_fences.pop(tab.doc_id, None)
+        if self.search_worker:
+            self.search_worker.remove_document(tab.doc_id)
+        self.text_indexes.pop(tab.doc_id, None)
+        self.cancel_size_reader(tab.doc_id)
+        self.page_size_lists.pop(tab.doc_id, None)
+        if self.governor:
+            self.governor.forget(tab.doc_id)
+        self.render_cache.forget(tab.doc_id)
+        if tab.document:
+            tab.document.close()
+            tab.document = None
+        index = self.tab_bar.remove(tab)
+        
+        if not active:
+            return
+        if self.tab_bar.tabs:
+            self.select_tab(self.tab_bar.tabs[min(index, len(self.tab_bar.tabs) - 1)])
+        else:
+            self.load_tab(None)
+            self.root.title(f"myTinyDesk v{__version__}")
+            self.status_bar.config(text="Bereit | myTinyDesk")
+    
+    def render_page(self, full=False):
         if not self.pdf_document:
             return
         
+        # Labels sofort aktualisieren, auch wenn das Rendern noch dauert
+        self.update_labels()
+        navigating = self.governor.note_navigation() if self.governor and not full else False
+        self.draft_shown = None
+        if not self.continuous:
+            self.request_highlights()
+        
+        # Fortlaufende Ansicht: zur Seite scrollen, sichtbare Seiten nachladen
+        if self.continuous:
+            self.render_continuous()
+            return
+        
+        # Bei hohem Zoom nur den sichtbaren Bereich rendern
+        if round(self.zoom_level, 3) >= TILE_ZOOM_THRESHOLD:
+            self.start_tiled_page()
+            return
+        self.tiled = False
+        self.tile_items = {}
+        self.wanted_tiles = set()
+        
+        # Zuerst im Cache nachsehen
+        key = RenderCache.make_key(self.doc_id, self.current_page, self.zoom_level, self.rotation)
+        img = self.render_cache.get(key)
+        
+        if img is not None:
+            # Ältere, noch laufende Aufträge sind damit überholt
+            self.cancel_render()
+            self.show_image(img)
+            self.record_render(self.current_page, None, "hit")
+            return
+        
+        # Nicht gecacht: im Worker rendern, Vorrendern bis dahin zurückstellen
+        if self.prefetcher:
+            self.prefetcher.cancel()
+        # Beim schnellen Blättern über dem Latenzziel nur einen Entwurf rendern
+        draft = None
+        if navigating:
+            draft = self.governor.draft_scale(self.doc_id, self.page_pixels(), navigating)
+        self.request_parts([(self.current_page, None)], draft)
+        self.status_bar.config(text=f"⏳ Rendere Seite {self.current_page + 1}...")
+    
+    def page_pixels(self):
+        # Pixelzahl der aktuellen Seite bei voller Auflösung
+        width, height = page_pixel_size(self.pdf_document[self.current_page], self.zoom_level,
+                                        self.rotation)
+        return width * height
+    
+    def request_parts(self, parts, draft=None):
+        # Teile sind (Seitenindex, Kachel), Kachel None für ganze Seiten
+        if not self.render_generation:
+            self.idle_status = self.status_bar.cget("text")
+        self.pending_parts = set(parts)
+        self.render_generation = self.render_worker.request_parts(self.doc_id, self.zoom_level,
+                                                                  self.rotation, parts, draft)
+        if self.render_poll_id is None:
+            self.render_poll_id = self.root.after(RENDER_POLL_MS, self.poll_render_result)
+    
+    def cancel_render(self):
+        if self.render_generation:
+            self.render_worker.cancel()
+            self.render_generation = 0
+            self.pending_parts = set()
+            self.status_bar.config(text=self.idle_status)
+    
+    def part_key(self, page_index, tile, zoom, rotation, doc_id=None):
+        doc_id = self.doc_id if doc_id is None else doc_id
+        if tile is None:
+            return RenderCache.make_key(doc_id, page_index, zoom, rotation)
+        return RenderCache.make_tile_key(doc_id, page_index, zoom, rotation, *tile)
+    
+    def poll_render_result(self):
+        self.render_poll_id = None
+        if not self.render_worker or not self.render_generation:
+            return
+        
         try:
-            # Aktuelle Seite laden
-            page = self.pdf_document[self.current_page]
-            
-            # Mit Zoom rendern
-            mat = fitz.Matrix(self.zoom_level, self.zoom_level)
-            pix = page.get_pixmap(matrix=mat, alpha=False)
-            
-            # In PIL Image konvertieren
-            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-            
-            # In Tkinter PhotoImage konvertieren
-            self.photo = ImageTk.PhotoImage(img)
-            
-            # Canvas aktualisieren
-            self.canvas.delete("all")
-            self.canvas.create_image(0, 0, anchor=tk.NW, image=self.photo)
-            self.canvas.config(scrollregion=self.canvas.bbox(tk.ALL))
+            while True:
+                generation, job, part, img, error, timings = self.render_worker.results.get_nowait()
+                
+                if error is not None:
+                    # Fehler überholter Aufträge interessieren nicht mehr
+                    if generation != self.render_generation:
+                        continue
+                    self.render_generation = 0
+                    self.pending_parts = set()
+                    self.status_bar.config(text=self.idle_status)
+                    messagebox.showerror("Fehler", f"Konnte Seite nicht rendern:\n{str(error)}")
+                    return
+                
+                # Auch Ergebnisse überholter Aufträge (auch anderer offener Tabs) sind
+                # gültig -> cachen, angezeigt wird aber nur, was zur aktuellen Ansicht passt
+                doc_id, zoom, rotation, _parts, draft = job
+                page_index, tile = part
+                if self.find_tab(doc_id) is None:
+                    # Tab inzwischen geschlossen
+                    continue
+                if generation < self.reload_fences.get(doc_id, 0):
+                    # Noch aus der Fassung vor dem Neuladen der Datei
+                    continue
+                if not draft:
+                    self.render_cache.put(self.part_key(page_index, tile, zoom, rotation, doc_id), img)
+                if (doc_id, zoom, rotation) == (self.doc_id, self.zoom_level, self.rotation):
+                    self.show_part(page_index, tile, img)
+                    if draft and page_index == self.current_page and not self.continuous:
+                        self.schedule_full_quality()
+                if tile is None and not draft:
+                    self.measure_render(doc_id, img, timings)
+                if doc_id == self.doc_id:
+                    self.record_render(page_index, tile, "draft" if draft else "miss", timings, zoom)
+                
+                if generation == self.render_generation:
+                    self.pending_parts.discard(part)
+                    if not self.pending_parts:
+                        self.render_generation = 0
+                        self.status_bar.config(text=self.idle_status)
+                        return
+        except queue.Empty:
+            pass
+        
+        self.render_poll_id = self.root.after(RENDER_POLL_MS, self.poll_render_result)
+    
+    def measure_render(self, doc_id, img, timings):
+        # Renderdauer scharfer Seiten für die adaptive Qualität (nicht aus dem Plattencache)
+        if self.governor and timings and "rasterize" in timings:
+            seconds = sum(timings.get(stage, 0.0) for stage in ("load", "rasterize", "convert"))
+            self.governor.record(doc_id, img.width * img.height, seconds)
+    
+    def schedule_full_quality(self):
+        # Entwurf angezeigt: nach der Ruhezeit scharf nachrendern
+        self.draft_shown = (self.doc_id, self.current_page, self.zoom_level, self.rotation)
+        if self.quality_settle_id is not None:
+            self.root.after_cancel(self.quality_settle_id)
+        self.quality_settle_id = self.root.after(self.governor.settle_ms, self.finish_draft)
+    
+    def finish_draft(self):
+        self.quality_settle_id = None
+        if self.draft_shown == (self.doc_id, self.current_page, self.zoom_level, self.rotation):
+            self.render_page(full=True)
+    
+    def show_part(self, page_index, tile, img):
+        if self.continuous:
+            if tile is None and page_index in self.wanted_pages:
+                self.show_continuous_page(page_index, img)
+        elif tile is not None:
+            if self.tiled and page_index == self.current_page and tile in self.wanted_tiles:
+                self.show_tile(tile, img)
+        elif not self.tiled and page_index == self.current_page:
+            self.show_image(img)
+    
+    def show_image(self, img):
+        try:
+            self.put_page_image(img)
+            self.shown_image = img
+            self.draw_highlights()
             
-            # Labels aktualisieren
-            self.page_label.config(text=f"/ {self.total_pages}")
-            self.page_entry.delete(0, tk.END)
-            self.page_entry.insert(0, str(self.current_page + 1))
-            self.zoom_label.config(text=f"{int(self.zoom_level * 100)}%")
+            # Nachbarseiten und Verweisziele im Hintergrund vorrendern
+            self.schedule_prefetch(self.current_page)
             
         except Exception as e:
             messagebox.showerror("Fehler", f"Konnte Seite nicht rendern:\n{str(e)}")
     
+    def put_page_image(self, img):
+        # In Tkinter PhotoImage konvertieren (je nach Backend wiederverwendet)
+        reuse = self.photo if self.page_image_item is not None else None
+        start = time.perf_counter()
+        self.photo = self.display.photo(img, reuse)
+        start = self.record_display("photo", start)
+        
+        # Canvas aktualisieren, das Bild-Item der Einzelseite bleibt bestehen
+        if self.page_image_item is None:
+            self.clear_canvas()
+            self.page_image_item = self.canvas.create_image(0, 0, anchor=tk.NW, image=self.photo)
+        else:
+            self.canvas.itemconfigure(self.page_image_item, image=self.photo)
+        self.canvas.config(scrollregion=(0, 0, img.width, img.height))
+        self.apply_scroll_target(img.height)
+        self.record_display("canvas", start)
+    
+    def clear_canvas(self):
+        self.canvas.delete("all")
+        self.photo = None
+        self.page_image_item = None
+    
+    def start_tiled_page(self):
+        # Ganze Seiten bei hohem Zoom nicht vorrendern (zu groß)
+        if self.prefetcher:
+            self.prefetcher.cancel()
+        
+        page = self.pdf_document[self.current_page]
+        width, height = page_pixel_size(page, self.zoom_level, self.rotation)
+        
+        self.tiled = True
+        self.tile_items = {}
+        self.wanted_tiles = set()
+        self.tile_page_size = (width, height)
+        
+        # Weißer Platzhalter für die Seite, Kacheln werden darüber gelegt
+        self.clear_canvas()
+        self.canvas.create_rectangle(0, 0, width, height, fill="white", outline="")
+        self.canvas.config(scrollregion=(0, 0, width, height))
+        self.apply_scroll_target(height)
+        self.draw_highlights()
+        self.update_tiles()
+    
+    def on_yscroll(self, *args):
+        self.canvas.yview(*args)
+        self.scrolled_by_user = True
+        self.schedule_view_update()
+    
+    def on_xscroll(self, *args):
+        self.canvas.xview(*args)
+        self.schedule_view_update()
+    
+    def on_mousewheel(self, event):
+        # Windows/macOS liefern delta, X11 die Buttons 4/5
+        self.note_input()
+        if event.num == 4 or event.delta > 0:
+            self.canvas.yview_scroll(-3, "units")
+        else:
+            self.canvas.yview_scroll(3, "units")
+        self.scrolled_by_user = True
+        self.schedule_view_update()
+    
+    def schedule_view_update(self):
+        # Eine Auswahl wird beim Scrollen für den neuen Sichtbereich gezeichnet
+        if (self.tiled or self.continuous or self.selection) and self.view_update_id is None:
+            self.view_update_id = self.root.after(30, self.update_view)
+    
+    def update_view(self):
+        self.view_update_id = None
+        if not self.pdf_document:
+            return
+        if self.continuous:
+            self.update_continuous()
+            return
+        if self.tiled:
+            self.update_tiles()
+        self.draw_selection()
+    
+    def update_tiles(self):
+        width, height = self.tile_page_size
+        cols, rows = tile_grid(width, height)
+        
+        # Sichtbarer Bereich plus Rand in Canvas-Koordinaten
+        x0 = self.canvas.canvasx(0) - TILE_MARGIN
+        y0 = self.canvas.canvasy(0) - TILE_MARGIN
+        x1 = self.canvas.canvasx(self.canvas.winfo_width()) + TILE_MARGIN
+        y1 = self.canvas.canvasy(self.canvas.winfo_height()) + TILE_MARGIN
+        
+        wanted = {
+            (col, row)
+            for col in range(max(0, int(x0 // TILE_SIZE)), min(cols, int(x1 // TILE_SIZE) + 1))
+            for row in range(max(0, int(y0 // TILE_SIZE)), min(rows, int(y1 // TILE_SIZE) + 1))
+        }
+        self.wanted_tiles = wanted
+        
+        # Kacheln außerhalb des Bereichs freigeben (Speicher ~ Sichtbereich)
+        for tile in [t for t in self.tile_items if t not in wanted]:
+            item, _photo, _img = self.tile_items.pop(tile)
+            self.canvas.delete(item)
+        
+        missing = []
+        for tile in wanted:
+            if tile in self.tile_items:
+                continue
+            img = self.render_cache.get(self.part_key(self.current_page, tile, self.zoom_level, self.rotation))
+            if img is not None:
+                self.show_tile(tile, img)
+                self.record_render(self.current_page, tile, "hit")
+            else:
+                missing.append(tile)
+        
+        if not missing:
+            self.cancel_render()
+            return
+        
+        # Kacheln nahe der Mitte des Sichtbereichs zuerst rendern
+        cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+        missing.sort(key=lambda t: abs((t[0] + 0.5) * TILE_SIZE - cx) + abs((t[1] + 0.5) * TILE_SIZE - cy))
+        self.request_parts([(self.current_page, tile) for tile in missing])
+    
+    def show_tile(self, tile, img):
+        if tile in self.tile_items:
+            return
+        col, row = tile
+        start = time.perf_counter()
+        photo = self.display.photo(img)
+        start = self.record_display("photo", start)
+        item = self.canvas.create_image(col * TILE_SIZE, row * TILE_SIZE, anchor=tk.NW, image=photo)
+        self.canvas.tag_raise("highlight")
+        self.canvas.tag_raise("selection")
+        self.record_display("canvas", start)
+        self.tile_items[tile] = (item, photo, img)
+    
+    def toggle_continuous(self):
+        self.continuous = self.continuous_var.get()
+        if not self.pdf_document:
+            return
+        
+        # Ansicht komplett neu aufbauen
+        self.cancel_render()
+        self.reset_view()
+        self.render_page()
+    
+    def reset_view(self):
+        self.clear_canvas()
+        self.shown_image = None
+        self.tiled = False
+        self.tile_items = {}
+        self.wanted_tiles = set()
+        self.page_items = {}
+        self.wanted_pages = set()
+        self.layout_state = None
+        self.preview_photos = []
+    
+    def layout_continuous(self):
+        # Seitengrößen liest ein Thread, bis dahin gilt für alle Seiten die Größe der aktuellen
+        sizes = self.page_size_lists.get(self.doc_id)
+        key = (self.doc_id, self.rotation, sizes is not None)
+        if self.page_layout is None or self.page_layout_key != key:
+            if sizes is None:
+                self.request_page_sizes()
+                rect = self.pdf_document[self.current_page].rect
+                sizes = itertools.repeat((rect.width, rect.height), self.total_pages)
+            self.page_layout = PageLayout(rotated_sizes(sizes, self.rotation))
+            self.page_layout_key = key
+        
+        self.clear_canvas()
+        self.page_items = {}
+        self.wanted_pages = set()
+        width, height = self.page_layout.total_size(self.zoom_level)
+        self.canvas.config(scrollregion=(0, 0, width, height))
+        self.layout_state = (self.doc_id, self.zoom_level, self.rotation)
+    
+    def request_page_sizes(self):
+        if self.doc_id in self.size_readers:
+            return
+        reader = PageSizeReader(self.pdf_path, loader=self.loader)
+        self.size_readers[self.doc_id] = reader
+        reader.start()
+        if self.sizes_poll_id is None:
+            self.sizes_poll_id = self.root.after(SIZES_POLL_MS, self.poll_page_sizes)
+    
+    def cancel_size_reader(self, doc_id):
+        reader = self.size_readers.pop(doc_id, None)
+        if reader:
+            reader.cancel()
+    
+    def poll_page_sizes(self):
+        self.sizes_poll_id = None
+        for doc_id, reader in list(self.size_readers.items()):
+            try:
+                message = reader.results.get_nowait()
+            except queue.Empty:
+                continue
+            del self.size_readers[doc_id]
+            if message[0] != "sizes":
+                continue
+            self.page_size_lists[doc_id] = message[1]
+            # Vorläufiges Layout der angezeigten Seite durch das richtige ersetzen
+            if doc_id == self.doc_id and self.continuous:
+                self.layout_state = None
+                self.render_continuous()
+        if self.size_readers:
+            self.sizes_poll_id = self.root.after(SIZES_POLL_MS, self.poll_page_sizes)
+    
+    def render_continuous(self):
+        if self.layout_state != (self.doc_id, self.zoom_level, self.rotation):
+            self.layout_continuous()
+        
+        self.scroll_to_current_page()
+        self.update_continuous()
+    
+    def scroll_to_current_page(self):
+        # Oberkante der aktuellen Seite an den oberen Fensterrand scrollen
+        _width, height = self.page_layout.total_size(self.zoom_level)
+        _x0, y0, _x1, _y1 = self.page_layout.page_rect(self.current_page, self.zoom_level)
+        if not self.apply_scroll_target(height, y0):
+            self.canvas.yview_moveto(y0 / height if height else 0)
+        self.scrolled_by_user = False
+    
+    def update_continuous(self):
+        layout = self.page_layout
+        top = self.canvas.canvasy(0)
+        bottom = self.canvas.canvasy(self.canvas.winfo_height())
+        first, last = layout.visible_range(top, bottom, self.zoom_level)
+        
+        # Beim Scrollen durch den Benutzer folgt die aktuelle Seite der Ansicht
+        if self.scrolled_by_user:
+            self.scrolled_by_user = False
+            current = layout.page_at(top + layout.gap + 1, self.zoom_level)
+            if current != self.current_page:
+                self.current_page = current
+                self.update_labels()
+        
+        # Sichtbare Seiten plus kleines Fenster davor/danach
+        wanted = set(range(max(0, first - CONTINUOUS_WINDOW), min(len(layout), last + CONTINUOUS_WINDOW + 1)))
+        self.wanted_pages = wanted
+        
+        # Seiten außerhalb des Fensters freigeben
+        for index in [i for i in self.page_items if i not in wanted]:
+            rect_item, image_item, _photo = self.page_items.pop(index)
+            self.canvas.delete(rect_item)
+            if image_item:
+                self.canvas.delete(image_item)
+        
+        missing = []
+        for index in sorted(wanted):
+            if index not in self.page_items:
+                # Weißer Platzhalter bis die Seite gerendert ist
+                rect_item = self.canvas.create_rectangle(*layout.page_rect(index, self.zoom_level),
+                                                         fill="white", outline="")
+                self.page_items[index] = (rect_item, None, None)
+            if self.page_items[index][2] is not None:
+                continue
+            img = self.render_cache.get(self.part_key(index, None, self.zoom_level, self.rotation))
+            if img is not None:
+                self.show_continuous_page(index, img)
+                self.record_render(index, None, "hit")
+            else:
+                missing.append(index)
+        self.draw_highlights()
+        self.request_highlights()
+        
+        if not missing:
+            self.cancel_render()
+            self.schedule_prefetch(last)
+            return
+        
+        # Sichtbare Seiten vor denen im Fenster rendern
+        if self.prefetcher:
+            self.prefetcher.cancel()
+        missing.sort(key=lambda i: 0 if first <= i <= last else 1)
+        self.request_parts([(index, None) for index in missing])
+    
+    def show_continuous_page(self, index, img):
+        rect_item, image_item, photo = self.page_items[index]
+        if photo is not None:
+            return
+        x0, y0, _x1, _y1 = self.page_layout.page_rect(index, self.zoom_level)
+        start = time.perf_counter()
+        photo = self.display.photo(img)
+        start = self.record_display("photo", start)
+        image_item = self.canvas.create_image(x0, y0, anchor=tk.NW, image=photo)
+        self.canvas.tag_raise("highlight")
+        self.canvas.tag_raise("selection")
+        self.record_display("canvas", start)
+        self.page_items[index] = (rect_item, image_item, photo)
+    
+    def record_display(self, stage, start):
+        # Dauer einer Anzeige-Phase für das nächste Render-Ereignis vormerken
+        now = time.perf_counter()
+        self.display_timings[stage] = self.display_timings.get(stage, 0.0) + (now - start)
+        return now
+    
+    def record_render(self, page_index, tile, cache, timings=None, zoom=None):
+        # Worker-Phasen (load/rasterize/convert) und Anzeige-Phasen zusammenführen
+        timings = dict(timings or {})
+        timings.update(self.display_timings)
+        self.display_timings = {}
+        self.instrumentation.record(
+            "render", doc=self.doc_name, page=page_index + 1,
+            tile=list(tile) if tile is not None else None,
+            zoom=self.zoom_level if zoom is None else zoom, rotation=self.rotation, cache=cache,
+            total_ms=round(sum(timings.values()) * 1000, 2), **stage_ms(timings))
+        if self.perf_visible:
+            self.update_perf_overlay()
+    
+    def record_startup(self):
+        # Fenster steht: Startzeit und Speicher ohne Dokument
+        self.instrumentation.record("startup", ms=round((time.perf_counter() - STARTED) * 1000, 2),
+                                    rss=current_rss_bytes(), fitz_loaded=is_loaded("fitz"),
+                                    pil_loaded=is_loaded("PIL.Image"))
+    
+    def poll_instance(self):
+        try:
+            while True:
+                pdf_path = self.instance.requests.get_nowait()
+                # Fenster nach vorne holen, auch ohne Datei
+                self.root.deiconify()
+                self.root.lift()
+                self.root.focus_force()
+                if pdf_path:
+                    self.open_path(pdf_path)
+        except queue.Empty:
+            pass
+        self.root.after(INSTANCE_POLL_MS, self.poll_instance)
+    
+    def toggle_perf_overlay(self):
+        self.perf_visible = not self.perf_visible
+        if self.perf_visible:
+            self.update_perf_overlay()
+            self.perf_label.place(relx=1.0, rely=0.5, anchor="e")
+        else:
+            self.perf_label.place_forget()
+    
+    def update_perf_overlay(self):
+        self.perf_label.config(text=self.instrumentation.overlay_text(self.render_cache.stats(),
+                                                                      self.memory_usage()))
+    
+    def memory_usage(self):
+        # Geschätzter Verbrauch der Caches und gemessener RSS des Prozesses (Bytes)
+        display_lists = sum(worker.display_lists.current_bytes
+                            for worker in (self.render_worker, self.prefetcher) if worker)
+        return {
+            "rss": current_rss_bytes(),
+            "render_cache": self.render_cache.current_bytes,
+            "display_lists": display_lists,
+            "thumbnails": self.thumbnails.store.current_bytes,
+            "search_index": sum(index.size_bytes for index in self.text_indexes.values()),
+            "word_index": self.word_indexes.size_bytes,
+            "fitz_store": fitz_store_size(),
+            "budget": self.memory_budget.total_bytes if self.memory_budget else None,
+        }
+    
+    def note_input(self):
+        self.last_input = time.monotonic()
+        self.purged = False
+    
+    def on_unmap(self, event):
+        # <Unmap> kommt auch von Kind-Widgets, nur das minimierte Hauptfenster zählt
+        if self.memory_budget and event.widget is self.root:
+            self.purge_caches()
+    
+    def purge_caches(self):
+        # Gerenderte Seiten verwerfen, Display-Lists und PyMuPDF-Store in den Workern freigeben
+        self.render_cache.clear()
+        self.thumbnails.store.clear()
+        self.word_indexes.clear()
+        self.preview_photos = []
+        for worker in (self.render_worker, self.prefetcher):
+            if worker:
+                worker.purge()
+        self.purged = True
+        self.instrumentation.record("purge", **self.memory_usage())
+    
+    def check_memory(self):
+        usage = self.memory_usage()
+        self.instrumentation.record("memory", **usage)
+        if self.perf_visible:
+            self.update_perf_overlay()
+        idle = time.monotonic() - self.last_input
+        if not self.purged and idle > self.memory_budget.idle_purge:
+            self.purge_caches()
+        self.root.after(MEMORY_CHECK_MS, self.check_memory)
+    
+    def find_tab(self, doc_id):
+        for tab in self.tab_bar.tabs:
+            if tab.doc_id == doc_id:
+                return tab
+        return None
+    
+    def start_reloader(self, tab, reload=True):
+        # Ein Neuladen pro Dokument; eine neue Änderung überholt das laufende
+        self.cancel_reloader(tab.doc_id)
+        reloader = DocumentReloader(tab.pdf_path, previous=tab.page_fingerprints, reload=reload,
+                                    loader=self.loader, fingerprint_file=self.disk_cache is not None)
+        self.reloaders[tab.doc_id] = reloader
+        reloader.start()
+    
+    def cancel_reloader(self, doc_id):
+        reloader = self.reloaders.pop(doc_id, None)
+        if reloader is None:
+            return
+        reloader.cancel()
+        # Vor cancel() übergebene Dokumente schließen, danach kommt keins mehr
+        try:
+            while True:
+                message = reloader.results.get_nowait()
+                if message[0] == "reloaded":
+                    message[1].close()
+        except queue.Empty:
+            pass
+    
+    def poll_reload(self):
+        try:
+            while True:
+                doc_id = self.watcher.changes.get_nowait()
+                tab = self.find_tab(doc_id)
+                if tab is None or tab.document is None:
+                    continue
+                if tab is self.tab:
+                    self.status_bar.config(text=f"🔄 Datei geändert, lade {tab.name} neu...")
+                self.start_reloader(tab)
+        except queue.Empty:
+            pass
+        
+        # Jeder Reloader meldet höchstens einmal, beendete ohne Meldung werden verworfen
+        for doc_id, reloader in list(self.reloaders.items()):
+            try:
+                message = reloader.results.get_nowait()
+            except queue.Empty:
+                if not reloader.is_alive() and reloader.results.empty():
+                    self.reloaders.pop(doc_id, None)
+                continue
+            self.reloaders.pop(doc_id, None)
+            kind = message[0]
+            tab = self.find_tab(doc_id)
+            if kind == "reloaded":
+                self.finish_reload(tab, *message[1:])
+            elif kind == "fingerprints":
+                # Nur gültig, wenn noch die angezeigte Fassung gelesen wurde
+                if message[1] == tab.file_state:
+                    tab.page_fingerprints = message[2]
+            elif kind == "error" and tab is self.tab:
+                self.status_bar.config(text=f"✗ Neu laden fehlgeschlagen: {message[1]}")
+        self.root.after(RELOAD_POLL_MS, self.poll_reload)
+    
+    def finish_reload(self, tab, doc, state, fingerprints, changed, fingerprint, timings):
+        # Neue Fassung übernehmen: Position und Zoom bleiben, nur geänderte Seiten werden neu gerendert
+        start = time.perf_counter()
+        doc_id = tab.doc_id
+        old = tab.document
+        pages = len(doc)
+        tab.document = doc
+        tab.total_pages = pages
+        tab.file_state = state
+        tab.page_fingerprints = fingerprints
+        if fingerprint:
+            tab.fingerprint = fingerprint
+        
+        if changed:
+            self.render_cache.invalidate_pages(doc_id, changed)
+            self.text_indexes.pop(doc_id, None)
+            self.link_cache.invalidate(doc_id, changed)
+            self.word_indexes.invalidate(doc_id, changed)
+            if self.selection and self.selection.doc_id == doc_id and self.selection.page_index in changed:
+                self.selection = None
+            tab.page_layout = None
+            tab.page_layout_key = None
+            self.cancel_size_reader(doc_id)
+            self.page_size_lists.pop(doc_id, None)
+        # Die Worker öffnen die Datei in jedem Fall neu (ihr Handle zeigt auf die alte Fassung)
+        for worker in (self.render_worker, self.prefetcher, self.search_worker, self.word_worker):
+            if worker:
+                generation = worker.reload_document(doc_id, tab.fingerprint)
+                if worker is self.render_worker:
+                    self.reload_fences[doc_id] = generation
+                elif worker is self.word_worker:
+                    self.word_fences[doc_id] = generation
+                    if self.word_request is not None and self.word_request[0] == doc_id:
+                        self.word_request = None
+        self.thumbnails.reload_document(doc_id, changed, tab.fingerprint)
+        # Das Inhaltsverzeichnis kann sich auch ohne geänderte Seiten ändern
+        self.outline.forget_document(doc_id)
+        tab.current_page = min(tab.current_page, max(0, pages - 1))
+        
+        if tab is self.tab:
+            self.pdf_document = doc
+            self.total_pages = pages
+            self.current_page = min(self.current_page, max(0, pages - 1))
+            self.render_generation = 0
+            self.pending_parts = set()
+            if changed:
+                self.page_layout = None
+                self.page_layout_key = None
+                self.reset_view()
+            self.idle_status = (f"🔄 Neu geladen: {tab.name} | {len(changed)} von {pages} Seiten geändert")
+            self.status_bar.config(text=self.idle_status)
+            self.render_page()
+            if changed and self.thumbnails_var.get():
+                self.start_thumbnails()
+            if self.outline.visible:
+                self.outline.set_document(doc_id, doc)
+            if changed and self.search_bar.visible and self.search_query:
+                self.run_search(self.search_query, jump=False)
+            elif doc_id in self.text_indexes:
+                # Das Neuladen hat den Suchauftrag verworfen, die Indizierung fortsetzen
+                self.ensure_text_index()
+        old.close()
+        timings["swap"] = time.perf_counter() - start
+        self.instrumentation.record("reload", doc=tab.name, pages=pages, changed=len(changed),
+                                    **stage_ms(timings))
+    
+    def update_labels(self):
+        self.page_label.config(text=f"/ {self.total_pages}")
+        self.page_entry.delete(0, tk.END)
+        self.page_entry.insert(0, str(self.current_page + 1))
+        self.zoom_label.config(text=f"{int(self.zoom_level * 100)}%")
+        self.thumbnails.set_current(self.current_page)
+    
+    def start_thumbnails(self):
+        # Eigener Worker ohne Render-Dienst; wartet, solange die Hauptseite rendert
+        options = dict(self.worker_options, daemon_socket=None)
+        self.thumbnails.set_document(self.doc_id, self.pdf_document, self.pdf_path, self.tab.fingerprint,
+                                     busy=lambda: bool(self.render_generation), **options)
+        self.thumbnails.set_current(self.current_page)
+    
+    def toggle_thumbnails(self):
+        if self.thumbnails_var.get():
+            self.thumbnails.show(before=self.v_scrollbar)
+            if self.pdf_document:
+                self.start_thumbnails()
+        else:
+            self.thumbnails.close()
+            self.thumbnails.hide()
+    
+    def toggle_outline(self):
+        if self.outline_var.get():
+            self.outline.show(before=self.v_scrollbar)
+            if self.pdf_document:
+                self.outline.set_document(self.doc_id, self.pdf_document)
+        else:
+            self.outline.hide()
+    
+    def schedule_prefetch(self, page_index, first=None):
+        # Nachbarseiten und Ziele der Verweise der aktuellen Seite, `first` zuerst
+        if not self.prefetcher:
+            return
+        # Die erste Seite erscheint, bevor das Dokument der UI gehört: dann nur Nachbarseiten
+        targets = []
+        if self.pdf_document:
+            targets = self.link_cache.targets(self.pdf_document, self.doc_id, self.current_page, self.rotation)
+        if first is not None:
+            targets = [first] + [index for index in targets if index != first]
+        self.prefetcher.schedule(self.doc_id, page_index, self.zoom_level, self.rotation, targets)
+    
+    def prefetch_link(self, page_index):
+        # Ziel unter dem Mauszeiger (Verweis oder Inhaltsverzeichnis) vorrendern
+        if self.pdf_document and not self.tiled and 0 <= page_index < self.total_pages:
+            self.schedule_prefetch(self.current_page, first=page_index)
+    
+    def page_point(self, event, page_index=None):
+        # Canvas- in Seitenkoordinaten bei Zoom 1: (Seite, x, y), mit `page_index` relativ zu dieser Seite
+        if not self.pdf_document:
+            return None
+        x, y = self.canvas.canvasx(event.x), self.canvas.canvasy(event.y)
+        x0 = y0 = 0
+        if self.continuous:
+            if self.page_layout is None:
+                return None
+            if page_index is None:
+                page_index = self.page_layout.page_at(y, self.zoom_level)
+            x0, y0, _x1, _y1 = self.page_layout.page_rect(page_index, self.zoom_level)
+        else:
+            page_index = self.current_page
+        return page_index, (x - x0) / self.zoom_level, (y - y0) / self.zoom_level
+    
+    def link_at(self, event):
+        # Verweis unter dem Mauszeiger
+        point = self.page_point(event)
+        if point is None:
+            return None
+        return self.link_cache.hit(self.pdf_document, self.doc_id, *point, rotation=self.rotation)
+    
+    def on_canvas_motion(self, event):
+        target = self.link_at(event)
+        cursor = "hand2" if target else ""
+        if self.canvas.cget("cursor") != cursor:
+            self.canvas.config(cursor=cursor)
+        if target != self.hovered_link:
+            self.hovered_link = target
+            if target and target[0] == "page":
+                self.prefetch_link(target[1])
+        # Wörter der Seite unter dem Mauszeiger schon vor dem Klick auslesen
+        point = self.page_point(event)
+        if point is not None:
+            self.request_words(point[0])
+    
+    def on_canvas_press(self, event):
+        # Verweis: Folgen beim Loslassen; sonst beginnt eine neue Auswahl
+        self.press_position = (event.x, event.y)
+        self.pressed_link = self.link_at(event)
+        self.clear_selection()
+        point = self.page_point(event)
+        if self.pressed_link is None and point is not None:
+            page_index, x, y = point
+            self.selection = TextSelection(self.doc_id, page_index, self.rotation, (x, y))
+            self.request_words(page_index)
+    
+    def on_canvas_drag(self, event):
+        selection = self.selection
+        if selection is None or self.press_position is None:
+            return
+        if not selection.dragged:
+            px, py = self.press_position
+            if abs(event.x - px) < DRAG_THRESHOLD and abs(event.y - py) < DRAG_THRESHOLD:
+                return
+            selection.dragged = True
+        point = self.page_point(event, selection.page_index)
+        if point is None:
+            return
+        selection.point = point[1:]
+        self.update_selection()
+    
+    def on_canvas_release(self, event):
+        target = self.pressed_link
+        dragged = self.selection is not None and self.selection.dragged
+        self.pressed_link = None
+        self.press_position = None
+        if not dragged:
+            # Einfacher Klick: keine Auswahl
+            self.clear_selection()
+        if target is None or dragged:
+            return
+        if target[0] == "page":
+            self.follow_link(target[1], target[2])
+        elif is_openable(target[1]):
+            webbrowser.open(target[1])
+            self.status_bar.config(text=f"🌐 {target[1]}")
+    
+    def request_words(self, page_index):
+        # Wort-Index einer Seite im Hintergrund aufbauen (einmal pro Seite und Rotation)
+        key = (self.doc_id, page_index, self.rotation)
+        if key in self.word_indexes or key == self.word_request:
+            return
+        if self.word_worker is None:
+            self.word_worker = WordIndexWorker(**dict(self.worker_options, daemon_socket=None))
+            self.word_worker.start()
+        if self.doc_id not in self.word_documents:
+            self.word_worker.add_document(self.doc_id, self.pdf_path, self.tab.fingerprint)
+            self.word_documents.add(self.doc_id)
+        self.word_worker.request(self.doc_id, page_index, self.rotation)
+        self.word_request = key
+        if self.words_poll_id is None:
+            self.words_poll_id = self.root.after(WORDS_POLL_MS, self.poll_words)
+    
+    def poll_words(self):
+        self.words_poll_id = None
+        if self.word_worker is None:
+            return
+        try:
+            while True:
+                doc_id, page_index, rotation, generation, index = self.word_worker.results.get_nowait()
+                # Ergebnisse aus einer inzwischen neu geladenen Fassung verwerfen
+                if generation < self.word_fences.get(doc_id, 0):
+                    continue
+                key = (doc_id, page_index, rotation)
+                self.word_indexes.put(key, index)
+                if key == self.word_request:
+                    self.word_request = None
+                if self.selection is not None and self.selection.key == key and self.selection.dragged:
+                    self.update_selection()
+        except queue.Empty:
+            pass
+        if self.word_request is not None:
+            self.words_poll_id = self.root.after(WORDS_POLL_MS, self.poll_words)
+    
+    def update_selection(self):
+        # Ausgewählte Wörter neu bestimmen, ohne Wort-Index erst nach dessen Eintreffen
+        selection = self.selection
+        index = self.word_indexes.get(selection.key)
+        if index is None:
+            self.request_words(selection.page_index)
+            return
+        selection.update(index)
+        self.draw_selection()
+    
+    def clear_selection(self):
+        self.selection = None
+        self.canvas.delete("selection")
+    
+    def draw_selection(self):
+        # Nur die Wörter im Sichtbereich zeichnen, zeilenweise zusammengefasst
+        self.canvas.delete("selection")
+        selection = self.selection
+        if selection is None or selection.words is None or selection.doc_id != self.doc_id:
+            return
+        index = self.word_indexes.get(selection.key)
+        if index is None:
+            return
+        zoom = self.zoom_level
+        if self.continuous:
+            if selection.page_index not in self.page_items:
+                return
+            left, top, _x1, _y1 = self.page_layout.page_rect(selection.page_index, zoom)
+        elif selection.page_index == self.current_page:
+            left = top = 0
+        else:
+            return
+        x0 = (self.canvas.canvasx(0) - left) / zoom
+        y0 = (self.canvas.canvasy(0) - top) / zoom
+        view = (selection.key, x0, y0, x0 + self.canvas.winfo_width() / zoom,
+                y0 + self.canvas.winfo_height() / zoom)
+        # Wörter im Sichtbereich nur neu abfragen, wenn er sich geändert hat (nicht beim Ziehen)
+        if self.selection_view is None or self.selection_view[:2] != (view, index):
+            self.selection_view = (view, index, index.query(*view[1:]))
+        for rx0, ry0, rx1, ry1 in index.selection_rects(*selection.words, self.selection_view[2]):
+            self.canvas.create_rectangle(left + rx0 * zoom, top + ry0 * zoom,
+                                         left + rx1 * zoom, top + ry1 * zoom,
+                                         fill=SELECTION_COLOR, stipple="gray50", outline="",
+                                         tags=("selection",))
+        self.canvas.tag_raise("selection")
+    
+    def copy_selection(self):
+        selection = self.selection
+        if selection is None or selection.words is None:
+            return
+        index = self.word_indexes.get(selection.key)
+        if index is None:
+            return
+        text = index.text(*selection.words)
+        self.root.clipboard_clear()
+        self.root.clipboard_append(text)
+        self.status_bar.config(text=f"📋 {len(text)} Zeichen kopiert")
+    
+    def follow_link(self, page_index, point=None):
+        # Zur Zielseite springen, Zielpunkt an den oberen Rand; Alt+Links kehrt zurück
+        if not self.pdf_document or not 0 <= page_index < self.total_pages:
+            return
+        self.link_history.append(self.current_page)
+        del self.link_history[:-LINK_HISTORY]
+        offset = target_offset(self.pdf_document, page_index, point, self.rotation)
+        self.scroll_target = None if offset is None else (self.doc_id, page_index, offset)
+        self.current_page = page_index
+        self.render_page()
+    
+    def link_back(self):
+        if self.pdf_document and self.link_history:
+            self.goto_index(min(self.link_history.pop(), self.total_pages - 1))
+        return "break"
+    
+    def apply_scroll_target(self, height, top=0):
+        # Nach dem Folgen eines Verweises den Zielpunkt an den oberen Rand scrollen
+        target = self.scroll_target
+        if target is None or target[:2] != (self.doc_id, self.current_page):
+            return False
+        self.scroll_target = None
+        self.canvas.yview_moveto((top + target[2] * self.zoom_level) / height if height else 0)
+        return True
+    
+    def open_search(self):
+        # Unter der Tab-Leiste einblenden, mit dem Öffnen beginnt die Indizierung
+        self.search_bar.show(after=self.tab_bar.notebook if self.tab_bar.visible else self.toolbar)
+        self.ensure_text_index()
+        if self.search_poll_id is None:
+            self.search_poll_id = self.root.after(SEARCH_POLL_MS, self.poll_search)
+    
+    def close_search(self):
+        self.search_bar.hide()
+        self.search_query = ""
+        self.search_hits = []
+        self.search_rects = {}
+        self.highlight_request = None
+        self.canvas.delete("highlight")
+        if self.search_poll_id is not None:
+            self.root.after_cancel(self.search_poll_id)
+            self.search_poll_id = None
+        self.canvas.focus_set()
+    
+    def ensure_text_index(self):
+        # Index des aktiven Dokuments, beim ersten Aufruf im Hintergrund aufbauen
+        if not self.pdf_document:
+            return None
+        index = self.text_indexes.get(self.doc_id)
+        if index is not None:
+            if not index.complete:
+                # Unterbrochene Indizierung (Tabwechsel, Neuladen) erneut anfordern
+                self.highlight_request = None
+                self.search_worker.request(self.doc_id, index, rotation=self.rotation)
+                self.request_highlights()
+            return index
+        index = self.text_indexes[self.doc_id] = TextIndex(self.total_pages)
+        if self.search_worker is None:
+            # Lokales Dokument (Textextraktion), wartet solange die Hauptseite rendert
+            options = dict(self.worker_options, daemon_socket=None)
+            self.search_worker = TextIndexWorker(busy=lambda: bool(self.render_generation),
+                                                 persist=SEARCH_PERSIST, **options)
+            self.search_worker.start()
+        self.search_worker.add_document(self.doc_id, self.pdf_path, self.tab.fingerprint)
+        self.search_worker.request(self.doc_id, index, rotation=self.rotation)
+        return index
+    
+    def run_search(self, query, jump=True):
+        self.search_query = query
+        self.search_hits = []
+        self.search_rects = {}
+        self.highlight_request = None
+        self.canvas.delete("highlight")
+        if not query:
+            self.search_bar.set_info("")
+            return
+        if self.ensure_text_index() is None:
+            self.search_bar.set_info("Kein Dokument")
+            return
+        self.update_search(jump)
+    
+    def update_search(self, jump=False):
+        # Suche im bisher indizierten Teil, läuft bei jedem Fortschritt erneut
+        index = self.text_indexes[self.doc_id]
+        start = time.perf_counter()
+        hits = index.search(self.search_query)
+        search_ms = (time.perf_counter() - start) * 1000
+        first_hits = hits and not self.search_hits
+        self.search_hits = hits
+        if jump:
+            self.instrumentation.record("search", doc=self.doc_name, hits=len(hits),
+                                        indexed=index.indexed, pages=len(index),
+                                        ms=round(search_ms, 2))
+        if (jump or first_hits) and hits and self.current_page not in hits:
+            # Zum ersten Treffer ab der aktuellen Seite
+            self.goto_index(next((i for i in hits if i > self.current_page), hits[0]))
+        else:
+            self.request_highlights()
+        self.update_search_info()
+    
+    def update_search_info(self):
+        index = self.text_indexes.get(self.doc_id)
+        if index is None or not self.search_query:
+            return
+        if self.search_hits:
+            position = (self.search_hits.index(self.current_page) + 1
+                        if self.current_page in self.search_hits else "-")
+            text = f"Seite {position} von {len(self.search_hits)} mit Treffern"
+        else:
+            text = "Keine Treffer"
+        if not index.complete:
+            text += f" (Index {index.indexed * 100 // max(1, len(index))}%)"
+        self.search_bar.set_info(text)
+    
+    def search_step(self, direction):
+        if not self.search_hits:
+            return
+        if direction > 0:
+            target = next((i for i in self.search_hits if i > self.current_page), self.search_hits[0])
+        else:
+            target = next((i for i in reversed(self.search_hits) if i < self.current_page),
+                          self.search_hits[-1])
+        self.goto_index(target)
+        self.update_search_info()
+    
+    def request_highlights(self):
+        # Trefferrechtecke der sichtbaren Seiten beim Worker anfordern
+        index = self.text_indexes.get(self.doc_id)
+        if not self.search_query or index is None:
+            return
+        pages = sorted(self.wanted_pages) if self.continuous else [self.current_page]
+        pages = [i for i in pages
+                 if i not in self.search_rects and index.may_contain(i, self.search_query)]
+        # Dieselben Seiten nicht erneut anfordern, solange der Auftrag läuft
+        if pages and pages != self.highlight_request:
+            self.highlight_request = pages
+            self.search_worker.request(self.doc_id, index, self.search_query, pages, self.rotation)
+    
+    def poll_search(self):
+        self.search_poll_id = None
+        if self.search_worker:
+            progressed = False
+            try:
+                while True:
+                    message = self.search_worker.results.get_nowait()
+                    if message[1] != self.doc_id:
+                        continue
+                    if message[0] == "progress":
+                        progressed = True
+                    else:
+                        _kind, _doc_id, query, rotation, page_index, rects = message
+                        if (query, rotation) == (self.search_query, self.rotation):
+                            self.search_rects[page_index] = rects
+                            self.draw_highlights()
+            except queue.Empty:
+                pass
+            if progressed and self.search_query:
+                self.update_search()
+            elif progressed:
+                self.update_search_info()
+        if self.search_bar.visible:
+            self.search_poll_id = self.root.after(SEARCH_POLL_MS, self.poll_search)
+    
+    def draw_highlights(self):
+        # Treffer als Rahmen über den Seiten, Koordinaten bei Zoom 1 skaliert
+        self.canvas.delete("highlight")
+        self.draw_selection()
+        if not self.search_rects:
+            return
+        zoom = self.zoom_level
+        if self.continuous:
+            pages = [(i, self.page_layout.page_rect(i, zoom)[:2]) for i in self.page_items]
+        else:
+            pages = [(self.current_page, (0, 0))]
+        for index, (left, top) in pages:
+            for x0, y0, x1, y1 in self.search_rects.get(index, ()):
+                self.canvas.create_rectangle(left + x0 * zoom, top + y0 * zoom,
+                                             left + x1 * zoom, top + y1 * zoom,
+                                             outline=HIGHLIGHT_COLOR, width=2, tags=("highlight",))
+        self.canvas.tag_raise("highlight")
+    
+    def goto_index(self, index):
+        if self.pdf_document and index != self.current_page:
+            self.current_page = index
+            self.render_page()
+    
     def next_page(self):
         if self.pdf_document and self.current_page < self.total_pages - 1:
-            self.current_page += 1
-            self.render_page()
+            self.navigate(self.current_page + 1)
     
     def previous_page(self):
         if self.pdf_document and self.current_page > 0:
-            self.current_page -= 1
+            self.navigate(self.current_page - 1)
+    
+    def navigate(self, index):
+        # Einzelne Seitenwechsel sofort rendern, Serien (gehaltene Taste) nur ihre Zielseite
+        now = time.monotonic()
+        burst = ((now - self.last_navigation) * 1000 < NAVIGATION_BURST_MS
+                 or self.navigation_id is not None or self.zoom_render_id is not None)
+        self.last_navigation = now
+        self.current_page = index
+        if not burst:
             self.render_page()
+            return
+        
+        # Zähler und Vorschau sofort, Vorrendern bis zum Ende der Serie zurückstellen
+        self.update_labels()
+        if self.prefetcher:
+            self.prefetcher.cancel()
+        self.show_navigation_preview()
+        if self.navigation_id is not None:
+            self.root.after_cancel(self.navigation_id)
+        # Läuft eine Zoom-Serie, rendert deren Abschluss die Zielseite mit
+        if self.zoom_render_id is None:
+            self.navigation_id = self.root.after(NAVIGATION_SETTLE_MS, self.finish_navigation)
+    
+    def finish_navigation(self):
+        self.navigation_id = None
+        self.render_page()
+    
+    def show_navigation_preview(self):
+        # Während einer Serie: Seite aus dem Render-Cache oder vergrößerte Miniatur, ohne zu rendern
+        if self.continuous:
+            self.scroll_to_current_page()
+            return
+        if self.zoom_render_id is not None or round(self.zoom_level, 3) >= TILE_ZOOM_THRESHOLD:
+            return
+        key = RenderCache.make_key(self.doc_id, self.current_page, self.zoom_level, self.rotation)
+        img = self.render_cache.get(key)
+        if img is None:
+            data = self.thumbnails.store.get((self.doc_id, self.current_page))
+            if data is None:
+                return
+            # Miniaturen sind ungedreht gerendert
+            size = page_pixel_size(self.pdf_document[self.current_page], self.zoom_level, self.rotation)
+            img = Image.open(io.BytesIO(data)).rotate(-self.rotation, expand=True)
+            img = img.resize(size, Image.BILINEAR)
+        self.canvas.delete("highlight")
+        self.canvas.delete("selection")
+        self.put_page_image(img)
     
     def goto_page(self, event=None):
         if not self.pdf_document:
@@ -166,20 +1848,182 @@ class MyTinyDesk:
     
     def zoom_in(self):
         if self.pdf_document and self.zoom_level < 3.0:
-            self.zoom_level += 0.2
-            self.render_page()
+            self.set_zoom(round(self.zoom_level + 0.2, 2))
     
     def zoom_out(self):
         if self.pdf_document and self.zoom_level > 0.4:
-            self.zoom_level -= 0.2
-            self.render_page()
+            self.set_zoom(round(self.zoom_level - 0.2, 2))
+    
+    def set_zoom(self, zoom):
+        # Erster Tastendruck einer Serie: aktuelle Bitmaps als Vorschau-Quelle merken
+        if self.zoom_render_id is None:
+            self.capture_preview_sources()
+        else:
+            self.root.after_cancel(self.zoom_render_id)
+            self.zoom_render_id = None
+        
+        self.zoom_level = zoom
+        self.zoom_label.config(text=f"{int(self.zoom_level * 100)}%")
+        self.cancel_render()
+        # Offene Seitenwechsel rendert finish_zoom mit
+        if self.navigation_id is not None:
+            self.root.after_cancel(self.navigation_id)
+            self.navigation_id = None
+        self.show_zoom_preview()
+        
+        # Liegt die Zielstufe schon im Cache, sofort scharf anzeigen
+        key = RenderCache.make_key(self.doc_id, self.current_page, zoom, self.rotation)
+        if (not self.continuous and round(zoom, 3) < TILE_ZOOM_THRESHOLD
+                and self.render_cache.contains(key)):
+            self.finish_zoom()
+            return
+        
+        # Schnelle Tastendrücke zu einem einzigen Rendern zusammenfassen
+        self.zoom_render_id = self.root.after(ZOOM_SETTLE_MS, self.finish_zoom)
+    
+    def finish_zoom(self):
+        self.zoom_render_id = None
+        self.preview_sources = None
+        self.render_page()
+        self.preview_photos = []
+    
+    def capture_preview_sources(self):
+        # Quellen als (PIL-Image, x, y) beim aktuellen Zoom; fortlaufend ohne Vorschau.
+        # Einmal pro Zoom-Serie umgewandelt und mit finish_zoom wieder freigegeben
+        self.preview_sources = None
+        if self.continuous:
+            return
+        if self.tiled:
+            self.preview_sources = [(pil_image(img), col * TILE_SIZE, row * TILE_SIZE)
+                                    for (col, row), (_item, _photo, img) in self.tile_items.items()]
+            self.preview_size = self.tile_page_size
+        elif self.shown_image is not None:
+            self.preview_sources = [(pil_image(self.shown_image), 0, 0)]
+            self.preview_size = self.shown_image.size
+        self.preview_zoom = self.zoom_level
+    
+    def show_zoom_preview(self):
+        if not self.preview_sources:
+            return
+        
+        scale = self.zoom_level / self.preview_zoom
+        vx0 = self.canvas.canvasx(0)
+        vy0 = self.canvas.canvasy(0)
+        vx1 = vx0 + self.canvas.winfo_width()
+        vy1 = vy0 + self.canvas.winfo_height()
+        
+        # Kacheln/Bild bis zum scharfen Rendern ausblenden
+        self.clear_canvas()
+        self.tiled = False
+        self.tile_items = {}
+        self.wanted_tiles = set()
+        self.preview_photos = []
+        
+        for img, x, y in self.preview_sources:
+            # Nur den Ausschnitt skalieren, der im neuen Maßstab sichtbar ist
+            left = max(0, int(vx0 / scale - x))
+            top = max(0, int(vy0 / scale - y))
+            right = min(img.width, math.ceil(vx1 / scale - x))
+            bottom = min(img.height, math.ceil(vy1 / scale - y))
+            if right <= left or bottom <= top:
+                continue
+            size = (max(1, round((right - left) * scale)), max(1, round((bottom - top) * scale)))
+            part = img.crop((left, top, right, bottom)).resize(size, Image.NEAREST)
+            photo = self.display.photo(part)
+            self.canvas.create_image((x + left) * scale, (y + top) * scale, anchor=tk.NW, image=photo)
+            self.preview_photos.append(photo)
+        
+        width, height = self.preview_size
+        self.canvas.config(scrollregion=(0, 0, width * scale, height * scale))
+    
+    def cancel_view_work(self):
+        # Offene Aufträge der Ansicht verwerfen, die Worker laufen weiter
+        if self.navigation_id is not None:
+            self.root.after_cancel(self.navigation_id)
+            self.navigation_id = None
+        if self.quality_settle_id is not None:
+            self.root.after_cancel(self.quality_settle_id)
+            self.quality_settle_id = None
+        self.draft_shown = None
+        if self.zoom_render_id is not None:
+            self.root.after_cancel(self.zoom_render_id)
+            self.zoom_render_id = None
+            self.preview_sources = None
+        if self.view_update_id is not None:
+            self.root.after_cancel(self.view_update_id)
+            self.view_update_id = None
+        if self.render_poll_id is not None:
+            self.root.after_cancel(self.render_poll_id)
+            self.render_poll_id = None
+        self.render_generation = 0
+        self.pending_parts = set()
+        if self.render_worker:
+            self.render_worker.cancel()
+        if self.prefetcher:
+            self.prefetcher.cancel()
+    
+    def stop_workers(self):
+        self.cancel_view_work()
+        if self.render_worker:
+            self.render_worker.stop()
+            self.render_worker = None
+        if self.prefetcher:
+            self.prefetcher.stop()
+            self.prefetcher = None
+        if self.search_worker:
+            self.search_worker.stop()
+            self.search_worker = None
+        if self.word_worker:
+            self.word_worker.stop()
+            self.word_worker = None
+        if self.watcher:
+            self.watcher.stop()
+            for doc_id in list(self.reloaders):
+                self.cancel_reloader(doc_id)
+        for doc_id in list(self.size_readers):
+            self.cancel_size_reader(doc_id)
+        self.thumbnails.close()
     
     def __del__(self):
-        if self.pdf_document:
-            self.pdf_document.close()
+        if self.opener:
+            self.opener.cancel()
+            self.opener.discard()
+        self.stop_workers()
+        for tab in self.tab_bar.tabs:
+            if tab.document:
+                tab.document.close()
 
-# Hauptfenster erstellen
-if __name__ == "__main__":
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="myTinyDesk PDF-Viewer")
+    parser.add_argument("pdf", nargs="?", help="PDF-Datei, die beim Start geöffnet wird")
+    parser.add_argument("--new-window", action="store_true",
+                        help="Eigenes Fenster, auch wenn der Einzelinstanz-Modus aktiv ist")
+    args = parser.parse_args(argv)
+    pdf_path = os.path.abspath(args.pdf) if args.pdf else None
+    
+    # Einzelinstanz-Modus: Datei an das laufende Fenster übergeben und beenden
+    instance = None
+    if single_instance_enabled() and not args.new_window:
+        socket_file = instance_socket_path()
+        if hand_over(socket_file, pdf_path):
+            return 0
+        instance = InstanceServer.listen(socket_file)
+        # Gleichzeitig gestartet: das andere Fenster hat den Socket gewonnen
+        if instance is None and hand_over(socket_file, pdf_path):
+            return 0
+    
+    # Hauptfenster erstellen
     root = tk.Tk()
-    app = MyTinyDesk(root)
-    root.mainloop()
+    app = MyTinyDesk(root, instance)
+    if pdf_path:
+        root.after_idle(app.open_path, pdf_path)
+    try:
+        root.mainloop()
+    finally:
+        if instance:
+            instance.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""
+Speicherbudget für myTinyDesk (Terminalserver-Modus)
+Teilt ein Gesamtbudget auf den Render-Cache, die Display-Lists der Worker
+und den Ressourcen-Store von PyMuPDF auf und ermittelt den aktuellen Verbrauch.
+
+Umgebungsvariablen:
+    MYTINYDESK_MEMORY_MB      Gesamtbudget in MB (0 = aus, Einzelbudgets gelten)
+    MYTINYDESK_IDLE_PURGE_S   Caches nach so vielen Sekunden ohne Eingabe leeren
+"""
+
+import os
+import re
+import sys
+
+from lazy_import import lazy_import
+
+fitz = lazy_import("fitz")  # PyMuPDF
+
+# Anteile am Gesamtbudget
+RENDER_CACHE_SHARE = 0.4
+DISPLAY_LIST_SHARE = 0.25
+FITZ_STORE_SHARE = 0.25
+THUMBNAIL_SHARE = 0.1
+
+# Worker mit eigenem Dokument-Handle: Render, Vorrendern, Miniaturen, Suche, Wörter
+DOCUMENT_WORKERS = 5
+
+
+class MemoryBudget:
+    """Gesamtbudget für alle Caches eines Viewer-Prozesses
+
+    Die Display-Lists teilen sich ihren Anteil auf alle Worker auf, die
+    Dokumente öffnen, der PyMuPDF-Store ist prozessweit und wird von den
+    Workern nach jedem Auftrag auf seinen Anteil zurückgeschnitten.
+    """
+
+    def __init__(self, total_bytes, workers=DOCUMENT_WORKERS, idle_purge=300.0):
+        self.total_bytes = total_bytes
+        self.workers = max(1, workers)
+        self.idle_purge = idle_purge
+
+    @classmethod
+    def from_environment(cls, workers=DOCUMENT_WORKERS):
+        """Budget aus MYTINYDESK_MEMORY_MB, None falls der Modus aus ist"""
+        total_mb = int(os.environ.get("MYTINYDESK_MEMORY_MB", "0"))
+        if total_mb <= 0:
+            return None
+        return cls(total_mb * 1024 * 1024, workers,
+                   idle_purge=float(os.environ.get("MYTINYDESK_IDLE_PURGE_S", "300")))
+
+    @property
+    def render_cache_bytes(self):
+        return int(self.total_bytes * RENDER_CACHE_SHARE)
+
+    @property
+    def display_list_bytes(self):
+        """Budget für die Display-Lists eines einzelnen Workers"""
+        return int(self.total_bytes * DISPLAY_LIST_SHARE / self.workers)
+
+    @property
+    def fitz_store_bytes(self):
+        return int(self.total_bytes * FITZ_STORE_SHARE)
+
+    @property
+    def thumbnail_bytes(self):
+        return int(self.total_bytes * THUMBNAIL_SHARE)
+
+
+def _fitz_store_usage():
+    """(Größe, Obergrenze) des PyMuPDF-Stores in Bytes, None falls nicht abfragbar
+
+    `TOOLS.store_size()` und `TOOLS.store_maxsize()` liefern in neueren
+    PyMuPDF-Versionen immer None, dann werden beide Werte aus der
+    Store-Übersicht von MuPDF gelesen.
+    """
+    size, maxsize = fitz.TOOLS.store_size(), fitz.TOOLS.store_maxsize()
+    if isinstance(size, int) and isinstance(maxsize, int):
+        return size, maxsize
+    mupdf = getattr(fitz, "mupdf", None)
+    if mupdf is None:
+        return None
+    try:
+        buffer = mupdf.FzBuffer(1024)
+        output = mupdf.FzOutput(buffer)
+        mupdf.fz_debug_store(output)
+        output.fz_close_output()
+        listing = buffer.fz_buffer_extract().decode("utf-8", "replace")
+    except Exception:
+        return None
+    match = re.search(r"max=(\d+), size=\d+, actual size=(\d+)", listing)
+    return (int(match.group(2)), int(match.group(1))) if match else None
+
+
+def fitz_store_size():
+    """Aktuelle Größe des PyMuPDF-Stores in Bytes, None falls nicht abfragbar"""
+    usage = _fitz_store_usage()
+    return usage[0] if usage else None
+
+
+def limit_fitz_store(max_bytes):
+    """Schneidet den PyMuPDF-Store auf max_bytes zurück
+
+    Die Obergrenze des Stores lässt sich aus Python nicht setzen
+    (`TOOLS.store_maxsize` ist nur lesbar), deshalb wird nach dem Rendern
+    zurückgeschnitten. `TOOLS.store_shrink(p)` verkleinert den Store auf
+    (100 - p) % seiner Obergrenze, nicht seiner aktuellen Größe. Ist die
+    Größe nicht abfragbar, wird der Store nur geleert, wenn der Prozess
+    sein Gesamtbudget (RSS) überschreitet.
+    """
+    usage = _fitz_store_usage()
+    if usage is None:
+        rss = current_rss_bytes()
+        if rss is not None and rss > max_bytes / FITZ_STORE_SHARE:
+            fitz.TOOLS.store_shrink(100)
+        return
+    size, maxsize = usage
+    if size > max_bytes:
+        fitz.TOOLS.store_shrink(100 - min(99, max_bytes * 100 // maxsize))
+
+
+def empty_fitz_store():
+    """Gibt alle zwischengespeicherten Ressourcen (Fonts, Bilder) frei"""
+    fitz.TOOLS.store_shrink(100)
+
+
+def current_rss_bytes():
+    """Aktueller Arbeitsspeicher (RSS) des Prozesses, None falls nicht ermittelbar"""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def peak_rss_bytes(children=False):
+    """Maximaler Arbeitsspeicher des Prozesses, None falls nicht ermittelbar
+
+    Mit `children` der größte bereits beendete Kindprozess (z.B. Export-Pool).
+    """
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux meldet KB, macOS Bytes
+    return peak if sys.platform == "darwin" else peak * 1024
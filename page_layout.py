@@ -0,0 +1,118 @@
+"""
+Seitenlayout für die fortlaufende Ansicht von myTinyDesk
+Berechnet die Positionen aller Seiten aus den vorab ermittelten Seitengrößen,
+ohne eine Seite zu rendern. Speicherbedarf: zwei Zahlen pro Seite.
+Die Seitengrößen liest ein Thread (`PageSizeReader`), damit große Dokumente
+die Tk-Hauptschleife nicht blockieren.
+"""
+
+import queue
+import threading
+from array import array
+
+from lazy_import import lazy_import
+from rendering import page_sizes
+
+fitz = lazy_import("fitz")  # PyMuPDF
+
+# Abstand zwischen zwei Seiten (Pixel, unabhängig vom Zoom)
+PAGE_GAP = 10
+
+
+def rotated_sizes(sizes, rotation):
+    """Seitengrößen (Breite, Höhe) bei Zoom 1 nach der Drehung"""
+    if rotation % 180:
+        return ((height, width) for width, height in sizes)
+    return iter(sizes)
+
+
+class PageLayout:
+    """Vertikales Layout aller Seiten, skaliert mit dem Zoom"""
+
+    def __init__(self, sizes, gap=PAGE_GAP):
+        self.gap = gap
+        self.widths = array('d')
+        self.heights = array('d')
+        # Oberkante jeder Seite bei Zoom 1, ohne Seitenabstände
+        self.tops = array('d')
+
+        y = 0.0
+        for width, height in sizes:
+            self.widths.append(width)
+            self.heights.append(height)
+            self.tops.append(y)
+            y += height
+        self.content_height = y
+        self.max_width = max(self.widths, default=0.0)
+
+    def __len__(self):
+        return len(self.tops)
+
+    def total_size(self, zoom):
+        """Größe der gesamten Scrollfläche (Breite, Höhe)"""
+        gaps = self.gap * max(0, len(self) - 1)
+        return self.max_width * zoom, self.content_height * zoom + gaps
+
+    def page_top(self, index, zoom):
+        return self.tops[index] * zoom + index * self.gap
+
+    def page_rect(self, index, zoom):
+        """Position einer Seite (x0, y0, x1, y1), horizontal zentriert"""
+        width = self.widths[index] * zoom
+        x0 = (self.max_width * zoom - width) / 2
+        y0 = self.page_top(index, zoom)
+        return x0, y0, x0 + width, y0 + self.heights[index] * zoom
+
+    def page_at(self, y, zoom):
+        """Index der Seite an Höhe y (Abstände zählen zur Seite darüber)"""
+        lo, hi = 0, len(self) - 1
+        if hi < 0:
+            return 0
+        # Binäre Suche nach der letzten Seite mit Oberkante <= y
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if self.page_top(mid, zoom) <= y:
+                lo = mid
+            else:
+                hi = mid - 1
+        return lo
+
+    def visible_range(self, y0, y1, zoom):
+        """Erste und letzte Seite, die den Bereich y0..y1 schneiden"""
+        return self.page_at(y0, zoom), self.page_at(y1, zoom)
+
+
+class PageSizeReader(threading.Thread):
+    """Liest die Größen aller Seiten mit eigenem Dokument-Handle
+
+    Meldungen in `results`:
+        ("sizes", Größen)       Liste (Breite, Höhe) bei Zoom 1, ohne Drehung
+        ("error", Fehler)
+    Nach cancel() endet der Thread ohne Meldung.
+    """
+
+    def __init__(self, pdf_path, loader=None):
+        super().__init__(name="mytinydesk-page-sizes", daemon=True)
+        self.pdf_path = pdf_path
+        self.loader = loader
+        self.results = queue.Queue()
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        doc = None
+        try:
+            doc = self.loader.open(self.pdf_path)[0] if self.loader else fitz.open(self.pdf_path)
+            sizes = []
+            for size in page_sizes(doc):
+                if self.cancelled:
+                    return
+                sizes.append(size)
+            self.results.put(("sizes", sizes))
+        except Exception as e:
+            self.results.put(("error", e))
+        finally:
+            if doc is not None:
+                doc.close()
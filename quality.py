@@ -0,0 +1,94 @@
+"""
+Adaptive Renderqualität für myTinyDesk
+Misst pro Dokument, wie lange das Rendern ganzer Seiten dauert (ms pro
+Megapixel, gleitender Mittelwert). Blättert der Benutzer schnell und würde
+die nächste Seite das Latenzziel überschreiten, wird sie als Entwurf
+gerendert: mit geringerer Auflösung (im Worker hochskaliert) und ohne
+Annotationen. Sobald die Eingaben ruhen, wird die aktuelle Seite in voller
+Qualität nachgerendert. Entwürfe landen weder im Render- noch im Plattencache.
+
+Umgebungsvariablen:
+    MYTINYDESK_TARGET_MS   Latenzziel pro Seitenwechsel in ms (Standard: 120, 0 = aus)
+    MYTINYDESK_SETTLE_MS   Ruhezeit bis zum Nachrendern in voller Qualität (Standard: 250)
+"""
+
+import math
+import os
+import time
+
+# Geringste Auflösung eines Entwurfs (Anteil der vollen Auflösung je Achse)
+MIN_SCALE = 0.35
+# Entwurfsauflösungen werden auf dieses Raster abgerundet
+SCALE_STEP = 0.05
+# Gewicht einer neuen Messung im gleitenden Mittelwert
+SMOOTHING = 0.3
+
+
+class QualityGovernor:
+    """Entscheidet pro Seitenwechsel zwischen Entwurf und voller Qualität
+
+    `note_navigation()` wird bei jedem Seitenwechsel aufgerufen und meldet,
+    ob der vorige weniger als `settle_ms` zurückliegt (aktives Blättern).
+    `draft_scale()` liefert dann die Auflösung des Entwurfs oder None für
+    volle Qualität; `record()` füttert die Messwerte aus dem Render-Worker.
+    """
+
+    def __init__(self, target_ms=120, settle_ms=250):
+        self.target_ms = target_ms
+        self.settle_ms = settle_ms
+        self.drafts = 0
+        self._rates = {}
+        self._last_navigation = 0.0
+
+    @classmethod
+    def from_environment(cls):
+        target_ms = float(os.environ.get("MYTINYDESK_TARGET_MS", "120"))
+        if target_ms <= 0:
+            return None
+        return cls(target_ms, int(os.environ.get("MYTINYDESK_SETTLE_MS", "250")))
+
+    def note_navigation(self):
+        """Merkt einen Seitenwechsel vor, True falls der Benutzer gerade blättert"""
+        now = time.monotonic()
+        navigating = (now - self._last_navigation) * 1000 < self.settle_ms
+        self._last_navigation = now
+        return navigating
+
+    def record(self, doc_id, pixels, seconds):
+        """Renderdauer einer ganzen Seite in voller Qualität übernehmen"""
+        megapixels = pixels / 1e6
+        if megapixels <= 0:
+            return
+        rate = seconds * 1000 / megapixels
+        previous = self._rates.get(doc_id)
+        self._rates[doc_id] = rate if previous is None else previous + SMOOTHING * (rate - previous)
+
+    def expected_ms(self, doc_id, pixels):
+        """Erwartete Renderdauer in voller Qualität, None ohne Messwerte"""
+        rate = self._rates.get(doc_id)
+        return None if rate is None else rate * pixels / 1e6
+
+    def draft_scale(self, doc_id, pixels, navigating):
+        """Auflösung eines Entwurfs (0 < s < 1) oder None für volle Qualität"""
+        if not navigating:
+            return None
+        expected = self.expected_ms(doc_id, pixels)
+        if expected is None or expected <= self.target_ms:
+            return None
+        # Rasterzeit wächst mit der Pixelzahl, also quadratisch mit der Auflösung
+        scale = math.floor(math.sqrt(self.target_ms / expected) / SCALE_STEP) * SCALE_STEP
+        scale = max(MIN_SCALE, round(scale, 2))
+        if scale >= 1.0:
+            return None
+        self.drafts += 1
+        return scale
+
+    def forget(self, doc_id):
+        self._rates.pop(doc_id, None)
+
+    def stats(self):
+        return {
+            "target_ms": self.target_ms,
+            "drafts": self.drafts,
+            "ms_per_megapixel": {doc_id: round(rate, 1) for doc_id, rate in self._rates.items()},
+        }
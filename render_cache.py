@@ -0,0 +1,213 @@
+"""
+Render-Cache für myTinyDesk
+Hält bereits gerenderte Seiten und interpretierte Seiteninhalte (Display-Lists)
+im Speicher, jeweils begrenzt durch ein Byte-Budget (LRU)
+"""
+
+import threading
+from collections import OrderedDict
+
+
+def image_size_bytes(img):
+    """Speicherbedarf eines gerenderten Bilds in Bytes
+
+    Eine PpmBitmap belegt genau ihren PPM-Block; PIL legt Mehrkanal-Bilder
+    (z.B. RGB) mit 4 Byte pro Pixel ab.
+    """
+    data = getattr(img, "ppm_data", None)
+    if data is not None:
+        return len(data)
+    bands = len(img.getbands())
+    return img.width * img.height * (1 if bands == 1 else 4)
+
+
+class RenderCache:
+    """LRU-Cache für gerenderte Seiten
+
+    Schlüssel: (Dokument-ID, Seitenindex, Zoom, Rotation), bei Kacheln
+    zusätzlich (Spalte, Zeile)
+    Verdrängt wird nach Bytes, nicht nach Anzahl der Einträge.
+    Thread-sicher, damit Hintergrund-Worker hineinrendern können.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        # Geschlossene Dokumente (IDs werden nicht wiederverwendet)
+        self._closed = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(doc_id, page_index, zoom, rotation=0):
+        """Baut einen Cache-Schlüssel (Zoom gerundet gegen Float-Drift)"""
+        return (doc_id, page_index, round(zoom, 3), rotation % 360)
+
+    @staticmethod
+    def make_tile_key(doc_id, page_index, zoom, rotation, col, row):
+        """Baut einen Schlüssel für eine Kachel (Kacheln werden pro Zoomstufe gecacht)"""
+        return RenderCache.make_key(doc_id, page_index, zoom, rotation) + (col, row)
+
+    def get(self, key):
+        """Liefert das gecachte Bild oder None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def contains(self, key):
+        """Prüft auf einen Eintrag ohne Statistik oder LRU-Reihenfolge zu ändern"""
+        with self._lock:
+            return key in self._entries
+
+    def put(self, key, img):
+        """Legt ein Bild ab und verdrängt alte Einträge bis das Budget passt"""
+        size = image_size_bytes(img)
+        with self._lock:
+            if key[0] in self._closed:
+                return
+            if key in self._entries:
+                self._remove(key)
+            # Einträge größer als das Budget gar nicht erst cachen
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (img, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def invalidate(self, doc_id):
+        """Entfernt alle Einträge eines Dokuments"""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == doc_id]:
+                self._remove(key)
+
+    def forget(self, doc_id):
+        """Geschlossenes Dokument: Einträge entfernen und spätere put() ignorieren
+
+        Hintergrund-Worker können noch Seiten liefern, die vor dem Schließen
+        in Arbeit waren; sie sollen nicht wieder Budget belegen.
+        """
+        with self._lock:
+            self._closed.add(doc_id)
+            for key in [k for k in self._entries if k[0] == doc_id]:
+                self._remove(key)
+
+    def invalidate_pages(self, doc_id, pages):
+        """Verwirft Seiten und Kacheln bestimmter Seiten eines Dokuments (geänderte Datei)"""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == doc_id and k[1] in pages]:
+                self._remove(key)
+
+    def demote(self, doc_id):
+        """Stellt die Einträge eines Dokuments an den Anfang der LRU-Reihenfolge
+
+        Für Dokumente in inaktiven Tabs: sie werden als erste verdrängt,
+        bleiben aber erhalten, solange das Budget reicht.
+        """
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == doc_id]:
+                self._entries.move_to_end(key, last=False)
+
+    def clear(self):
+        """Leert den Cache komplett"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        """Liefert Kennzahlen für Statusanzeige/Diagnose"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def _remove(self, key):
+        _img, size = self._entries.pop(key)
+        self.current_bytes -= size
+
+
+class DisplayListCache:
+    """LRU-Cache für fitz.DisplayList-Objekte eines Dokument-Handles
+
+    Eine Display-List enthält den einmal interpretierten Content-Stream
+    einer Seite und lässt sich bei beliebigem Zoom/Clip erneut rastern.
+    Sie gehört zum Dokument, aus dem sie erzeugt wurde, deshalb hat jeder
+    Worker seinen eigenen Cache und gibt die Einträge eines Dokuments vor
+    dessen Schließen frei (`discard`). Schlüssel ist (Dokument, Seite, Annotationen).
+    Der Speicherbedarf wird aus der Länge des Content-Streams geschätzt.
+    """
+
+    # Mindestgröße pro Eintrag (Verwaltungsaufwand, referenzierte Ressourcen)
+    MIN_ENTRY_BYTES = 64 * 1024
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, doc, page_index, annots=True):
+        """Liefert die Display-List einer Seite, erzeugt sie bei Bedarf"""
+        key = (id(doc), page_index, annots)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+        self.misses += 1
+        page = doc[page_index]
+        display_list = page.get_displaylist(annots=annots)
+        size = max(self.MIN_ENTRY_BYTES, 2 * len(page.read_contents()))
+        if size <= self.max_bytes:
+            self._entries[key] = (display_list, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+        return display_list
+
+    def discard(self, doc):
+        """Gibt die Display-Lists eines Dokuments frei (vor dessen Schließen)"""
+        for key in [k for k in self._entries if k[0] == id(doc)]:
+            self._remove(key)
+
+    def demote(self, doc):
+        """Display-Lists eines nicht mehr aktiven Dokuments zuerst verdrängen"""
+        for key in [k for k in self._entries if k[0] == id(doc)]:
+            self._entries.move_to_end(key, last=False)
+
+    def clear(self):
+        """Gibt alle Display-Lists frei (vor dem Schließen der Dokumente)"""
+        self._entries.clear()
+        self.current_bytes = 0
+
+    def stats(self):
+        """Liefert Kennzahlen für Statusanzeige/Diagnose"""
+        return {
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def _remove(self, key):
+        _display_list, size = self._entries.pop(key)
+        self.current_bytes -= size
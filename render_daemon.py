@@ -0,0 +1,517 @@
+#!/usr/bin/env python3
+"""
+Gemeinsamer Render-Dienst für myTinyDesk
+Ein Prozess pro Host hält die Dokumente und einen gemeinsamen Seiten-Cache
+und bedient beliebig viele Viewer über einen Unix-Socket. Dieselbe Seite
+wird so pro Host nur einmal gerendert, egal wie viele Benutzer sie öffnen.
+
+Protokoll: Nachrichten aus 4 Byte Länge + JSON. Dateien und Bitmaps werden
+als Dateideskriptoren übergeben (SCM_RIGHTS): Der Viewer öffnet das PDF
+selbst, der Dienst rendert also nur, was der Benutzer lesen darf. Die
+Pixel liegen in einem memfd (Shared Memory), den der Viewer einblendet;
+ohne memfd (z.B. macOS) folgen sie direkt auf dem Socket.
+
+Der Socket liegt in einem Ordner, den nur sein Besitzer (root oder das
+Dienstkonto) beschreiben darf, nie im geteilten Temp-Ordner. Vor dem
+Übergeben eines Deskriptors prüft der Viewer Ordner, Socket und den
+Prozess am anderen Ende (SO_PEERCRED); verbinden dürfen sich der Besitzer
+und mit --group die Mitglieder einer Gruppe.
+
+Start:
+    python render_daemon.py [--socket PFAD] [--group GRUPPE] [--cache-mb 256]
+
+Umgebungsvariablen (Viewer):
+    MYTINYDESK_DAEMON         "1": Dienst nutzen, falls er läuft (Standard: 0)
+    MYTINYDESK_DAEMON_SOCKET  Pfad des Sockets (Standard: /run/mytinydesk/render.sock)
+"""
+
+import argparse
+import json
+import mmap
+import os
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from lazy_import import lazy_import
+from render_cache import DisplayListCache
+from rendering import PpmBitmap, pixmap_mode, render_page_pixmap, render_tile_pixmap
+
+fitz = lazy_import("fitz")  # PyMuPDF
+
+# Nachrichtenkopf: Länge der JSON-Daten
+_LENGTH = struct.Struct("!I")
+MAX_MESSAGE = 64 * 1024
+
+# Wartezeiten des Viewers: Verbindungsaufbau und ein einzelnes Rendern (Sekunden)
+CONNECT_TIMEOUT = 0.5
+RENDER_TIMEOUT = 30.0
+
+DEFAULT_CACHE_MB = 256
+# Standardort des Sockets: vom Administrator angelegt, nur für den Besitzer schreibbar
+DEFAULT_SOCKET = "/run/mytinydesk/render.sock"
+DISPLAY_LIST_BYTES = 32 * 1024 * 1024
+
+
+class DaemonError(Exception):
+    """Dienst nicht erreichbar oder Verbindung abgebrochen -> lokal rendern"""
+
+
+def socket_path():
+    """Socket aus MYTINYDESK_DAEMON_SOCKET oder der Standardpfad"""
+    return os.environ.get("MYTINYDESK_DAEMON_SOCKET") or DEFAULT_SOCKET
+
+
+def daemon_enabled():
+    return hasattr(socket, "AF_UNIX") and os.environ.get("MYTINYDESK_DAEMON", "0") == "1"
+
+
+def peer_uid(sock):
+    """Benutzer des Prozesses am anderen Ende eines Unix-Sockets, None falls unbekannt"""
+    if not hasattr(socket, "SO_PEERCRED"):  # nur Linux
+        return None
+    creds = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    _pid, uid, _gid = struct.unpack("3i", creds)
+    return uid
+
+
+def trusted_socket(sock, path):
+    """Darf der Viewer dem Dienst hinter einem verbundenen Socket Dateien übergeben?
+
+    Der Ordner des Sockets darf nur für seinen Besitzer schreibbar sein,
+    sonst könnte ein anderer Benutzer den Socket zuerst anlegen. Dienst
+    und Socket-Datei müssen root, dem Benutzer selbst oder dem Besitzer des
+    Ordners gehören; ohne SO_PEERCRED zählt nur die Socket-Datei.
+    """
+    try:
+        folder = os.stat(os.path.dirname(os.path.abspath(path)))
+        owner = os.lstat(path).st_uid
+        peer = peer_uid(sock)
+    except OSError:
+        return False
+    if folder.st_mode & 0o022:
+        return False
+    trusted = {0, os.getuid(), folder.st_uid}
+    return owner in trusted and (peer is None or peer in trusted)
+
+
+def send_message(sock, message, fds=()):
+    data = json.dumps(message).encode("utf-8")
+    payload = _LENGTH.pack(len(data)) + data
+    if fds:
+        # Deskriptoren hängen am ersten Byte, der Rest geht normal hinterher
+        sent = socket.send_fds(sock, [payload], list(fds))
+        payload = payload[sent:]
+    if payload:
+        sock.sendall(payload)
+
+
+def recv_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1024 * 1024))
+        if not chunk:
+            raise ConnectionError("Verbindung geschlossen")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def recv_message(sock):
+    """Liest eine Nachricht: (Dict, Liste empfangener Deskriptoren)"""
+    header, fds, _flags, _addr = socket.recv_fds(sock, _LENGTH.size, 2)
+    if not header:
+        raise ConnectionError("Verbindung geschlossen")
+    header += recv_exact(sock, _LENGTH.size - len(header))
+    (length,) = _LENGTH.unpack(header)
+    if length > MAX_MESSAGE:
+        raise ConnectionError("Nachricht zu groß")
+    return json.loads(recv_exact(sock, length)), fds
+
+
+class PageBitmap:
+    """Gerenderte Pixel im gemeinsamen Cache: memfd oder (ohne memfd) Bytes"""
+
+    def __init__(self, pix):
+        self.mode = pixmap_mode(pix)
+        self.width = pix.width
+        self.height = pix.height
+        samples = pix.samples_mv
+        self.size = len(samples)
+        self.fd = None
+        self.data = None
+        if hasattr(os, "memfd_create"):
+            self.fd = os.memfd_create("mytinydesk-page", os.MFD_CLOEXEC)
+            os.ftruncate(self.fd, self.size)
+            with mmap.mmap(self.fd, self.size) as mm:
+                mm[:] = samples
+        else:
+            self.data = bytes(samples)
+
+    def header(self):
+        return {"ok": True, "mode": self.mode, "width": self.width, "height": self.height,
+                "size": self.size, "inline": self.fd is None}
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class SharedPageCache:
+    """LRU-Cache nach Bytes für die Bitmaps aller Sitzungen
+
+    `get`/`put` liefern zum Eintrag ein Duplikat des memfd, damit eine
+    gleichzeitige Verdrängung den Deskriptor nicht unter dem Senden schließt.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            bitmap = self._entries.get(key)
+            if bitmap is None:
+                self.misses += 1
+                return None, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return bitmap, self._share(bitmap)
+
+    def put(self, key, bitmap):
+        with self._lock:
+            shared = self._share(bitmap)
+            if bitmap.size > self.max_bytes:
+                bitmap.close()
+                return bitmap, shared
+            self._entries[key] = bitmap
+            self.current_bytes += bitmap.size
+            while self.current_bytes > self.max_bytes:
+                _key, oldest = self._entries.popitem(last=False)
+                self.current_bytes -= oldest.size
+                oldest.close()
+            return bitmap, shared
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self.current_bytes,
+                    "max_bytes": self.max_bytes, "hits": self.hits, "misses": self.misses}
+
+    @staticmethod
+    def _share(bitmap):
+        return os.dup(bitmap.fd) if bitmap.fd is not None else None
+
+
+class SharedDocument:
+    """Ein Dokument-Handle pro Datei, gemeinsam für alle Sitzungen
+
+    PyMuPDF-Dokumente sind nicht thread-sicher, deshalb rendert pro
+    Dokument immer nur ein Thread.
+    """
+
+    def __init__(self, identity, fd):
+        self.identity = identity
+        self.doc = self._open(fd)
+        self.lock = threading.Lock()
+        self.display_lists = DisplayListCache(DISPLAY_LIST_BYTES)
+        self.refs = 0
+
+    @staticmethod
+    def _open(fd):
+        # Über /proc lesen, falls der Dienst die Datei selbst öffnen darf,
+        # sonst aus dem übergebenen Deskriptor in den Speicher
+        proc_path = f"/proc/self/fd/{fd}"
+        if os.path.exists(proc_path):
+            try:
+                return fitz.open(proc_path, filetype="pdf")
+            except Exception:
+                pass
+        with os.fdopen(os.dup(fd), "rb") as f:
+            f.seek(0)
+            return fitz.open("pdf", f.read())
+
+    def close(self):
+        with self.lock:
+            self.display_lists.clear()
+            self.doc.close()
+
+
+class RenderDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix-Socket-Server, ein Thread pro verbundenem Viewer"""
+
+    daemon_threads = True
+
+    def __init__(self, path, cache_bytes, group=None):
+        self.path = path
+        self.cache = SharedPageCache(cache_bytes)
+        self.documents = {}
+        self.documents_lock = threading.Lock()
+        self.renders = 0
+        super().__init__(path, SessionHandler)
+        # Nur der eigene Benutzer, mit `group` auch deren Mitglieder; Zugriff
+        # auf die Dokumente ergibt sich aus den übergebenen Deskriptoren
+        if group is None:
+            os.chmod(path, 0o600)
+        else:
+            import grp  # nur Unix
+            os.chown(path, -1, grp.getgrnam(group).gr_gid)
+            os.chmod(path, 0o660)
+
+    def acquire(self, fd):
+        """Liefert das gemeinsame Dokument zur Datei hinter fd (Referenz +1)"""
+        st = os.fstat(fd)
+        identity = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+        with self.documents_lock:
+            document = self.documents.get(identity)
+            if document is None:
+                document = SharedDocument(identity, fd)
+                self.documents[identity] = document
+            document.refs += 1
+            return document
+
+    def release(self, document):
+        with self.documents_lock:
+            document.refs -= 1
+            if document.refs > 0:
+                return
+            del self.documents[document.identity]
+        # Gecachte Seiten bleiben, nur das Dokument-Handle wird geschlossen
+        document.close()
+
+    def render(self, document, request):
+        """Liefert (Bitmap, geteilter memfd), rendert nur bei Cache-Fehlschlag"""
+        tile = tuple(request["tile"]) if request.get("tile") is not None else None
+        page_index = request["page"]
+        zoom = request["zoom"]
+        rotation = request.get("rotation", 0) % 360
+        gray = bool(request.get("gray"))
+        key = (document.identity, page_index, round(zoom, 3), rotation, tile, gray)
+
+        bitmap, shared = self.cache.get(key)
+        if bitmap is not None:
+            return bitmap, shared
+        with document.lock:
+            # Eine andere Sitzung kann die Seite inzwischen gerendert haben
+            bitmap, shared = self.cache.get(key)
+            if bitmap is not None:
+                return bitmap, shared
+            if tile is None:
+                pix = render_page_pixmap(document.doc, page_index, zoom, rotation,
+                                         display_lists=document.display_lists, gray=gray)
+            else:
+                pix = render_tile_pixmap(document.doc, page_index, zoom, rotation, *tile,
+                                         display_lists=document.display_lists, gray=gray)
+            self.renders += 1
+            return self.cache.put(key, PageBitmap(pix))
+
+    def stats(self):
+        with self.documents_lock:
+            documents = len(self.documents)
+        return {"documents": documents, "renders": self.renders, "cache": self.cache.stats()}
+
+
+class SessionHandler(socketserver.BaseRequestHandler):
+    """Eine Viewer-Verbindung; Handles gelten nur innerhalb der Verbindung"""
+
+    def handle(self):
+        sock = self.request
+        handles = {}
+        try:
+            while True:
+                try:
+                    request, fds = recv_message(sock)
+                except (ConnectionError, OSError, ValueError):
+                    return
+                try:
+                    self.dispatch(sock, request, fds, handles)
+                except (ConnectionError, BrokenPipeError):
+                    return
+                except Exception as e:
+                    send_message(sock, {"ok": False, "error": str(e)})
+                finally:
+                    for fd in fds:
+                        os.close(fd)
+        finally:
+            for document in handles.values():
+                self.server.release(document)
+
+    def dispatch(self, sock, request, fds, handles):
+        op = request.get("op")
+        if op == "open":
+            if not fds:
+                raise ValueError("Kein Dateideskriptor übergeben")
+            document = self.server.acquire(fds[0])
+            handle = max(handles, default=0) + 1
+            handles[handle] = document
+            send_message(sock, {"ok": True, "handle": handle, "pages": len(document.doc)})
+        elif op == "render":
+            document = handles.get(request.get("handle"))
+            if document is None:
+                raise ValueError("Unbekanntes Dokument-Handle")
+            bitmap, shared = self.server.render(document, request)
+            if shared is not None:
+                try:
+                    send_message(sock, bitmap.header(), [shared])
+                finally:
+                    os.close(shared)
+            else:
+                send_message(sock, bitmap.header())
+                sock.sendall(bitmap.data)
+        elif op == "close":
+            document = handles.pop(request["handle"], None)
+            if document is not None:
+                self.server.release(document)
+            send_message(sock, {"ok": True})
+        elif op == "stats":
+            send_message(sock, dict(ok=True, **self.server.stats()))
+        else:
+            raise ValueError(f"Unbekannte Operation: {op}")
+
+
+class DaemonDocument:
+    """Dokument beim Render-Dienst, Ersatz für fitz.Document in den Workern
+
+    Jeder Worker hat seine eigene Verbindung. Fehler der Verbindung werden
+    als DaemonError gemeldet, damit der Worker lokal weiterrendern kann.
+    """
+
+    def __init__(self, sock, handle, page_count):
+        self.sock = sock
+        self.handle = handle
+        self.page_count = page_count
+
+    @classmethod
+    def connect(cls, pdf_path, path=None):
+        """Öffnet pdf_path beim Dienst, None falls dieser nicht läuft"""
+        path = path or socket_path()
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(CONNECT_TIMEOUT)
+            sock.connect(path)
+            if not trusted_socket(sock, path):
+                # Fremder Socket: das Dokument nicht übergeben
+                sock.close()
+                return None
+            sock.settimeout(RENDER_TIMEOUT)
+            with open(pdf_path, "rb") as f:
+                send_message(sock, {"op": "open"}, [f.fileno()])
+            reply, _fds = recv_message(sock)
+        except (OSError, ValueError):
+            sock.close()
+            return None
+        if not reply.get("ok"):
+            sock.close()
+            return None
+        return cls(sock, reply["handle"], reply["pages"])
+
+    def __len__(self):
+        return self.page_count
+
+    def render(self, page_index, zoom, rotation=0, tile=None, timings=None, gray=False):
+        """Rendert eine Seite oder Kachel beim Dienst und liefert eine PpmBitmap"""
+        start = time.perf_counter()
+        request = {"op": "render", "handle": self.handle, "page": page_index, "zoom": zoom,
+                   "rotation": rotation, "tile": list(tile) if tile is not None else None,
+                   "gray": gray}
+        try:
+            send_message(self.sock, request)
+            reply, fds = recv_message(self.sock)
+            if not reply.get("ok"):
+                for fd in fds:
+                    os.close(fd)
+                raise RuntimeError(reply.get("error", "Rendern fehlgeschlagen"))
+            if reply["inline"]:
+                samples = recv_exact(self.sock, reply["size"])
+            elif not fds:
+                raise DaemonError("Keine Bitmap empfangen")
+        except (OSError, ValueError) as e:
+            raise DaemonError(str(e)) from e
+        now = time.perf_counter()
+        if timings is not None:
+            timings["daemon"] = timings.get("daemon", 0.0) + (now - start)
+
+        size = (reply["width"], reply["height"])
+        if reply["inline"]:
+            img = PpmBitmap(reply["mode"], size, samples)
+        else:
+            try:
+                with mmap.mmap(fds[0], reply["size"], prot=mmap.PROT_READ) as mm:
+                    img = PpmBitmap(reply["mode"], size, mm)
+            finally:
+                for fd in fds:
+                    os.close(fd)
+        if timings is not None:
+            timings["convert"] = timings.get("convert", 0.0) + (time.perf_counter() - now)
+        return img
+
+    def close(self):
+        try:
+            send_message(self.sock, {"op": "close", "handle": self.handle})
+            recv_message(self.sock)
+        except (OSError, ValueError):
+            pass
+        self.sock.close()
+
+
+def _socket_in_use(path):
+    """True, wenn unter path bereits ein Dienst antwortet"""
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.settimeout(CONNECT_TIMEOUT)
+        probe.connect(path)
+        return True
+    except OSError:
+        return False
+    finally:
+        probe.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="myTinyDesk Render-Dienst")
+    parser.add_argument("--socket", default=socket_path(), help="Pfad des Unix-Sockets")
+    parser.add_argument("--group", help="Gruppe, deren Mitglieder sich verbinden dürfen (Standard: nur der Besitzer)")
+    parser.add_argument("--cache-mb", type=int, default=DEFAULT_CACHE_MB,
+                        help="Budget des gemeinsamen Seiten-Caches (MB)")
+    args = parser.parse_args(argv)
+
+    if not hasattr(socket, "AF_UNIX"):
+        print("Unix-Sockets werden auf diesem System nicht unterstützt", file=sys.stderr)
+        return 1
+    if os.path.exists(args.socket):
+        if _socket_in_use(args.socket):
+            print(f"Render-Dienst läuft bereits: {args.socket}", file=sys.stderr)
+            return 1
+        # Überbleibsel eines abgestürzten Dienstes
+        os.unlink(args.socket)
+
+    folder = os.path.dirname(os.path.abspath(args.socket))
+    if not os.path.isdir(folder):
+        print(f"Ordner {folder} fehlt (z.B. install -d -m 0755 {folder})", file=sys.stderr)
+        return 1
+    if os.stat(folder).st_mode & 0o022:
+        print(f"Ordner {folder} ist für andere schreibbar, Viewer würden den Dienst ablehnen",
+              file=sys.stderr)
+        return 1
+    server = RenderDaemon(args.socket, args.cache_mb * 1024 * 1024, args.group)
+    print(f"myTinyDesk Render-Dienst auf {args.socket} ({args.cache_mb} MB Cache)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.unlink(args.socket)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
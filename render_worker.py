@@ -0,0 +1,471 @@
+"""
+Hintergrund-Worker für myTinyDesk
+Jeder Worker öffnet die PDFs mit eigenen fitz.Documents, damit die
+Dokumente der UI nie zwischen Threads geteilt werden. Alle Tabs teilen
+sich dieselben Worker.
+"""
+
+import itertools
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+from lazy_import import lazy_import
+from memory_budget import empty_fitz_store, limit_fitz_store
+from disk_cache import file_fingerprint, page_entry
+from render_cache import DisplayListCache, RenderCache
+from render_daemon import DaemonDocument, DaemonError
+from rendering import render_draft_image, render_page_image, render_tile_image
+
+fitz = lazy_import("fitz")  # PyMuPDF
+
+
+class DocumentWorker(threading.Thread):
+    """Basis für Worker mit eigenen Dokument-Handles und Generationszähler
+
+    Ein Worker bedient alle geöffneten Dokumente (Tabs): Dokumente werden
+    mit `add_document` angemeldet und beim ersten Auftrag im Worker-Thread
+    geöffnet; höchstens MAX_OPEN_DOCUMENTS bleiben offen, das am längsten
+    nicht benutzte wird zuerst geschlossen.
+    Es gibt immer nur einen offenen Auftrag: ein neuer Auftrag ersetzt den
+    alten und erhöht die Generation, wodurch laufende Arbeit als veraltet gilt.
+    Während `process` läuft, beschreiben `doc_id` und `fingerprint` das
+    Dokument des Auftrags.
+    Interpretierte Seiten (Display-Lists) werden pro Worker gecacht.
+    Mit `store_limit` wird der PyMuPDF-Store nach jedem Auftrag auf diese
+    Größe zurückgeschnitten, `gray` rendert in Graustufen.
+    Mit `daemon_socket` wird über den gemeinsamen Render-Dienst gerendert;
+    läuft dieser nicht (mehr), rendert der Worker mit eigenem Dokument.
+    Mit `disk_cache` und dem Fingerabdruck der Datei werden ganze Seiten
+    zuerst auf der Platte gesucht und nach dem Rendern dort abgelegt.
+    Mit `loader` (document_io.DocumentLoader) werden Dateien auf
+    Netzlaufwerken aus einer lokalen Kopie gelesen.
+    """
+
+    # Standard-Budget für die Display-Lists eines Workers
+    DISPLAY_LIST_BYTES = 32 * 1024 * 1024
+    # Gleichzeitig offene Dokumente pro Worker
+    MAX_OPEN_DOCUMENTS = 3
+
+    def __init__(self, name, display_list_bytes=None, store_limit=None, gray=False,
+                 daemon_socket=None, disk_cache=None, loader=None):
+        super().__init__(name=name, daemon=True)
+        self.display_lists = DisplayListCache(display_list_bytes or self.DISPLAY_LIST_BYTES)
+        self.store_limit = store_limit
+        self.gray = gray
+        self.daemon_socket = daemon_socket
+        self.disk_cache = disk_cache
+        self.loader = loader
+        self.doc_id = None
+        self.fingerprint = None
+
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._stopped = False
+        self._purge = False
+        self._generation = 0
+        self._job = None
+        # (Dokument-ID, Fassung) des zuletzt übernommenen Auftrags
+        self._active = None
+        # Dokument-ID -> (Pfad, Fingerabdruck, Fassung)
+        self._sources = {}
+        self._revisions = itertools.count(1)
+
+    def add_document(self, doc_id, pdf_path, fingerprint=None):
+        """Meldet ein Dokument an, geöffnet wird es erst mit dem ersten Auftrag"""
+        with self._lock:
+            self._sources[doc_id] = (pdf_path, fingerprint, next(self._revisions))
+
+    def reload_document(self, doc_id, fingerprint=None):
+        """Datei geändert: das Handle wird vor dem nächsten Auftrag neu geöffnet
+
+        Offene und laufende Arbeit an diesem Dokument wird verworfen, Aufträge
+        anderer Dokumente laufen weiter. Liefert die Generation, ab der
+        Ergebnisse dieses Dokuments aus der neuen Fassung der Datei stammen.
+        """
+        with self._lock:
+            if doc_id in self._sources:
+                pdf_path = self._sources[doc_id][0]
+                self._sources[doc_id] = (pdf_path, fingerprint, next(self._revisions))
+            if self._job is not None and self._job[0] == doc_id:
+                self._job = None
+            # Der nächste Auftrag bekommt mindestens diese Generation
+            generation = self._generation + 1
+        self._wakeup.set()
+        return generation
+
+    def remove_document(self, doc_id):
+        """Meldet ein Dokument ab, der Worker schließt sein Handle beim nächsten Aufwachen"""
+        with self._lock:
+            self._sources.pop(doc_id, None)
+            if self._job is not None and self._job[0] == doc_id:
+                self._job = None
+        self._wakeup.set()
+
+    def submit(self, doc_id, job):
+        """Ersetzt den offenen Auftrag und liefert dessen Generation"""
+        with self._lock:
+            self._generation += 1
+            self._job = (doc_id, job)
+            generation = self._generation
+        self._wakeup.set()
+        return generation
+
+    def cancel(self):
+        """Verwirft den offenen Auftrag, laufende Arbeit wird veraltet"""
+        with self._lock:
+            self._generation += 1
+            self._job = None
+
+    def purge(self):
+        """Gibt Display-Lists, PyMuPDF-Store und inaktive Dokumente im Worker-Thread frei"""
+        self._purge = True
+        self._wakeup.set()
+
+    def stop(self):
+        """Beendet den Worker (schließt seine Dokumente beim Verlassen)"""
+        self._stopped = True
+        self.cancel()
+        self._wakeup.set()
+
+    def run(self):
+        # Dokument-ID -> offenes Dokument, zuletzt benutztes am Ende
+        docs = OrderedDict()
+        # Dokument-ID -> Fassung beim Öffnen
+        opened = {}
+        try:
+            while not self._stopped:
+                self._wakeup.wait()
+                self._wakeup.clear()
+                if self._stopped:
+                    break
+
+                with self._lock:
+                    generation = self._generation
+                    pending = self._job
+                    self._job = None
+                    sources = dict(self._sources)
+                    if pending is not None and pending[0] in sources:
+                        self._active = (pending[0], sources[pending[0]][2])
+
+                # Abgemeldete (geschlossene Tabs) und geänderte Dokumente freigeben
+                for doc_id in [d for d in docs if d not in sources or sources[d][2] != opened[d]]:
+                    self.close_document(docs.pop(doc_id))
+                if self._purge:
+                    self._purge = False
+                    # Nur das zuletzt benutzte Dokument bleibt offen
+                    while len(docs) > 1:
+                        self.close_document(docs.popitem(last=False)[1])
+                    self.display_lists.clear()
+                    empty_fitz_store()
+                if pending is None or pending[0] not in sources:
+                    continue
+
+                doc_id, job = pending
+                pdf_path, fingerprint, revision = sources[doc_id]
+                if self.doc_id in docs and self.doc_id != doc_id:
+                    # Anderer Tab: Display-Lists des bisherigen Dokuments zuerst verdrängen
+                    self.display_lists.demote(docs[self.doc_id])
+                self.doc_id = doc_id
+                self.fingerprint = fingerprint
+                try:
+                    doc = docs.get(doc_id)
+                    if doc is None:
+                        doc = docs[doc_id] = self.open_document(pdf_path)
+                        opened[doc_id] = revision
+                        while len(docs) > self.MAX_OPEN_DOCUMENTS:
+                            self.close_document(docs.popitem(last=False)[1])
+                    docs.move_to_end(doc_id)
+                    try:
+                        self.process(doc, generation, job)
+                    except DaemonError:
+                        # Render-Dienst weggefallen: mit eigenem Dokument weiter
+                        self.close_document(docs.pop(doc_id))
+                        self.daemon_socket = None
+                        doc = docs[doc_id] = self.open_document(pdf_path)
+                        self.process(doc, generation, job)
+                except Exception as e:
+                    self.on_error(generation, job, e)
+                if self.store_limit:
+                    limit_fitz_store(self.store_limit)
+        finally:
+            # Display-Lists gehören zu den Dokumenten und müssen vorher weg
+            self.display_lists.clear()
+            for doc in docs.values():
+                doc.close()
+
+    def open_document(self, pdf_path):
+        """Dokument beim Render-Dienst, falls erreichbar, sonst lokal"""
+        if self.daemon_socket:
+            doc = DaemonDocument.connect(pdf_path, self.daemon_socket)
+            if doc is not None:
+                return doc
+        if self.loader:
+            return self.loader.open(pdf_path)[0]
+        return fitz.open(pdf_path)
+
+    def close_document(self, doc):
+        self.display_lists.discard(doc)
+        doc.close()
+
+    def render_part(self, doc, page_index, zoom, rotation, tile=None, timings=None, draft=None):
+        """Rendert eine Seite oder Kachel (tile=(Spalte, Zeile)) als PpmBitmap
+
+        Mit `draft` (Auflösung 0 < s < 1) wird eine ganze Seite als Entwurf
+        gerendert, außer die scharfe Fassung liegt schon auf der Platte.
+        Entwürfe werden nicht auf der Platte abgelegt.
+        """
+        # Kacheln gibt es nur bei hohem Zoom, sie landen nicht auf der Platte
+        entry = None
+        if self.disk_cache and self.fingerprint and tile is None:
+            entry = page_entry(page_index, zoom, rotation, self.gray)
+            start = time.perf_counter()
+            img = self.disk_cache.get(self.fingerprint, entry)
+            if timings is not None:
+                timings["disk"] = time.perf_counter() - start
+            if img is not None:
+                return img
+
+        if isinstance(doc, DaemonDocument):
+            # Der Dienst cacht für alle Sitzungen, dort nur scharfe Seiten
+            img = doc.render(page_index, zoom, rotation, tile, timings, self.gray)
+        elif draft and tile is None:
+            return render_draft_image(doc, page_index, zoom, rotation, draft,
+                                      display_lists=self.display_lists, timings=timings, gray=self.gray)
+        elif tile is None:
+            img = render_page_image(doc, page_index, zoom, rotation, display_lists=self.display_lists,
+                                    timings=timings, gray=self.gray)
+        else:
+            img = render_tile_image(doc, page_index, zoom, rotation, *tile,
+                                    display_lists=self.display_lists, timings=timings, gray=self.gray)
+        if entry is not None:
+            self.disk_cache.put(self.fingerprint, entry, img)
+        return img
+
+    def process(self, doc, generation, job):
+        raise NotImplementedError
+
+    def on_error(self, generation, job, error):
+        """Standard: Fehler ignorieren (Hintergrundarbeit ist optional)"""
+
+    def is_stale(self, generation):
+        """Überholt, beendet oder Dokument seit Auftragsbeginn neu geladen/abgemeldet"""
+        if self._stopped or generation != self._generation:
+            return True
+        with self._lock:
+            doc_id, revision = self._active
+            source = self._sources.get(doc_id)
+        return source is None or source[2] != revision
+
+
+class RenderWorker(DocumentWorker):
+    """Rendert die angezeigten Seiten abseits der Tk-Hauptschleife
+
+    Ein Auftrag besteht aus Dokument-ID, Zoom, Rotation, einer Liste von
+    Teilen (Seitenindex, Kachel) und der Entwurfsauflösung (None = scharf);
+    Kachel ist None für ganze Seiten. Jeder
+    fertige Teil landet sofort in `results` als (Generation, Auftrag, Teil,
+    Bitmap, Fehler, Phasendauern). Die UI holt sie per root.after ab und zeigt
+    nur an, was zur neuesten Generation bzw. zur aktuellen Ansicht passt.
+    """
+
+    def __init__(self, **options):
+        super().__init__("mytinydesk-render", **options)
+        self.results = queue.Queue()
+
+    def request(self, doc_id, page_index, zoom, rotation=0):
+        """Fordert eine ganze Seite an und liefert die Generation des Auftrags"""
+        return self.request_parts(doc_id, zoom, rotation, [(page_index, None)])
+
+    def request_parts(self, doc_id, zoom, rotation, parts, draft=None):
+        """Fordert Seiten/Kacheln in der gegebenen Reihenfolge an (draft: Entwurfsauflösung)"""
+        return self.submit(doc_id, (doc_id, zoom, rotation, tuple(parts), draft))
+
+    def process(self, doc, generation, job):
+        _doc_id, zoom, rotation, parts, draft = job
+        for part in parts:
+            # Überholte Aufträge nicht weiter rendern
+            if self.is_stale(generation):
+                return
+            page_index, tile = part
+            timings = {}
+            img = self.render_part(doc, page_index, zoom, rotation, tile, timings, draft)
+            self.results.put((generation, job, part, img, None, timings))
+
+    def on_error(self, generation, job, error):
+        self.results.put((generation, job, None, None, error, None))
+
+
+class PrefetchWorker(DocumentWorker):
+    """Rendert die Nachbarseiten der aktuellen Seite vorab in den Render-Cache"""
+
+    # Nach so vielen Sekunden ohne Navigation wird nicht mehr vorgerendert
+    IDLE_TIMEOUT = 30.0
+    # Verhältnis Wandzeit/CPU-Zeit, ab dem die CPU als ausgelastet gilt
+    CONTENTION_RATIO = 2.0
+    MAX_BACKOFF = 2.0
+
+    def __init__(self, cache, ahead=2, behind=1, **options):
+        super().__init__("mytinydesk-prefetch", **options)
+        self.cache = cache
+        self.ahead = ahead
+        self.behind = behind
+
+        self._last_activity = time.monotonic()
+        self._backoff = 0.0
+
+    def schedule(self, doc_id, page_index, zoom, rotation=0, targets=()):
+        """Plant das Vorrendern rund um die angezeigte Seite (ersetzt alte Pläne)
+
+        `targets` sind weitere Seiten (z.B. Ziele von Verweisen), sie werden
+        vor den Nachbarseiten gerendert.
+        """
+        self._last_activity = time.monotonic()
+        self.submit(doc_id, (page_index, zoom, rotation, tuple(targets)))
+
+    def process(self, doc, generation, job):
+        page_index, zoom, rotation, targets = job
+        total = len(doc)
+        # Zuerst die Ziele, dann vorwärts (übliche Leserichtung), dann rückwärts
+        candidates = list(targets)
+        candidates += [page_index + i for i in range(1, self.ahead + 1)]
+        candidates += [page_index - i for i in range(1, self.behind + 1)]
+
+        for index in dict.fromkeys(candidates):
+            if not 0 <= index < total:
+                continue
+            if self.is_stale(generation) or self._is_idle():
+                return
+
+            key = RenderCache.make_key(self.doc_id, index, zoom, rotation)
+            if self.cache.contains(key):
+                continue
+
+            if self._backoff:
+                time.sleep(self._backoff)
+                if self.is_stale(generation):
+                    return
+
+            wall_start = time.perf_counter()
+            cpu_start = time.thread_time()
+            img = self.render_part(doc, index, zoom, rotation)
+            wall = time.perf_counter() - wall_start
+            cpu = time.thread_time() - cpu_start
+
+            # Ergebnis eines inzwischen überholten Plans nicht mehr ablegen
+            if self.is_stale(generation):
+                return
+            self.cache.put(key, img)
+            self._adjust_backoff(wall, cpu)
+
+    def _adjust_backoff(self, wall, cpu):
+        # Braucht das Rendern deutlich mehr Wand- als CPU-Zeit, konkurrieren
+        # andere Prozesse um die CPU -> Pause zwischen den Seiten verlängern
+        if cpu > 0 and wall / cpu > self.CONTENTION_RATIO:
+            self._backoff = min(self.MAX_BACKOFF, max(0.05, self._backoff * 2))
+        else:
+            self._backoff = self._backoff / 2 if self._backoff > 0.05 else 0.0
+
+    def _is_idle(self):
+        return time.monotonic() - self._last_activity > self.IDLE_TIMEOUT
+
+
+class DocumentOpener(threading.Thread):
+    """Öffnet ein Dokument abseits der Tk-Hauptschleife
+
+    Meldungen in `results`:
+        ("phase", Text)                       Fortschritt für die Statusleiste
+        ("first_page", Bitmap, Quelle)        erste Seite, Quelle "disk" oder "render"
+        ("ready", Dokument, Seitenzahl, Metadaten, Fingerabdruck, Zugriff, Phasendauern)
+        ("error", Fehler)
+    Das Dokument wird nach "ready" an den Tk-Thread übergeben und hier
+    nicht mehr benutzt. Nach cancel() wird es stattdessen geschlossen.
+    """
+
+    def __init__(self, pdf_path, zoom=1.0, rotation=0, gray=False, disk_cache=None, loader=None):
+        super().__init__(name="mytinydesk-open", daemon=True)
+        self.pdf_path = pdf_path
+        self.zoom = zoom
+        self.rotation = rotation
+        self.gray = gray
+        self.disk_cache = disk_cache
+        self.loader = loader
+        self.results = queue.Queue()
+        self.cancelled = False
+        # Übergabe des Dokuments und cancel() schließen einander aus
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        """PyMuPDF lässt sich nicht unterbrechen: das Ergebnis wird verworfen
+
+        Danach landet kein Dokument mehr in `results`; ein schon übergebenes
+        schließt `discard()`.
+        """
+        with self._lock:
+            self.cancelled = True
+
+    def discard(self):
+        """Schließt ein nach "ready" übergebenes, nicht mehr abgeholtes Dokument"""
+        try:
+            while True:
+                message = self.results.get_nowait()
+                if message[0] == "ready":
+                    message[1].close()
+        except queue.Empty:
+            pass
+
+    def run(self):
+        timings = {}
+        doc = None
+        try:
+            # Zuletzt genutzte Dokumente: erste Seite von der Platte,
+            # noch bevor PyMuPDF das Dokument geöffnet hat
+            fingerprint = None
+            entry = page_entry(0, self.zoom, self.rotation, self.gray)
+            have_first_page = False
+            if self.disk_cache:
+                start = time.perf_counter()
+                fingerprint = file_fingerprint(self.pdf_path)
+                img = self.disk_cache.get(fingerprint, entry)
+                timings["disk"] = time.perf_counter() - start
+                if img is not None:
+                    self.results.put(("first_page", img, "disk"))
+                    have_first_page = True
+
+            self.results.put(("phase", "Öffne Dokument"))
+            start = time.perf_counter()
+            if self.loader:
+                doc, io_mode = self.loader.open(self.pdf_path, timings)
+            else:
+                doc, io_mode = fitz.open(self.pdf_path), "direct"
+            timings["open"] = time.perf_counter() - start
+            if self.cancelled:
+                return
+
+            if not have_first_page and doc.page_count:
+                self.results.put(("phase", "Rendere erste Seite"))
+                start = time.perf_counter()
+                img = render_page_image(doc, 0, self.zoom, self.rotation, gray=self.gray)
+                timings["first_page"] = time.perf_counter() - start
+                self.results.put(("first_page", img, "render"))
+                if fingerprint:
+                    self.disk_cache.put(fingerprint, entry, img)
+
+            # Seitenzahl und Metadaten erst nach der ersten Seite
+            self.results.put(("phase", "Lese Metadaten"))
+            start = time.perf_counter()
+            pages = len(doc)
+            metadata = doc.metadata or {}
+            timings["metadata"] = time.perf_counter() - start
+            with self._lock:
+                if self.cancelled:
+                    return
+                self.results.put(("ready", doc, pages, metadata, fingerprint, io_mode, timings))
+                doc = None
+        except Exception as e:
+            self.results.put(("error", e))
+        finally:
+            # Nur bei Abbruch oder Fehler noch offen
+            if doc is not None:
+                doc.close()
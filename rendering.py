@@ -0,0 +1,265 @@
+"""
+Render-Pfad für myTinyDesk
+Gemeinsam genutzt von der Anzeige und den Hintergrund-Workern
+"""
+
+import math
+import time
+
+from lazy_import import lazy_import
+
+# Erst beim ersten Zugriff geladen, das leere Fenster startet ohne sie
+Image = lazy_import("PIL.Image")
+fitz = lazy_import("fitz")  # PyMuPDF
+
+# Kantenlänge einer Kachel im gekachelten Modus (Pixel)
+TILE_SIZE = 512
+
+
+def page_matrix(zoom, rotation=0):
+    """Transformationsmatrix für Zoom und Rotation"""
+    return fitz.Matrix(zoom, zoom).prerotate(rotation)
+
+
+def page_colorspace(gray=False):
+    """Farbraum des Render-Pfads: Graustufen brauchen ein Drittel des Speichers"""
+    return fitz.csGRAY if gray else fitz.csRGB
+
+
+def page_source(doc, page_index, display_lists=None, annots=True):
+    """Quelle zum Rastern: gecachte Display-List oder die Seite selbst"""
+    if display_lists is None:
+        return doc[page_index]
+    return display_lists.get(doc, page_index, annots)
+
+
+def _ppm_header(mode, size):
+    # P5 (PGM) für Graustufen, P6 für RGB - Tk liest beide als "ppm"
+    magic = b"P5" if mode == "L" else b"P6"
+    return magic + b"\n%d %d\n255\n" % size
+
+
+def samples_image(mode, size, samples):
+    """PIL-Image aus rohen Pixeldaten ("RGB" oder "L")
+
+    "L" verweist ohne Kopie auf `samples`, "RGB" kopiert PIL in eigenen
+    RGBX-Speicher (4 Byte pro Pixel).
+    """
+    return Image.frombuffer(mode, size, samples, "raw", mode, 0, 1)
+
+
+class PpmBitmap:
+    """Gerenderte Pixel ("RGB" oder "L") als PPM-Block, den Tk direkt liest
+
+    Die Pixel werden einmal in `ppm_data` (Kopf + Daten) kopiert; Cache und
+    Anzeige halten nur diesen Block. Ein PIL-Image entsteht erst auf
+    Anfrage (`image()`, z.B. für die skalierte Vorschau) und wird nicht
+    behalten, weil PIL RGB-Daten noch einmal kopiert.
+    """
+
+    __slots__ = ("mode", "size", "ppm_data", "_offset")
+
+    def __init__(self, mode, size, samples):
+        header = _ppm_header(mode, size)
+        self.mode = mode
+        self.size = size
+        self.ppm_data = header + samples
+        self._offset = len(header)
+
+    @property
+    def width(self):
+        return self.size[0]
+
+    @property
+    def height(self):
+        return self.size[1]
+
+    @property
+    def samples(self):
+        """Pixeldaten ohne Kopf, ohne Kopie"""
+        return memoryview(self.ppm_data)[self._offset:]
+
+    def image(self):
+        return samples_image(self.mode, self.size, self.samples)
+
+
+def pixmap_mode(pix):
+    return "L" if pix.n == 1 else "RGB"
+
+
+def pixmap_to_bitmap(pix):
+    """PpmBitmap aus einer RGB- oder Graustufen-Pixmap mit nur einer Kopie der Pixeldaten"""
+    return PpmBitmap(pixmap_mode(pix), (pix.width, pix.height), pix.samples_mv)
+
+
+def pixmap_image(pix):
+    """PIL-Image einer Pixmap ohne Umweg über PPM (Export, Skalierung)"""
+    mode = pixmap_mode(pix)
+    return samples_image(mode, (pix.width, pix.height), pix.samples_mv)
+
+
+def pil_image(img):
+    """PIL-Image zu einer PpmBitmap, PIL-Images unverändert"""
+    return img.image() if isinstance(img, PpmBitmap) else img
+
+
+def ppm_data(img):
+    """PPM-Daten eines Bilds für Tk, ohne Kopie bei einer PpmBitmap"""
+    if isinstance(img, PpmBitmap):
+        return img.ppm_data
+    # z.B. skalierte Vorschau: Kopf und Pixel einmalig zusammensetzen
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    return _ppm_header(img.mode, img.size) + img.tobytes()
+
+
+def _record(timings, stage, start):
+    """Addiert die seit start vergangene Zeit zur Phase, liefert neuen Startpunkt"""
+    now = time.perf_counter()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + (now - start)
+    return now
+
+
+def render_page_pixmap(doc, page_index, zoom, rotation=0, display_lists=None, timings=None,
+                       gray=False, annots=True):
+    """Rastert eine Seite als Pixmap (Phasen load/rasterize)"""
+    start = time.perf_counter()
+    source = page_source(doc, page_index, display_lists, annots)
+    start = _record(timings, "load", start)
+    options = {} if display_lists is not None or annots else {"annots": False}
+    pix = source.get_pixmap(matrix=page_matrix(zoom, rotation), colorspace=page_colorspace(gray),
+                            alpha=False, **options)
+    _record(timings, "rasterize", start)
+    return pix
+
+
+def render_page_image(doc, page_index, zoom, rotation=0, display_lists=None, timings=None,
+                      gray=False):
+    """Rendert eine Seite als PpmBitmap im RGB-Format (mit `gray` als Graustufen)
+
+    Mit `display_lists` wird der Content-Stream nur einmal interpretiert
+    und bei jedem weiteren Zoom nur noch gerastert. Ist `timings` ein
+    Dict, werden die Phasen load/rasterize/convert in Sekunden addiert.
+    """
+    pix = render_page_pixmap(doc, page_index, zoom, rotation, display_lists, timings, gray)
+    start = time.perf_counter()
+    img = pixmap_to_bitmap(pix)
+    _record(timings, "convert", start)
+    return img
+
+
+def render_draft_image(doc, page_index, zoom, rotation, scale, display_lists=None, timings=None,
+                       gray=False):
+    """Entwurf einer Seite: mit zoom * scale ohne Annotationen gerastert
+
+    Das Ergebnis wird (Nearest Neighbour) auf die Größe der Seite bei
+    `zoom` hochskaliert, die Anzeige behandelt es wie eine scharfe Seite.
+    """
+    pix = render_page_pixmap(doc, page_index, zoom * scale, rotation, display_lists, timings, gray,
+                             annots=False)
+    start = time.perf_counter()
+    source = page_source(doc, page_index, display_lists, annots=False)
+    size = page_pixel_size(source, zoom, rotation)
+    img = pixmap_image(pix).resize(size, Image.NEAREST)
+    img = PpmBitmap(img.mode, img.size, img.tobytes())
+    _record(timings, "convert", start)
+    return img
+
+
+def page_pixel_size(page, zoom, rotation=0):
+    """Größe der gerenderten Seite in Pixeln (Breite, Höhe)"""
+    bbox = (page.rect * page_matrix(zoom, rotation)).irect
+    return bbox.width, bbox.height
+
+
+def view_transform(page, rotation=0):
+    """Abbildung von Seitenkoordinaten in Anzeige-Pixel bei Zoom 1: (Matrix, Ursprung)"""
+    mat = page.rotation_matrix * page_matrix(1.0, rotation)
+    origin = page.rect * page_matrix(1.0, rotation)
+    return mat, (origin.x0, origin.y0)
+
+
+def view_rect(rect, transform):
+    """Rechteck in Seitenkoordinaten als (x0, y0, x1, y1) in Anzeige-Pixeln bei Zoom 1"""
+    mat, (ox, oy) = transform
+    rect = fitz.Rect(rect) * mat
+    return rect.x0 - ox, rect.y0 - oy, rect.x1 - ox, rect.y1 - oy
+
+
+def view_point(point, transform):
+    """Punkt in Seitenkoordinaten als (x, y) in Anzeige-Pixeln bei Zoom 1"""
+    mat, (ox, oy) = transform
+    point = fitz.Point(point) * mat
+    return point.x - ox, point.y - oy
+
+
+def parse_pages(spec, total):
+    """Wandelt "1-5,8" in 0-basierte Seitenindizes um (begrenzt auf das Dokument)"""
+    if not spec:
+        return list(range(total))
+    pages = []
+    for part in spec.split(","):
+        if "-" in part:
+            first, last = part.split("-", 1)
+            pages.extend(range(int(first) - 1, int(last)))
+        else:
+            pages.append(int(part) - 1)
+    return [p for p in pages if 0 <= p < total]
+
+
+def page_sizes(doc, rotation=0):
+    """Liefert die Größen aller Seiten bei Zoom 1 (Breite, Höhe), ohne zu rendern"""
+    for index in range(len(doc)):
+        rect = doc[index].rect
+        if rotation % 180:
+            yield rect.height, rect.width
+        else:
+            yield rect.width, rect.height
+
+
+def tile_grid(width, height, tile_size=TILE_SIZE):
+    """Anzahl der Kachelspalten und -zeilen für eine Seitengröße"""
+    return math.ceil(width / tile_size), math.ceil(height / tile_size)
+
+
+def render_tile_pixmap(doc, page_index, zoom, rotation, col, row, tile_size=TILE_SIZE,
+                       display_lists=None, timings=None, gray=False):
+    """Rastert nur eine Kachel der Seite über ein Clip-Rechteck"""
+    start = time.perf_counter()
+    source = page_source(doc, page_index, display_lists)
+    start = _record(timings, "load", start)
+    mat = page_matrix(zoom, rotation)
+    bbox = (source.rect * mat).irect
+
+    # Kachel in Pixelkoordinaten, am Seitenrand abgeschnitten
+    x0 = bbox.x0 + col * tile_size
+    y0 = bbox.y0 + row * tile_size
+    tile = fitz.Rect(x0, y0, min(x0 + tile_size, bbox.x1), min(y0 + tile_size, bbox.y1))
+
+    # Zurück in Seitenkoordinaten für den Clip
+    clip = tile * ~mat
+    pix = source.get_pixmap(matrix=mat, clip=clip, colorspace=page_colorspace(gray), alpha=False)
+    _record(timings, "rasterize", start)
+    return pix
+
+
+def render_tile_image(doc, page_index, zoom, rotation, col, row, tile_size=TILE_SIZE,
+                      display_lists=None, timings=None, gray=False):
+    """Rendert nur eine Kachel der Seite als PpmBitmap"""
+    pix = render_tile_pixmap(doc, page_index, zoom, rotation, col, row, tile_size,
+                             display_lists, timings, gray)
+    start = time.perf_counter()
+    img = pixmap_to_bitmap(pix)
+    _record(timings, "convert", start)
+    return img
+
+
+def render_thumbnail_image(doc, page_index, width, height, gray=False):
+    """Rendert eine Miniatur, eingepasst in width x height (ohne Annotationen und Display-List)"""
+    page = doc[page_index]
+    rect = page.rect
+    zoom = min(width / rect.width, height / rect.height) if rect.width and rect.height else 1.0
+    pix = page.get_pixmap(matrix=page_matrix(zoom), colorspace=page_colorspace(gray), alpha=False,
+                          annots=False)
+    return pixmap_to_bitmap(pix)
@@ -0,0 +1,243 @@
+"""
+Volltextsuche für myTinyDesk
+Pro Dokument ein Index mit dem Text jeder Seite, aufgebaut Seite für Seite
+in einem eigenen Hintergrund-Worker; das Rendern der Hauptseite hat Vorrang.
+Gesucht wird im bereits indizierten Teil, erste Treffer gibt es also schon
+während der Indizierung. Die Trefferrechtecke der angezeigten Seiten liefert
+der Worker, die UI markiert sie im Canvas.
+
+Mit Plattencache wird der fertige Index komprimiert neben den gerenderten
+Seiten abgelegt (Schlüssel: Fingerabdruck der Datei); beim nächsten Öffnen
+ist die Suche ohne erneute Indizierung vollständig.
+"""
+
+import json
+import queue
+import time
+import tkinter as tk
+import zlib
+from tkinter import ttk
+
+from render_worker import DocumentWorker
+from rendering import view_rect, view_transform
+
+# Name des Index im Plattencache und Dateikopf (Version des Formats)
+INDEX_ENTRY = "text"
+INDEX_MAGIC = b"MTDS1\n"
+
+# Abstand der Fortschrittsmeldungen des Workers (Sekunden)
+PROGRESS_INTERVAL = 0.1
+# Wartezeit, solange die Hauptseite rendert
+BUSY_WAIT = 0.02
+
+# Wartezeit nach dem letzten Tastendruck, bevor gesucht wird (ms)
+SEARCH_DELAY_MS = 150
+
+
+def normalize(text):
+    """Kleinschreibung und einfache Leerzeichen, Zeilenumbrüche zählen als Leerzeichen"""
+    return " ".join(text.split()).casefold()
+
+
+def match_rects(page, query, rotation=0):
+    """Treffer einer Seite als (x0, y0, x1, y1) in Pixeln bei Zoom 1 und Rotation"""
+    transform = view_transform(page, rotation)
+    return [view_rect(rect, transform) for rect in page.search_for(query)]
+
+
+class TextIndex:
+    """Normalisierter Text aller Seiten eines Dokuments
+
+    Gefüllt wird nur vom Worker (`add`), gesucht aus der UI; einzelne
+    Zuweisungen an die Liste sind unter dem GIL atomar.
+    """
+
+    def __init__(self, page_count):
+        self.texts = [None] * page_count
+        self.indexed = 0
+        self.tried_disk = False
+        self._cursor = 0
+
+    def __len__(self):
+        return len(self.texts)
+
+    @property
+    def complete(self):
+        return self.indexed >= len(self.texts)
+
+    @property
+    def size_bytes(self):
+        return sum(len(text) for text in self.texts if text)
+
+    def add(self, index, text):
+        if self.texts[index] is None:
+            self.texts[index] = normalize(text)
+            self.indexed += 1
+
+    def next_missing(self):
+        """Nächste noch nicht indizierte Seite (in Dokumentreihenfolge) oder None"""
+        while self._cursor < len(self.texts) and self.texts[self._cursor] is not None:
+            self._cursor += 1
+        return self._cursor if self._cursor < len(self.texts) else None
+
+    def search(self, query):
+        """Indizes der bisher indizierten Seiten, die den Suchtext enthalten"""
+        query = normalize(query)
+        if not query:
+            return []
+        return [index for index, text in enumerate(self.texts) if text is not None and query in text]
+
+    def may_contain(self, index, query):
+        """False nur, wenn die Seite indiziert ist und den Text sicher nicht enthält"""
+        text = self.texts[index]
+        return text is None or normalize(query) in text
+
+    def to_bytes(self):
+        return INDEX_MAGIC + zlib.compress(json.dumps(self.texts).encode("utf-8"), 6)
+
+    def load(self, data):
+        """Übernimmt einen gespeicherten Index, False falls er nicht passt"""
+        if not data or not data.startswith(INDEX_MAGIC):
+            return False
+        try:
+            texts = json.loads(zlib.decompress(data[len(INDEX_MAGIC):]))
+        except (ValueError, zlib.error):
+            return False
+        if len(texts) != len(self.texts) or not all(isinstance(text, str) for text in texts):
+            return False
+        self.texts = texts
+        self.indexed = len(texts)
+        self._cursor = len(texts)
+        return True
+
+
+class TextIndexWorker(DocumentWorker):
+    """Füllt Textindizes im Hintergrund und sucht Trefferrechtecke
+
+    Ein Auftrag ist (Index, Suchtext, Seiten, Rotation): zuerst werden die
+    Treffer der angegebenen Seiten gesucht, danach wird der Index weiter
+    gefüllt, bis er vollständig ist oder ein neuer Auftrag kommt.
+    Meldungen in `results`:
+        ("progress", Dokument-ID, indizierte Seiten)
+        ("highlights", Dokument-ID, Suchtext, Rotation, Seite, Rechtecke)
+    Mit `persist` und Plattencache wird der fertige Index dort abgelegt.
+    """
+
+    def __init__(self, busy=None, persist=True, **options):
+        super().__init__("mytinydesk-search", **options)
+        self.busy = busy
+        self.persist = persist
+        self.results = queue.Queue()
+
+    def request(self, doc_id, index, query="", pages=(), rotation=0):
+        return self.submit(doc_id, (index, query, tuple(pages), rotation))
+
+    def process(self, doc, generation, job):
+        index, query, pages, rotation = job
+        for page_index in pages:
+            if self.is_stale(generation):
+                return
+            rects = match_rects(doc[page_index], query, rotation)
+            self.results.put(("highlights", self.doc_id, query, rotation, page_index, rects))
+        if index.complete:
+            return
+
+        store = self.disk_cache if self.persist and self.fingerprint else None
+        if store and not index.tried_disk:
+            index.tried_disk = True
+            if index.load(store.get_data(self.fingerprint, INDEX_ENTRY)):
+                self.results.put(("progress", self.doc_id, index.indexed))
+                return
+
+        reported = time.perf_counter()
+        while True:
+            page_index = index.next_missing()
+            if page_index is None:
+                break
+            # Die Hauptseite hat Vorrang
+            while self.busy and self.busy() and not self.is_stale(generation):
+                time.sleep(BUSY_WAIT)
+            if self.is_stale(generation):
+                self.results.put(("progress", self.doc_id, index.indexed))
+                return
+            index.add(page_index, doc[page_index].get_text())
+            if time.perf_counter() - reported > PROGRESS_INTERVAL:
+                self.results.put(("progress", self.doc_id, index.indexed))
+                reported = time.perf_counter()
+        self.results.put(("progress", self.doc_id, index.indexed))
+        if store:
+            store.put_data(self.fingerprint, INDEX_ENTRY, index.to_bytes())
+
+
+class SearchBar:
+    """Suchleiste unter der Toolbar
+
+    Eingaben werden gesammelt und erst SEARCH_DELAY_MS nach dem letzten
+    Tastendruck an `on_search(text)` gemeldet. Enter/Umschalt+Enter und die
+    Pfeil-Buttons rufen `on_step(+1/-1)`, Esc und ✕ `on_close()`.
+    """
+
+    def __init__(self, parent, on_search, on_step, on_close):
+        self.on_search = on_search
+        self.on_step = on_step
+        self.on_close = on_close
+        self.visible = False
+        self.search_id = None
+
+        self.frame = tk.Frame(parent, bg="#ecf0f1")
+        tk.Label(self.frame, text="🔎", bg="#ecf0f1").pack(side=tk.LEFT, padx=(5, 2))
+        self.text = tk.StringVar(value="")
+        self.entry = tk.Entry(self.frame, width=30, font=("Arial", 10), textvariable=self.text)
+        self.entry.pack(side=tk.LEFT, padx=2, pady=3)
+        # Tastenkürzel des Fensters (Pfeile, +/-) gelten nicht beim Tippen
+        self.entry.bindtags((str(self.entry), "Entry", "all"))
+        self.entry.bind('<Return>', lambda e: self.step(1))
+        self.entry.bind('<Shift-Return>', lambda e: self.step(-1))
+        self.entry.bind('<Escape>', lambda e: self.on_close())
+        ttk.Button(self.frame, text="▲", width=3, command=lambda: self.step(-1)).pack(side=tk.LEFT, padx=1)
+        ttk.Button(self.frame, text="▼", width=3, command=lambda: self.step(1)).pack(side=tk.LEFT, padx=1)
+        self.info = tk.Label(self.frame, text="", bg="#ecf0f1", fg="#7f8c8d")
+        self.info.pack(side=tk.LEFT, padx=8)
+        ttk.Button(self.frame, text="✕", width=3, command=self.on_close).pack(side=tk.RIGHT, padx=5)
+        self.text.trace_add("write", lambda *args: self.schedule_search())
+
+    @property
+    def query(self):
+        return self.text.get().strip()
+
+    def show(self, after=None):
+        if not self.visible:
+            self.frame.pack(side=tk.TOP, fill=tk.X, after=after)
+            self.visible = True
+        self.entry.focus_set()
+        self.entry.select_range(0, tk.END)
+
+    def hide(self):
+        self.cancel()
+        self.frame.pack_forget()
+        self.visible = False
+
+    def set_info(self, text):
+        self.info.config(text=text)
+
+    def schedule_search(self):
+        self.cancel()
+        self.search_id = self.frame.after(SEARCH_DELAY_MS, self.flush)
+
+    def cancel(self):
+        if self.search_id is not None:
+            self.frame.after_cancel(self.search_id)
+            self.search_id = None
+
+    def flush(self):
+        """Gesammelte Eingabe sofort melden"""
+        self.search_id = None
+        self.on_search(self.query)
+
+    def step(self, direction):
+        # Enter direkt nach dem Tippen: erst suchen, dann springen
+        if self.search_id is not None:
+            self.cancel()
+            self.flush()
+        self.on_step(direction)
+        return "break"
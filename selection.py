@@ -0,0 +1,327 @@
+"""
+Textauswahl für myTinyDesk
+Die Wörter einer Seite werden einmal ausgelesen und in einem Gitter
+abgelegt (Anzeige-Pixel bei Zoom 1, mit Rotation). Rechtecke, Zeilennummern und Gitter liegen in flachen Arrays;
+Mausbewegungen beim Ziehen und das Zeichnen der Markierung fragen nur die
+Zellen unter dem Mauszeiger bzw. im Sichtbereich ab. Ausgewählt wird in
+Lesereihenfolge vom Wort beim Drücken bis zum Wort unter dem Mauszeiger.
+
+Das Auslesen dauert auf dichten Seiten (Tabellen mit 10.000 Wörtern) einige
+hundert Millisekunden und läuft deshalb in einem eigenen Worker; angestoßen
+wird es schon, wenn der Mauszeiger über eine Seite fährt.
+"""
+
+import math
+import queue
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+
+from render_worker import DocumentWorker
+from rendering import page_pixel_size, view_transform
+
+# So viele Seiten behält der Wort-Cache
+WORD_INDEX_PAGES = 16
+# Angestrebte Wörter pro Gitterzelle und Grenzen der Zellgröße (Pixel bei Zoom 1)
+WORDS_PER_CELL = 4
+MIN_CELL = 8
+MAX_CELL = 128
+# Erst ab dieser Mausbewegung (Pixel) wird aus einem Klick eine Auswahl
+DRAG_THRESHOLD = 3
+
+
+def page_words(page, rotation=0):
+    """Wörter einer Seite als Liste von (x0, y0, x1, y1, Text, Zeile) bei Zoom 1"""
+    # Drehungen um Vielfache von 90°: zwei Ecken genügen, ohne fitz.Rect pro Wort
+    (a, b, c, d, e, f), (ox, oy) = view_transform(page, rotation)
+    e -= ox
+    f -= oy
+    lines = {}
+    words = []
+    for x0, y0, x1, y1, text, block, line, _word in page.get_text("words"):
+        px0, py0 = a * x0 + c * y0 + e, b * x0 + d * y0 + f
+        px1, py1 = a * x1 + c * y1 + e, b * x1 + d * y1 + f
+        words.append((min(px0, px1), min(py0, py1), max(px0, px1), max(py0, py1), text,
+                      lines.setdefault((block, line), len(lines))))
+    return words
+
+
+def build_word_index(page, rotation=0):
+    width, height = page_pixel_size(page, 1.0, rotation)
+    return WordIndex(page_words(page, rotation), width, height)
+
+
+class WordIndex:
+    """Wortrechtecke einer Seite in einem gleichmäßigen Gitter
+
+    `rects` enthält x0, y0, x1, y1 aller Wörter hintereinander, `lines` die
+    Zeile jedes Worts. Das Gitter ist im CSR-Format abgelegt: die Wörter
+    der Zelle c stehen in `cells[start[c]:start[c + 1]]`, ein Wort über
+    mehrere Zellen steht in jeder davon. Die Wörter einer Zeile folgen
+    aufeinander (Reihenfolge von get_text); pro Zeile gibt es das erste und
+    letzte Wort und das umschließende Rechteck.
+    """
+
+    def __init__(self, words, width, height):
+        self.words = [word[4] for word in words]
+        self.rects = array("f")
+        for word in words:
+            self.rects.extend(word[:4])
+        self.lines = array("I", (word[5] for word in words))
+        self.width = width
+        self.height = height
+
+        line_count = self.lines[-1] + 1 if words else 0
+        self.line_first = array("I", bytes(4 * line_count))
+        self.line_last = array("I", bytes(4 * line_count))
+        self.line_rects = array("f", bytes(16 * line_count))
+        for index, word in enumerate(words):
+            line = word[5]
+            x0, y0, x1, y1 = word[:4]
+            if index == 0 or self.lines[index - 1] != line:
+                self.line_first[line] = index
+                self.line_rects[4 * line:4 * line + 4] = array("f", (x0, y0, x1, y1))
+            else:
+                rect = self.line_rects
+                rect[4 * line] = min(rect[4 * line], x0)
+                rect[4 * line + 1] = min(rect[4 * line + 1], y0)
+                rect[4 * line + 2] = max(rect[4 * line + 2], x1)
+                rect[4 * line + 3] = max(rect[4 * line + 3], y1)
+            self.line_last[line] = index
+
+        # Zellgröße nach der Wortdichte: dichte Seiten bekommen ein feineres Gitter
+        if words:
+            cell = math.sqrt(width * height * WORDS_PER_CELL / len(words))
+        else:
+            cell = MAX_CELL
+        self.cell = min(MAX_CELL, max(MIN_CELL, cell))
+        self.cols = max(1, math.ceil(width / self.cell))
+        self.rows = max(1, math.ceil(height / self.cell))
+
+        # Zwei Durchgänge: Einträge je Zelle zählen, dann an ihre Position schreiben
+        spans = [self._cells(*word[:4]) for word in words]
+        counts = array("I", bytes(4 * (self.cols * self.rows + 1)))
+        for cells in spans:
+            for cell_index in cells:
+                counts[cell_index + 1] += 1
+        for cell_index in range(1, len(counts)):
+            counts[cell_index] += counts[cell_index - 1]
+        self.start = counts
+        self.cells = array("I", bytes(4 * counts[-1]))
+        fill = array("I", counts[:-1])
+        for index, cells in enumerate(spans):
+            for cell_index in cells:
+                self.cells[fill[cell_index]] = index
+                fill[cell_index] += 1
+
+    def __len__(self):
+        return len(self.words)
+
+    @property
+    def size_bytes(self):
+        text = sum(len(word) for word in self.words)
+        arrays = (self.rects, self.lines, self.start, self.cells, self.line_first, self.line_last,
+                  self.line_rects)
+        return text + sum(values.itemsize * len(values) for values in arrays)
+
+    def rect(self, index):
+        return tuple(self.rects[4 * index:4 * index + 4])
+
+    def _span(self, x0, y0, x1, y1):
+        # Zellbereich (Spalten, Zeilen) eines Rechtecks, auf das Gitter begrenzt
+        c0 = min(self.cols - 1, max(0, int(x0 // self.cell)))
+        c1 = min(self.cols - 1, max(0, int(x1 // self.cell)))
+        r0 = min(self.rows - 1, max(0, int(y0 // self.cell)))
+        r1 = min(self.rows - 1, max(0, int(y1 // self.cell)))
+        return c0, r0, c1, r1
+
+    def _cells(self, x0, y0, x1, y1):
+        c0, r0, c1, r1 = self._span(x0, y0, x1, y1)
+        if c0 == c1 and r0 == r1:
+            return (r0 * self.cols + c0,)
+        return [row * self.cols + col for row in range(r0, r1 + 1) for col in range(c0, c1 + 1)]
+
+    def _cell_words(self, cell_index):
+        return self.cells[self.start[cell_index]:self.start[cell_index + 1]]
+
+    def query(self, x0, y0, x1, y1):
+        """Indizes der Wörter, die das Rechteck berühren, in Lesereihenfolge"""
+        c0, r0, c1, r1 = self._span(x0, y0, x1, y1)
+        found = set()
+        for row in range(r0, r1 + 1):
+            for col in range(c0, c1 + 1):
+                cell_words = self._cell_words(row * self.cols + col)
+                if r0 < row < r1 and c0 < col < c1:
+                    # Innere Zellen liegen ganz im Rechteck
+                    found.update(cell_words)
+                    continue
+                for index in cell_words:
+                    wx0, wy0, wx1, wy1 = self.rects[4 * index:4 * index + 4]
+                    if wx0 <= x1 and wx1 >= x0 and wy0 <= y1 and wy1 >= y0:
+                        found.add(index)
+        return sorted(found)
+
+    def nearest(self, x, y):
+        """Index des Worts an (x, y) oder des nächstgelegenen, None auf leeren Seiten
+
+        Durchsucht die Zellen ringförmig um den Punkt; sobald der nächste Ring
+        weiter entfernt ist als das beste Wort, ist die Suche beendet.
+        """
+        if not self.words:
+            return None
+        x = min(self.width, max(0.0, x))
+        y = min(self.height, max(0.0, y))
+        col, row = self._span(x, y, x, y)[:2]
+        best = None
+        best_distance = math.inf
+        for ring in range(max(self.cols, self.rows)):
+            if best is not None and (ring - 1) * self.cell > best_distance:
+                break
+            for r in range(row - ring, row + ring + 1):
+                if not 0 <= r < self.rows:
+                    continue
+                edge = r in (row - ring, row + ring)
+                for c in range(col - ring, col + ring + 1) if edge else (col - ring, col + ring):
+                    if not 0 <= c < self.cols:
+                        continue
+                    for index in self._cell_words(r * self.cols + c):
+                        wx0, wy0, wx1, wy1 = self.rects[4 * index:4 * index + 4]
+                        dx = max(wx0 - x, 0.0, x - wx1)
+                        # Abstand quer zur Zeile zählt mehr: Ziehen zwischen Zeilen bleibt in der Zeile
+                        dy = max(wy0 - y, 0.0, y - wy1) * 2
+                        distance = math.hypot(dx, dy)
+                        if distance < best_distance or (distance == best_distance and index < best):
+                            best, best_distance = index, distance
+        return best
+
+    def selection_rects(self, first, last, visible):
+        """Rechtecke der Wörter first..last, eines pro Zeile
+
+        `visible` sind die Wörter im Sichtbereich (sortiert, aus `query`);
+        gezeichnet werden nur Zeilen zwischen dem ersten und letzten
+        sichtbaren ausgewählten Wort. Ganz ausgewählte Zeilen kosten ein
+        Rechteck aus dem Zeilen-Array, der Aufwand wächst mit den Zeilen.
+        """
+        lo = bisect_left(visible, first)
+        hi = bisect_right(visible, last)
+        if lo >= hi:
+            return []
+        rects = []
+        for line in range(self.lines[visible[lo]], self.lines[visible[hi - 1]] + 1):
+            start = max(first, self.line_first[line])
+            end = min(last, self.line_last[line])
+            if start > end:
+                continue
+            if start == self.line_first[line] and end == self.line_last[line]:
+                rects.append(tuple(self.line_rects[4 * line:4 * line + 4]))
+                continue
+            x0, y0, x1, y1 = self.rects[4 * start:4 * start + 4]
+            for index in range(start + 1, end + 1):
+                wx0, wy0, wx1, wy1 = self.rects[4 * index:4 * index + 4]
+                x0, y0, x1, y1 = min(x0, wx0), min(y0, wy0), max(x1, wx1), max(y1, wy1)
+            rects.append((x0, y0, x1, y1))
+        return rects
+
+    def text(self, first, last):
+        """Text der Wörter first..last, Zeilenwechsel als Zeilenumbruch"""
+        parts = []
+        for index in range(first, last + 1):
+            if parts:
+                parts.append("\n" if self.lines[index] != self.lines[index - 1] else " ")
+            parts.append(self.words[index])
+        return "".join(parts)
+
+
+class TextSelection:
+    """Auswahl auf einer Seite
+
+    `anchor` (Punkt beim Drücken) und `point` (aktueller Mauspunkt) sind
+    Pixel bei Zoom 1 relativ zur Seite. `words` ist (erstes, letztes Wort)
+    in Lesereihenfolge, solange noch kein Wort-Index vorliegt None.
+    """
+
+    def __init__(self, doc_id, page_index, rotation, anchor):
+        self.doc_id = doc_id
+        self.page_index = page_index
+        self.rotation = rotation
+        self.anchor = anchor
+        self.point = anchor
+        self.dragged = False
+        self.words = None
+        self._anchor_word = None
+
+    @property
+    def key(self):
+        return self.doc_id, self.page_index, self.rotation
+
+    def update(self, index):
+        """Bestimmt die ausgewählten Wörter neu (zwei Gitterabfragen)"""
+        if self._anchor_word is None:
+            self._anchor_word = index.nearest(*self.anchor)
+        current = index.nearest(*self.point)
+        if self._anchor_word is None or current is None:
+            self.words = None
+        else:
+            self.words = (min(self._anchor_word, current), max(self._anchor_word, current))
+        return self.words
+
+
+class WordIndexCache:
+    """Wort-Indizes der zuletzt benutzten Seiten, Schlüssel (Dokument-ID, Seite, Rotation)
+
+    Gefüllt aus den Ergebnissen des `WordIndexWorker`, gelesen im Tk-Thread.
+    """
+
+    def __init__(self, max_pages=WORD_INDEX_PAGES):
+        self.max_pages = max_pages
+        self._indexes = OrderedDict()
+
+    def get(self, key):
+        index = self._indexes.get(key)
+        if index is not None:
+            self._indexes.move_to_end(key)
+        return index
+
+    def put(self, key, index):
+        self._indexes[key] = index
+        self._indexes.move_to_end(key)
+        while len(self._indexes) > self.max_pages:
+            self._indexes.popitem(last=False)
+
+    def __contains__(self, key):
+        return key in self._indexes
+
+    def invalidate(self, doc_id, pages=None):
+        """Verwirft die Indizes eines Dokuments (oder nur der Seiten `pages`)"""
+        for key in [key for key in self._indexes if key[0] == doc_id and (pages is None or key[1] in pages)]:
+            del self._indexes[key]
+
+    def clear(self):
+        self._indexes.clear()
+
+    @property
+    def size_bytes(self):
+        return sum(index.size_bytes for index in self._indexes.values())
+
+
+class WordIndexWorker(DocumentWorker):
+    """Liest die Wörter einer Seite mit eigenem Dokument und baut ihren Index
+
+    Ein Auftrag ist (Seite, Rotation), ein neuer ersetzt den offenen.
+    Meldungen in `results`: (Dokument-ID, Seite, Rotation, Generation, WordIndex)
+    """
+
+    def __init__(self, **options):
+        super().__init__("mytinydesk-words", **options)
+        self.results = queue.Queue()
+
+    def request(self, doc_id, page_index, rotation=0):
+        return self.submit(doc_id, (page_index, rotation))
+
+    def process(self, doc, generation, job):
+        page_index, rotation = job
+        if page_index >= len(doc):
+            return
+        index = build_word_index(doc[page_index], rotation)
+        if not self.is_stale(generation):
+            self.results.put((self.doc_id, page_index, rotation, generation, index))
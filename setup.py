@@ -215,13 +215,13 @@ def create_launcher(os_type):
     if os_type == "Windows":
         launcher_path = Path('start_pdfreader.bat')
         content = """@echo off
-.venv\\Scripts\\python.exe main.py
+.venv\\Scripts\\python.exe main.py %*
 pause
 """
     else:  # Linux/macOS
         launcher_path = Path('start_pdfreader.sh')
         content = """#!/bin/bash
-.venv/bin/python main.py
+.venv/bin/python main.py "$@"
 """
     
     try:
@@ -277,10 +277,11 @@ Version=1.0
 Type=Application
 Name={project_name}
 Comment=Leichtgewichtiger PDF-Viewer
-Exec={current_dir / '.venv' / 'bin' / 'python'} {current_dir / 'main.py'}
+Exec={current_dir / '.venv' / 'bin' / 'python'} {current_dir / 'main.py'} %f
 Icon={icon_value}
 Terminal=false
 Categories=Office;Viewer;
+MimeType=application/pdf;
 Keywords=pdf;viewer;
 """
         
@@ -0,0 +1,137 @@
+"""
+Einzelinstanz-Modus für myTinyDesk
+Ein zweiter Start (z.B. Doppelklick im Dateimanager) übergibt die Datei über
+einen lokalen Unix-Socket an das bereits laufende Fenster und beendet sich,
+statt einen weiteren Python-, Tk- und MuPDF-Prozess zu starten.
+
+Der Socket gehört dem Benutzer (Rechte 0600) und ist pro Display getrennt:
+auf einem Terminalserver öffnet jede Sitzung ihre Dateien im eigenen Fenster.
+
+Umgebungsvariablen:
+    MYTINYDESK_SINGLE_INSTANCE  1 = Dateien an ein laufendes Fenster übergeben
+"""
+
+import hashlib
+import os
+import queue
+import socket
+import socketserver
+import tempfile
+import threading
+
+from render_daemon import recv_message, send_message
+
+# Wartezeit auf das laufende Fenster beim Übergeben (Sekunden)
+HANDOVER_TIMEOUT = 2.0
+
+
+def single_instance_enabled():
+    return hasattr(socket, "AF_UNIX") and os.environ.get("MYTINYDESK_SINGLE_INSTANCE", "0") == "1"
+
+
+def instance_socket_path():
+    """Socket pro Benutzer und Display, bevorzugt im privaten XDG_RUNTIME_DIR"""
+    display = os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY") or "-"
+    tag = hashlib.blake2b(display.encode(), digest_size=4).hexdigest()
+    folder = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return os.path.join(folder, f"mytinydesk-{os.getuid()}-{tag}.sock")
+
+
+def _owned_socket(path):
+    """Nur Sockets des eigenen Benutzers benutzen (Temp-Ordner ist geteilt)"""
+    try:
+        return os.lstat(path).st_uid == os.getuid()
+    except OSError:
+        return False
+
+
+def hand_over(path, pdf_path=None):
+    """Übergibt pdf_path an ein laufendes Fenster, True falls es angenommen wurde
+
+    Ohne Datei wird das laufende Fenster nur nach vorne geholt.
+    """
+    if not _owned_socket(path):
+        return False
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(HANDOVER_TIMEOUT)
+        sock.connect(path)
+        send_message(sock, {"op": "open", "path": pdf_path})
+        reply, _fds = recv_message(sock)
+        return bool(reply.get("ok"))
+    except (OSError, ValueError):
+        return False
+    finally:
+        sock.close()
+
+
+def _instance_running(path):
+    """True, wenn unter path bereits ein Fenster antwortet"""
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.settimeout(HANDOVER_TIMEOUT)
+        probe.connect(path)
+        return True
+    except OSError:
+        return False
+    finally:
+        probe.close()
+
+
+class InstanceHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        try:
+            self.request.settimeout(HANDOVER_TIMEOUT)
+            message, _fds = recv_message(self.request)
+            if message.get("op") != "open":
+                raise ValueError(f"Unbekannte Operation: {message.get('op')}")
+            self.server.requests.put(message.get("path"))
+            send_message(self.request, {"ok": True})
+        except (OSError, ValueError) as e:
+            try:
+                send_message(self.request, {"ok": False, "error": str(e)})
+            except OSError:
+                pass
+
+
+class InstanceServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Nimmt Dateien weiterer Starts an; die UI holt sie aus `requests`
+
+    Der Server läuft in einem eigenen Thread und ruft Tk nie selbst auf.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, path):
+        self.path = path
+        self.requests = queue.Queue()
+        super().__init__(path, InstanceHandler)
+        os.chmod(path, 0o600)
+        self._thread = threading.Thread(target=self.serve_forever, name="mytinydesk-instance",
+                                        daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def listen(cls, path):
+        """Startet den Server, None falls schon ein anderes Fenster lauscht"""
+        try:
+            return cls(path)
+        except OSError:
+            pass
+        if _instance_running(path) or not _owned_socket(path):
+            return None
+        # Überbleibsel eines abgestürzten Fensters
+        try:
+            os.unlink(path)
+            return cls(path)
+        except OSError:
+            return None
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+        try:
+            if _owned_socket(self.path):
+                os.unlink(self.path)
+        except OSError:
+            pass
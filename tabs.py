@@ -0,0 +1,112 @@
+"""
+Tabs für myTinyDesk
+Mehrere Dokumente in einem Fenster: jeder Tab merkt sich Dokument, Position
+und Ansicht, Worker, Render-Cache und Speicherbudget teilen sich alle Tabs.
+Die Tab-Leiste ist ein ttk.Notebook mit leeren Seiten, gezeichnet wird
+weiterhin nur im gemeinsamen Canvas.
+"""
+
+import os
+import tkinter as tk
+from pathlib import Path
+from tkinter import ttk
+
+
+class DocumentTab:
+    """Zustand eines geöffneten Dokuments, solange sein Tab nicht aktiv ist"""
+
+    def __init__(self, doc_id, pdf_path):
+        self.doc_id = doc_id
+        self.pdf_path = pdf_path
+        self.name = Path(pdf_path).name
+        self.document = None
+        self.frame = None
+        self.total_pages = 0
+        self.current_page = 0
+        self.zoom_level = 1.0
+        self.rotation = 0
+        self.fingerprint = None
+        self.title = None
+        self.status = ""
+        # Layout der fortlaufenden Ansicht, bleibt beim Tabwechsel erhalten
+        self.page_layout = None
+        self.page_layout_key = None
+        # Dateiüberwachung: Zustand der angezeigten Fassung und Fingerabdrücke ihrer Seiten
+        self.file_state = None
+        self.page_fingerprints = None
+        # Seiten vor dem Folgen von Verweisen (Alt+Links)
+        self.link_history = []
+
+    def same_file(self, pdf_path):
+        return os.path.realpath(self.pdf_path) == os.path.realpath(pdf_path)
+
+
+class TabBar:
+    """Reiter über dem Canvas, ausgeblendet solange kein Dokument offen ist
+
+    `on_select(tab)` wird bei einem Klick auf einen Reiter aufgerufen,
+    `on_close(tab)` bei einem Mittelklick.
+    """
+
+    def __init__(self, parent, on_select, on_close):
+        self.on_select = on_select
+        self.on_close = on_close
+        self.tabs = []
+        self.frames = {}
+        self.visible = False
+        self.removing = False
+        self.notebook = ttk.Notebook(parent)
+        self.notebook.bind('<<NotebookTabChanged>>', self.on_changed)
+        self.notebook.bind('<Button-2>', self.on_middle_click)
+
+    def add(self, tab, after=None):
+        frame = tk.Frame(self.notebook, height=0)
+        self.frames[str(frame)] = tab
+        self.notebook.add(frame, text=tab.name)
+        self.tabs.append(tab)
+        tab.frame = frame
+        if not self.visible:
+            self.notebook.pack(side=tk.TOP, fill=tk.X, after=after)
+            self.visible = True
+
+    def remove(self, tab):
+        """Entfernt den Reiter, liefert dessen bisherige Position"""
+        index = self.tabs.index(tab)
+        self.tabs.remove(tab)
+        self.frames.pop(str(tab.frame), None)
+        # Das Notebook wählt selbst einen Nachbarn, die Auswahl trifft der Aufrufer
+        self.removing = True
+        try:
+            self.notebook.forget(tab.frame)
+        finally:
+            self.removing = False
+        tab.frame.destroy()
+        if not self.tabs and self.visible:
+            self.notebook.pack_forget()
+            self.visible = False
+        return index
+
+    def select(self, tab):
+        self.notebook.select(tab.frame)
+
+    def neighbour(self, tab, step):
+        """Tab links (step=-1) bzw. rechts (step=1) davon, rundherum"""
+        if not self.tabs:
+            return None
+        return self.tabs[(self.tabs.index(tab) + step) % len(self.tabs)]
+
+    def on_changed(self, event):
+        if self.removing:
+            return
+        tab = self.frames.get(self.notebook.select())
+        if tab is not None:
+            self.on_select(tab)
+
+    def on_middle_click(self, event):
+        try:
+            index = self.notebook.index(f"@{event.x},{event.y}")
+        except tk.TclError:
+            return
+        tab = self.frames.get(str(self.notebook.tabs()[index]))
+        if tab is not None:
+            self.on_close(tab)
@@ -0,0 +1,366 @@
+"""
+Miniaturansicht für myTinyDesk
+Seitenleiste mit verkleinerten Seiten. Gerendert werden nur die sichtbaren
+Miniaturen, in niedriger Auflösung und gebündelt in einem eigenen
+Hintergrund-Worker; das Rendern der Hauptseite hat immer Vorrang.
+"""
+
+import queue
+import time
+import tkinter as tk
+from collections import OrderedDict
+
+from disk_cache import thumbnail_entry
+from render_worker import DocumentWorker
+from rendering import ppm_data, render_thumbnail_image
+
+# Größe einer Miniatur (Pixel): feste Breite, Höhe nach der ersten Seite
+THUMB_WIDTH = 96
+THUMB_MAX_HEIGHT = 160
+# Platz für die Seitennummer unter jeder Miniatur und Rand links/rechts
+THUMB_GAP = 22
+THUMB_PAD = 8
+
+# Miniaturen pro Ergebnis-Paket des Workers
+THUMB_BATCH = 6
+# Budget des Miniatur-Speichers (nur PPM-Bytes, keine PIL-Objekte)
+THUMB_STORE_BYTES = 8 * 1024 * 1024
+
+# Abfrageintervall der Ergebnisse und Wartezeit, solange die Hauptseite rendert
+THUMB_POLL_MS = 40
+BUSY_WAIT = 0.02
+
+# Zusätzlich gerenderte Miniaturen über/unter dem sichtbaren Bereich
+THUMB_WINDOW = 2
+
+
+class ThumbnailStore:
+    """Kompakter LRU-Speicher für Miniaturen ((Dokument-ID, Seite) -> PPM-Bytes)
+
+    Wird nur aus dem Tk-Hauptthread benutzt und braucht deshalb keine Sperre.
+    """
+
+    def __init__(self, max_bytes=THUMB_STORE_BYTES):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+
+    def get(self, index):
+        data = self._entries.get(index)
+        if data is not None:
+            self._entries.move_to_end(index)
+        return data
+
+    def put(self, index, data):
+        if index in self._entries:
+            self.current_bytes -= len(self._entries.pop(index))
+        self._entries[index] = data
+        self.current_bytes += len(data)
+        while self.current_bytes > self.max_bytes and len(self._entries) > 1:
+            _index, oldest = self._entries.popitem(last=False)
+            self.current_bytes -= len(oldest)
+
+    def demote(self, doc_id):
+        """Miniaturen eines inaktiven Tabs zuerst verdrängen"""
+        for key in [k for k in self._entries if k[0] == doc_id]:
+            self._entries.move_to_end(key, last=False)
+
+    def invalidate(self, doc_id):
+        for key in [k for k in self._entries if k[0] == doc_id]:
+            self.current_bytes -= len(self._entries.pop(key))
+
+    def invalidate_pages(self, doc_id, pages):
+        for key in [k for k in self._entries if k[0] == doc_id and k[1] in pages]:
+            self.current_bytes -= len(self._entries.pop(key))
+
+    def clear(self):
+        self._entries.clear()
+        self.current_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class ThumbnailWorker(DocumentWorker):
+    """Rendert Miniaturen paketweise, pausiert solange `busy()` wahr ist
+
+    Ein Auftrag ist die Höhe der Miniaturen und die Liste der fehlenden
+    Seiten; fertige Miniaturen landen in Paketen von THUMB_BATCH als
+    (Dokument-ID, Generation, Paket) in `results`, damit die UI nicht für
+    jede einzelne Seite aufwachen muss.
+    """
+
+    def __init__(self, width, busy=None, **options):
+        super().__init__("mytinydesk-thumbnails", **options)
+        self.width = width
+        self.busy = busy
+        self.results = queue.Queue()
+
+    def request(self, doc_id, height, pages):
+        return self.submit(doc_id, (height, tuple(pages)))
+
+    def process(self, doc, generation, job):
+        height, pages = job
+        batch = []
+        for index in pages:
+            # Die Hauptseite hat Vorrang
+            while self.busy and self.busy():
+                time.sleep(BUSY_WAIT)
+                if self.is_stale(generation):
+                    return
+            if self.is_stale(generation):
+                return
+            batch.append((index, ppm_data(self.render_thumbnail(doc, index, height))))
+            if len(batch) >= THUMB_BATCH:
+                self.results.put((self.doc_id, generation, batch))
+                batch = []
+        if batch:
+            self.results.put((self.doc_id, generation, batch))
+
+    def render_thumbnail(self, doc, index, height):
+        entry = None
+        if self.disk_cache and self.fingerprint:
+            entry = thumbnail_entry(index, self.width, height, self.gray)
+            img = self.disk_cache.get(self.fingerprint, entry)
+            if img is not None:
+                return img
+        img = render_thumbnail_image(doc, index, self.width, height, self.gray)
+        if entry is not None:
+            self.disk_cache.put(self.fingerprint, entry, img)
+        return img
+
+
+class ThumbnailPanel:
+    """Seitenleiste links neben dem Canvas
+
+    Alle Miniaturen haben einen gleich hohen Platz, die sichtbaren Seiten
+    ergeben sich also direkt aus der Scrollposition. PhotoImages gibt es
+    nur für den sichtbaren Bereich; ein Klick ruft `on_select(index)` auf.
+    Ein Worker und ein Speicher dienen allen Tabs, beim Wechsel bleiben
+    die Miniaturen des vorigen Dokuments erhalten und werden zuerst verdrängt.
+    """
+
+    def __init__(self, parent, on_select):
+        self.on_select = on_select
+        self.frame = tk.Frame(parent, bg="#2c3e50")
+        self.canvas = tk.Canvas(self.frame, bg="#2c3e50", width=THUMB_WIDTH + 2 * THUMB_PAD,
+                                highlightthickness=0, yscrollincrement=20)
+        scrollbar = tk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self.on_yscroll)
+        self.canvas.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas.pack(side=tk.LEFT, fill=tk.Y, expand=True)
+        self.canvas.bind('<Configure>', lambda e: self.schedule_update())
+        self.canvas.bind('<Button-1>', self.on_click)
+        self.canvas.bind('<MouseWheel>', self.on_mousewheel)
+        self.canvas.bind('<Button-4>', self.on_mousewheel)
+        self.canvas.bind('<Button-5>', self.on_mousewheel)
+
+        self.store = ThumbnailStore()
+        self.worker = None
+        # Dokument-ID -> erste Generation nach dem Neuladen der Datei
+        self.fences = {}
+        self.doc_id = None
+        self.page_count = 0
+        self.thumb_height = THUMB_MAX_HEIGHT
+        self.slot_height = THUMB_MAX_HEIGHT + THUMB_GAP
+        # Seitenindex -> (Platzhalter, Seitennummer, Bild-Item, PhotoImage)
+        self.items = {}
+        self.pending = set()
+        self.current = None
+        self.highlight = None
+        self.poll_id = None
+        self.update_id = None
+
+    def show(self, before=None):
+        if before is None:
+            self.frame.pack(side=tk.LEFT, fill=tk.Y)
+        else:
+            self.frame.pack(side=tk.LEFT, fill=tk.Y, before=before)
+
+    def hide(self):
+        self.frame.pack_forget()
+
+    def set_document(self, doc_id, doc, pdf_path, fingerprint=None, busy=None, **options):
+        """Zeigt die Miniaturen eines Dokuments, rendert mit eigenem Worker
+
+        Der Worker entsteht beim ersten Dokument mit `busy` und `options`.
+        """
+        self.reset()
+        if self.worker is None:
+            self.worker = ThumbnailWorker(THUMB_WIDTH, busy=busy, **options)
+            self.worker.start()
+        self.worker.add_document(doc_id, pdf_path, fingerprint)
+        self.doc_id = doc_id
+        self.page_count = len(doc)
+        if self.page_count:
+            rect = doc[0].rect
+            aspect = rect.height / rect.width if rect.width else 1.4
+            self.thumb_height = max(1, min(THUMB_MAX_HEIGHT, round(THUMB_WIDTH * aspect)))
+        self.slot_height = self.thumb_height + THUMB_GAP
+        self.canvas.config(scrollregion=(0, 0, THUMB_WIDTH + 2 * THUMB_PAD,
+                                         self.page_count * self.slot_height))
+        self.canvas.yview_moveto(0)
+        self.update_view()
+
+    def reload_document(self, doc_id, pages, fingerprint=None):
+        """Geänderte Datei: Miniaturen geänderter Seiten verwerfen, Handle neu öffnen"""
+        if self.worker:
+            # Ältere Pakete stammen noch aus der alten Fassung
+            self.fences[doc_id] = self.worker.reload_document(doc_id, fingerprint)
+        self.store.invalidate_pages(doc_id, pages)
+        if doc_id == self.doc_id and self.pending:
+            # Der offene Auftrag ist verworfen: fehlende Miniaturen neu anfordern
+            self.pending = set()
+            self.schedule_update()
+
+    def forget_document(self, doc_id):
+        """Geschlossener Tab: Handle im Worker und Miniaturen freigeben"""
+        if self.worker:
+            self.worker.remove_document(doc_id)
+        self.fences.pop(doc_id, None)
+        self.store.invalidate(doc_id)
+        if doc_id == self.doc_id:
+            self.reset()
+
+    def close(self):
+        """Beendet den Worker und gibt alle Miniaturen und PhotoImages frei"""
+        if self.worker:
+            self.worker.stop()
+            self.worker = None
+        self.reset()
+        self.store.clear()
+
+    def reset(self):
+        """Leert die Leiste (PhotoImages), Miniaturen im Speicher bleiben"""
+        for after_id in (self.poll_id, self.update_id):
+            if after_id is not None:
+                self.canvas.after_cancel(after_id)
+        self.poll_id = None
+        self.update_id = None
+        self.canvas.delete("all")
+        self.items = {}
+        self.pending = set()
+        self.doc_id = None
+        self.page_count = 0
+        self.current = None
+        self.highlight = None
+
+    def slot_top(self, index):
+        return index * self.slot_height
+
+    def set_current(self, index):
+        """Markiert die aktuelle Seite und scrollt sie bei Bedarf in den Sichtbereich"""
+        if not self.page_count or index == self.current:
+            return
+        self.current = index
+        top = self.slot_top(index)
+        x0, y0 = THUMB_PAD - 3, top + THUMB_GAP // 2 - 3
+        x1, y1 = THUMB_PAD + THUMB_WIDTH + 3, top + THUMB_GAP // 2 + self.thumb_height + 3
+        if self.highlight is None:
+            self.highlight = self.canvas.create_rectangle(x0, y0, x1, y1, outline="#3498db", width=3)
+        else:
+            self.canvas.coords(self.highlight, x0, y0, x1, y1)
+
+        view_top = self.canvas.canvasy(0)
+        view_bottom = self.canvas.canvasy(self.canvas.winfo_height())
+        if top < view_top or top + self.slot_height > view_bottom:
+            total = self.page_count * self.slot_height
+            self.canvas.yview_moveto(max(0, top - self.slot_height) / total if total else 0)
+            self.schedule_update()
+
+    def on_click(self, event):
+        index = int(self.canvas.canvasy(event.y) // self.slot_height)
+        if 0 <= index < self.page_count:
+            self.on_select(index)
+
+    def on_yscroll(self, *args):
+        self.canvas.yview(*args)
+        self.schedule_update()
+
+    def on_mousewheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            self.canvas.yview_scroll(-3, "units")
+        else:
+            self.canvas.yview_scroll(3, "units")
+        self.schedule_update()
+
+    def schedule_update(self):
+        if self.update_id is None and self.page_count:
+            self.update_id = self.canvas.after(30, self.update_view)
+
+    def update_view(self):
+        self.update_id = None
+        if not self.page_count:
+            return
+        top = self.canvas.canvasy(0)
+        bottom = self.canvas.canvasy(self.canvas.winfo_height())
+        first = max(0, int(top // self.slot_height) - THUMB_WINDOW)
+        last = min(self.page_count - 1, int(bottom // self.slot_height) + THUMB_WINDOW)
+        wanted = range(first, last + 1)
+
+        # Miniaturen außerhalb des Fensters aus dem Canvas entfernen (Bytes bleiben im Speicher)
+        for index in [i for i in self.items if not first <= i <= last]:
+            for item in self.items.pop(index)[:3]:
+                if item:
+                    self.canvas.delete(item)
+
+        missing = []
+        for index in wanted:
+            if index not in self.items:
+                slot = self.slot_top(index)
+                y0 = slot + THUMB_GAP // 2
+                rect = self.canvas.create_rectangle(THUMB_PAD, y0, THUMB_PAD + THUMB_WIDTH,
+                                                    y0 + self.thumb_height, fill="white", outline="")
+                label = self.canvas.create_text(THUMB_PAD + THUMB_WIDTH // 2, slot + self.slot_height - 2,
+                                                text=str(index + 1), fill="white", anchor=tk.S,
+                                                font=("Arial", 8))
+                self.items[index] = (rect, label, None, None)
+            if self.items[index][3] is not None:
+                continue
+            data = self.store.get((self.doc_id, index))
+            if data is not None:
+                self.show_thumbnail(index, data)
+            else:
+                missing.append(index)
+
+        if self.highlight is not None:
+            self.canvas.tag_raise(self.highlight)
+
+        if missing and set(missing) - self.pending:
+            self.pending = set(missing)
+            self.worker.request(self.doc_id, self.thumb_height, missing)
+            if self.poll_id is None:
+                self.poll_id = self.canvas.after(THUMB_POLL_MS, self.poll)
+
+    def show_thumbnail(self, index, data):
+        rect, label, _item, _photo = self.items[index]
+        photo = tk.PhotoImage(data=data, format="ppm")
+        # Kleinere Miniatur (z.B. Querformat) im Platz zentrieren
+        x = THUMB_PAD + (THUMB_WIDTH - photo.width()) // 2
+        y = self.slot_top(index) + THUMB_GAP // 2 + (self.thumb_height - photo.height()) // 2
+        item = self.canvas.create_image(x, y, anchor=tk.NW, image=photo)
+        self.items[index] = (rect, label, item, photo)
+        if self.highlight is not None:
+            self.canvas.tag_raise(self.highlight)
+
+    def poll(self):
+        self.poll_id = None
+        if not self.worker:
+            return
+        try:
+            while True:
+                doc_id, generation, batch = self.worker.results.get_nowait()
+                if generation < self.fences.get(doc_id, 0):
+                    continue
+                for index, data in batch:
+                    self.store.put((doc_id, index), data)
+                    if doc_id != self.doc_id:
+                        continue
+                    self.pending.discard(index)
+                    entry = self.items.get(index)
+                    if entry is not None and entry[3] is None:
+                        self.show_thumbnail(index, data)
+        except queue.Empty:
+            pass
+        if self.pending:
+            self.poll_id = self.canvas.after(THUMB_POLL_MS, self.poll)